@@ -0,0 +1,15 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from app.core.database import get_db
+from app.services import change_log
+
+router = APIRouter(prefix="/changes", tags=["changes"])
+
+@router.get("/")
+def get_changes(
+    since: int = Query(0, ge=0, description="next_cursor from the previous call (0 for the first sync)"),
+    limit: int = Query(1000, ge=1, le=5000),
+    db: Session = Depends(get_db)
+):
+    """Get data changes after a cursor so clients can apply deltas instead of refetching lists"""
+    return change_log.get_changes(db, since, limit)
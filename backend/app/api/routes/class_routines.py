@@ -1,8 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+import json
 from app.core.database import get_db
+from app.core.versioning import check_etag, data_versions, etag_for
 from app.services.crud import ClassRoutineService
+from app.services.notifications import sse_stream
+from app.services.validation import TimetableValidationService
 from pydantic import BaseModel
 
 router = APIRouter(prefix="/class-routines", tags=["class-routines"])
@@ -28,28 +33,170 @@ class RoutineSaveRequest(BaseModel):
     entries: List[dict]
     room_no: str = None
 
+class BulkRoutineSaveRequest(BaseModel):
+    routines: List[RoutineSaveRequest]
+    check_conflicts: bool = True
+
 class TeacherConflictRequest(BaseModel):
     teacher_id: int
     day_id: int
     period_ids: List[int]
-    exclude_class_id: int = None
+    exclude_class_id: Optional[int] = None
+
+class TeacherConflictBatchRequest(BaseModel):
+    probes: List[TeacherConflictRequest]
 
 @router.post("/save/")
 def save_routine(request: RoutineSaveRequest, db: Session = Depends(get_db)):
     """Save or update routine for a class"""
     try:
-        entries = ClassRoutineService.save_routine(db, request.class_id, request.entries, request.room_no)
-        return {"message": "Routine saved successfully", "count": len(entries)}
+        result = ClassRoutineService.save_routine(db, request.class_id, request.entries, request.room_no)
+        return {
+            "message": "Routine saved successfully",
+            "count": result["inserted"] + result["updated"] + result["unchanged"],
+            **result,
+        }
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+STREAM_BATCH_SIZE = 500
+
+# Tables the full routine list is built from (see ClassRoutineService._routine_projection_query)
+ROUTINE_LIST_TABLES = ("class_routine_entries", "subjects", "classes", "semesters", "programmes")
+
+def ndjson_chunks(entries, batch_size: int = STREAM_BATCH_SIZE):
+    """Serialize entries as newline-delimited JSON, one chunk per batch"""
+    batch = []
+    for entry in entries:
+        batch.append(json.dumps(entry, default=str))
+        if len(batch) >= batch_size:
+            yield "\n".join(batch) + "\n"
+            batch = []
+    if batch:
+        yield "\n".join(batch) + "\n"
+
+@router.post("/bulk-save/")
+def save_routines_bulk(request: BulkRoutineSaveRequest, db: Session = Depends(get_db)):
+    """Save routines for many classes in a single transaction (all or nothing)"""
+    class_ids = [routine.class_id for routine in request.routines]
+    if len(set(class_ids)) != len(class_ids):
+        raise HTTPException(status_code=400, detail="Each class may appear only once in a bulk save")
+    
+    routines = [routine.dict() for routine in request.routines]
+    # Malformed entries fail the conflict pass as well as the save: both are a 400
+    try:
+        conflicts = ClassRoutineService.check_bulk_conflicts(db, routines) if request.check_conflicts else []
+        summary = None if conflicts else ClassRoutineService.save_routines_bulk(db, routines)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if conflicts:
+        raise HTTPException(
+            status_code=409,
+            detail={"message": "Teacher conflicts found; nothing was saved", "conflicts": conflicts},
+        )
+    
+    totals = {
+        key: sum(counts[key] for counts in summary.values())
+        for key in ("inserted", "updated", "deleted", "unchanged")
+    }
+    return {
+        "message": f"Routines saved successfully for {len(summary)} classes",
+        **totals,
+        "classes": summary,
+    }
+
 @router.get("/")
-def get_all_routines(db: Session = Depends(get_db)):
-    """Get all class routine entries"""
+def get_all_routines(
+    stream: Optional[str] = None,
+    etag: str = Depends(etag_for(*ROUTINE_LIST_TABLES)),
+    db: Session = Depends(get_db)
+):
+    """Get all class routine entries (pass ?stream=ndjson to stream them one JSON object per line)"""
+    if stream == "ndjson":
+        entries = ClassRoutineService.iter_all_routines(db, batch_size=STREAM_BATCH_SIZE)
+        return StreamingResponse(
+            ndjson_chunks(entries),
+            media_type="application/x-ndjson",
+            headers={"ETag": etag, "Cache-Control": "no-cache"},
+        )
+    if stream is not None:
+        raise HTTPException(status_code=400, detail=f"Unsupported stream format: {stream}")
+    
     routines = ClassRoutineService.get_all_routines(db)
     return routines
 
-@router.get("/{class_id}/")
+@router.get("/search/")
+def search_routines(
+    programme_id: Optional[int] = None,
+    semester_id: Optional[int] = None,
+    department_id: Optional[int] = None,
+    class_id: Optional[int] = None,
+    day_id: Optional[int] = None,
+    period_from: Optional[int] = Query(None, description="First period order (inclusive)"),
+    period_to: Optional[int] = Query(None, description="Last period order (inclusive)"),
+    teacher_id: Optional[int] = Query(None, description="Matches lead or any assistant teacher"),
+    subject_id: Optional[int] = None,
+    is_lab: Optional[bool] = None,
+    lab_room: Optional[str] = None,
+    after_id: Optional[int] = Query(None, description="Cursor returned as next_cursor by the previous page"),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db)
+):
+    """Filter routine entries server-side with keyset pagination"""
+    entries, next_cursor = ClassRoutineService.search_routines(
+        db,
+        programme_id=programme_id,
+        semester_id=semester_id,
+        department_id=department_id,
+        class_id=class_id,
+        day_id=day_id,
+        period_from=period_from,
+        period_to=period_to,
+        teacher_id=teacher_id,
+        subject_id=subject_id,
+        is_lab=is_lab,
+        lab_room=lab_room,
+        after_id=after_id,
+        limit=limit,
+    )
+    return {"items": entries, "next_cursor": next_cursor}
+
+@router.get("/teachers/")
+def get_teacher_timetables(db: Session = Depends(get_db)):
+    """Get every teacher's timetable grid, lab partners and total load in one response"""
+    return ClassRoutineService.get_teacher_timetables(db)
+
+@router.get("/teachers/{teacher_id}/")
+def get_teacher_timetable(teacher_id: int, db: Session = Depends(get_db)):
+    """Get one teacher's timetable grid, lab partners and total load"""
+    timetables = ClassRoutineService.get_teacher_timetables(db, teacher_id)
+    if not timetables:
+        raise HTTPException(status_code=404, detail="Teacher not found")
+    return timetables[0]
+
+@router.get("/validate/")
+def validate_timetable(db: Session = Depends(get_db)):
+    """Validate the whole timetable: teacher double-bookings, lab room clashes, class overlaps and period overruns"""
+    return TimetableValidationService.validate(db)
+
+@router.get("/events/")
+def routine_events_stream(request: Request):
+    """Server-sent events with each class's teacher occupancy after its routine is saved or deleted"""
+    return StreamingResponse(
+        sse_stream(request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+def class_routine_etag(class_id: int, request: Request, response: Response) -> str:
+    """ETag of one class's routine: its own entries plus the subject and teacher names shown"""
+    etag = data_versions.etag(
+        tables=("subjects", "teachers"), keys=[("class_routine_entries", class_id)]
+    )
+    return check_etag(request, response, etag)
+
+@router.get("/{class_id}/", dependencies=[Depends(class_routine_etag)])
 def get_routine_by_class(class_id: int, db: Session = Depends(get_db)):
     """Get routine for a specific class"""
     routine = ClassRoutineService.get_routine_by_class(db, class_id)
@@ -73,3 +220,17 @@ def check_teacher_conflict(
         db, request.teacher_id, request.day_id, request.period_ids, request.exclude_class_id
     )
     return result
+
+@router.post("/check-teacher-conflicts/batch/")
+def check_teacher_conflicts_batch(
+    request: TeacherConflictBatchRequest,
+    db: Session = Depends(get_db)
+):
+    """Check many teacher/slot probes in one round trip; results follow probe order"""
+    results = ClassRoutineService.check_teacher_conflicts_batch(
+        db, [probe.dict() for probe in request.probes]
+    )
+    return {
+        "has_conflict": any(result["has_conflict"] for result in results),
+        "results": results,
+    }
@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List
 from app.core.database import get_db
+from app.core.versioning import etag_for
 from app.schemas import schemas
 from app.services.crud import ClassService
 
@@ -11,7 +12,7 @@ router = APIRouter(prefix="/classes", tags=["classes"])
 def create_class(class_data: schemas.ClassCreate, db: Session = Depends(get_db)):
     return ClassService.create(db, class_data)
 
-@router.get("/", response_model=List[schemas.Class])
+@router.get("/", response_model=List[schemas.Class], dependencies=[Depends(etag_for("classes"))])
 def get_classes(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
     return ClassService.get_all(db, skip, limit)
 
@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List
 from app.core.database import get_db
+from app.core.versioning import etag_for
 from app.schemas import schemas
 from app.services.crud import DayService
 
@@ -11,7 +12,7 @@ router = APIRouter(prefix="/days", tags=["days"])
 def create_day(day: schemas.DayCreate, db: Session = Depends(get_db)):
     return DayService.create(db, day)
 
-@router.get("/", response_model=List[schemas.Day])
+@router.get("/", response_model=List[schemas.Day], dependencies=[Depends(etag_for("days"))])
 def get_days(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
     return DayService.get_all(db, skip, limit)
 
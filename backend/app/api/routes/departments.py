@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List
 from app.core.database import get_db
+from app.core.versioning import etag_for
 from app.schemas import schemas
 from app.services.crud import DepartmentService
 
@@ -11,7 +12,7 @@ router = APIRouter(prefix="/departments", tags=["departments"])
 def create_department(department: schemas.DepartmentCreate, db: Session = Depends(get_db)):
     return DepartmentService.create(db, department)
 
-@router.get("/", response_model=List[schemas.Department])
+@router.get("/", response_model=List[schemas.Department], dependencies=[Depends(etag_for("departments"))])
 def get_departments(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
     return DepartmentService.get_all(db, skip, limit)
 
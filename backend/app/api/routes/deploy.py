@@ -2,9 +2,12 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import List, Dict, Any
 import json
+import logging
 import os
 import sys
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
 class DeployData(BaseModel):
@@ -33,14 +36,14 @@ async def deploy_static_page(data: DeployData):
         deploy_dir = os.path.join(backend_root, 'deploy')
         os.makedirs(deploy_dir, exist_ok=True)
         
-        print(f"Deploying to: {deploy_dir}")
+        logger.info("Deploying static page", extra={"deploy_dir": deploy_dir})
         
         # Save data as JSON for the static server
         data_file = os.path.join(deploy_dir, 'routine_data.json')
         with open(data_file, 'w') as f:
             json.dump(data.dict(), f, indent=2, default=str)
         
-        print(f"Data saved to: {data_file}")
+        logger.info("Routine data saved", extra={"path": data_file})
         
         # Create the HTML file
         html_content = generate_html_page()
@@ -48,7 +51,7 @@ async def deploy_static_page(data: DeployData):
         with open(html_file, 'w', encoding='utf-8') as f:
             f.write(html_content)
         
-        print(f"HTML saved to: {html_file}")
+        logger.info("Static page saved", extra={"path": html_file})
         
         return {
             "success": True,
@@ -57,7 +60,7 @@ async def deploy_static_page(data: DeployData):
             "deploy_path": deploy_dir
         }
     except Exception as e:
-        print(f"Deployment error: {e}")
+        logger.exception("Static page deployment failed")
         raise HTTPException(status_code=500, detail=str(e))
 
 def generate_html_page():
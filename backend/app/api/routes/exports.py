@@ -0,0 +1,152 @@
+import io
+import os
+import tempfile
+import zipfile
+from datetime import date
+from typing import Any, Dict, Optional
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse, Response
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+from starlette.background import BackgroundTask
+from app.core.database import get_db
+from app.models import models
+from app.services.export_jobs import export_jobs
+from app.services.exports import ExportService
+from app.services.pdf_timetables import PdfTimetableService
+
+router = APIRouter(prefix="/exports", tags=["exports"])
+
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+def attachment(content: bytes, media_type: str, filename: str) -> Response:
+    return Response(
+        content=content,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+def xlsx_response(write, filename: str) -> FileResponse:
+    """Write a workbook to a temporary file with `write(path)` and stream it, deleting it afterwards"""
+    fd, path = tempfile.mkstemp(suffix=".xlsx")
+    os.close(fd)
+    try:
+        write(path)
+    except Exception:
+        os.unlink(path)
+        raise
+    return FileResponse(
+        path,
+        media_type=XLSX_MEDIA_TYPE,
+        filename=filename,
+        background=BackgroundTask(os.unlink, path),
+    )
+
+@router.get("/class-routines/")
+def export_class_routines(semester_id: Optional[int] = None, db: Session = Depends(get_db)):
+    """All class routines as one workbook, a sheet per class (optionally only one semester's classes)"""
+    query = db.query(models.Class.id)
+    if semester_id is not None:
+        query = query.filter(models.Class.semester_id == semester_id)
+    if query.first() is None:
+        raise HTTPException(status_code=404, detail="No classes available to export")
+    return xlsx_response(
+        lambda path: ExportService.write_class_routines(db, path, semester_id),
+        f"All_Class_Routines_{date.today().isoformat()}.xlsx",
+    )
+
+@router.get("/day-wise/")
+def export_day_wise(db: Session = Depends(get_db)):
+    """Master routine workbook: a sheet per working day (Sunday-Thursday) with every class as a row"""
+    if db.query(models.Class.id).first() is None:
+        raise HTTPException(status_code=404, detail="No classes available to export")
+    return xlsx_response(
+        lambda path: ExportService.write_day_wise(db, path),
+        f"Day_Wise_Routine_{date.today().isoformat()}.xlsx",
+    )
+
+@router.get("/teachers/")
+def export_teacher_routines(db: Session = Depends(get_db)):
+    """All teachers' routines as one workbook, a sheet per teacher"""
+    if db.query(models.Teacher.id).first() is None:
+        raise HTTPException(status_code=404, detail="No teachers available to export")
+    return xlsx_response(
+        lambda path: ExportService.write_teacher_routines(db, path),
+        f"All_Teachers_Routines_{date.today().isoformat()}.xlsx",
+    )
+
+class ExportJobRequest(BaseModel):
+    type: str  # class-routines, day-wise, teachers or payroll
+    params: Dict[str, Any] = {}
+
+def get_job_or_404(job_id: str):
+    job = export_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Export job not found")
+    return job
+
+@router.post("/jobs/", status_code=202)
+def create_export_job(request: ExportJobRequest, db: Session = Depends(get_db)):
+    """Queue an export in the background; poll the returned job, then download it.
+    Exports already rendered for the current data come back as done at once."""
+    try:
+        job = export_jobs.submit(db, request.type, request.params)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return job.to_dict()
+
+@router.get("/jobs/{job_id}/")
+def get_export_job(job_id: str):
+    return get_job_or_404(job_id).to_dict()
+
+@router.get("/jobs/{job_id}/download/")
+def download_export_job(job_id: str):
+    job = get_job_or_404(job_id)
+    if job.status != 'done':
+        raise HTTPException(status_code=409, detail=f"Export job is {job.status}")
+    path = export_jobs.cache_path(job.key)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=410, detail="Export file expired; start the export again")
+    return FileResponse(path, media_type=XLSX_MEDIA_TYPE, filename=job.filename)
+
+@router.get("/pdf/classes/")
+def export_class_pdfs(semester_id: Optional[int] = None, db: Session = Depends(get_db)):
+    """A ZIP with every class's (or one semester's classes') PDF timetable"""
+    pdfs = PdfTimetableService.class_pdfs(db, semester_id)
+    if not pdfs:
+        raise HTTPException(status_code=404, detail="No classes available to export")
+    output = io.BytesIO()
+    used = set()
+    with zipfile.ZipFile(output, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for filename, pdf in pdfs:
+            name, n = filename, 1
+            while name in used:
+                n += 1
+                name = f"{filename[:-len('.pdf')]}_{n}.pdf"
+            used.add(name)
+            archive.writestr(name, pdf)
+    return attachment(output.getvalue(), "application/zip", f"Class_Routines_PDF_{date.today().isoformat()}.zip")
+
+@router.get("/pdf/classes/{class_id}/")
+def export_class_pdf(class_id: int, db: Session = Depends(get_db)):
+    result = PdfTimetableService.class_pdf(db, class_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Class not found")
+    filename, pdf = result
+    return attachment(pdf, "application/pdf", filename)
+
+@router.get("/pdf/teachers/{teacher_id}/")
+def export_teacher_pdf(teacher_id: int, db: Session = Depends(get_db)):
+    result = PdfTimetableService.teacher_pdf(db, teacher_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Teacher not found")
+    filename, pdf = result
+    return attachment(pdf, "application/pdf", filename)
+
+@router.get("/pdf/rooms/{room_id}/")
+def export_room_pdf(room_id: int, db: Session = Depends(get_db)):
+    result = PdfTimetableService.room_pdf(db, room_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Room not found")
+    filename, pdf = result
+    return attachment(pdf, "application/pdf", filename)
@@ -1,6 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import date
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from app.core.database import get_db
 from app.schemas.schemas import (
     PositionRateCreate, 
@@ -9,6 +11,7 @@ from app.schemas.schemas import (
     TeacherEffectiveLoadResponse
 )
 from app.services import crud
+from app.services.payroll import PayrollService
 from app.models import models
 
 router = APIRouter()
@@ -55,9 +58,13 @@ def create_or_update_effective_loads_endpoint(
 ):
     """Create or update teacher effective loads"""
     # Validate that all teachers exist
+    teacher_ids = {load.teacher_id for load in loads}
+    found = {
+        teacher_id for (teacher_id,) in
+        db.query(models.Teacher.id).filter(models.Teacher.id.in_(teacher_ids)).all()
+    }
     for load in loads:
-        teacher = db.query(models.Teacher).filter(models.Teacher.id == load.teacher_id).first()
-        if not teacher:
+        if load.teacher_id not in found:
             raise HTTPException(
                 status_code=404, 
                 detail=f"Teacher with id {load.teacher_id} not found"
@@ -80,3 +87,29 @@ def delete_effective_load_endpoint(teacher_id: int, db: Session = Depends(get_db
     if not success:
         raise HTTPException(status_code=404, detail="Teacher effective load not found")
     return {"message": "Teacher effective load deleted successfully"}
+
+# Payroll Report
+@router.get("/payroll")
+def get_payroll_report(
+    format: str = Query("json", pattern="^(json|csv|xlsx)$"),
+    department_id: Optional[int] = None,
+    recruitment: Optional[str] = None,
+    include_unassigned: bool = Query(False, description="Also list teachers with no assigned periods"),
+    db: Session = Depends(get_db)
+):
+    """Extra-load payment for every teacher as JSON, CSV or XLSX"""
+    rows = PayrollService.get_rows(db, department_id, recruitment, include_unassigned)
+    filename = f"payroll_{date.today().isoformat()}"
+    if format == "csv":
+        return StreamingResponse(
+            PayrollService.iter_csv(rows),
+            media_type="text/csv",
+            headers={"Content-Disposition": f'attachment; filename="{filename}.csv"'},
+        )
+    if format == "xlsx":
+        return Response(
+            PayrollService.to_xlsx(rows),
+            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            headers={"Content-Disposition": f'attachment; filename="{filename}.xlsx"'},
+        )
+    return {"rows": rows, "totals": PayrollService.totals(rows)}
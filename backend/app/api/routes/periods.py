@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List
 from app.core.database import get_db
+from app.core.versioning import etag_for
 from app.schemas import schemas
 from app.services.crud import PeriodService
 
@@ -11,7 +12,7 @@ router = APIRouter(prefix="/periods", tags=["periods"])
 def create_period(period: schemas.PeriodCreate, db: Session = Depends(get_db)):
     return PeriodService.create(db, period)
 
-@router.get("/", response_model=List[schemas.Period])
+@router.get("/", response_model=List[schemas.Period], dependencies=[Depends(etag_for("periods"))])
 def get_periods(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
     return PeriodService.get_all(db, skip, limit)
 
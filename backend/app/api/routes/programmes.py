@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List
 from app.core.database import get_db
+from app.core.versioning import etag_for
 from app.schemas import schemas
 from app.services.crud import ProgrammeService
 
@@ -11,7 +12,7 @@ router = APIRouter(prefix="/programmes", tags=["programmes"])
 def create_programme(programme: schemas.ProgrammeCreate, db: Session = Depends(get_db)):
     return ProgrammeService.create(db, programme)
 
-@router.get("/", response_model=List[schemas.Programme])
+@router.get("/", response_model=List[schemas.Programme], dependencies=[Depends(etag_for("programmes"))])
 def get_programmes(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
     return ProgrammeService.get_all(db, skip, limit)
 
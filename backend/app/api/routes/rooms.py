@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List
 from app.core.database import get_db
+from app.core.versioning import etag_for
 from app.schemas import schemas
 from app.services.crud import RoomService
 
@@ -11,7 +12,7 @@ router = APIRouter(prefix="/rooms", tags=["rooms"])
 def create_room(room: schemas.RoomCreate, db: Session = Depends(get_db)):
     return RoomService.create(db, room)
 
-@router.get("/", response_model=List[schemas.Room])
+@router.get("/", response_model=List[schemas.Room], dependencies=[Depends(etag_for("rooms"))])
 def get_rooms(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
     return RoomService.get_all(db, skip, limit)
 
@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List
 from app.core.database import get_db
+from app.core.versioning import etag_for
 from app.schemas import schemas
 from app.services.crud import SemesterService
 
@@ -11,7 +12,7 @@ router = APIRouter(prefix="/semesters", tags=["semesters"])
 def create_semester(semester: schemas.SemesterCreate, db: Session = Depends(get_db)):
     return SemesterService.create(db, semester)
 
-@router.get("/", response_model=List[schemas.Semester])
+@router.get("/", response_model=List[schemas.Semester], dependencies=[Depends(etag_for("semesters"))])
 def get_semesters(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
     return SemesterService.get_all(db, skip, limit)
 
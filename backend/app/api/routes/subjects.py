@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from typing import List
 from app.core.database import get_db
+from app.core.versioning import etag_for
 from app.schemas import schemas
 from app.services.crud import SubjectService
 
@@ -21,7 +22,7 @@ def create_subject(subject: schemas.SubjectCreate, db: Session = Depends(get_db)
             )
         raise HTTPException(status_code=400, detail="Database integrity error: " + str(e))
 
-@router.get("/", response_model=List[schemas.Subject])
+@router.get("/", response_model=List[schemas.Subject], dependencies=[Depends(etag_for("subjects"))])
 def get_subjects(skip: int = 0, limit: int = 1000, db: Session = Depends(get_db)):
     return SubjectService.get_all(db, skip, limit)
 
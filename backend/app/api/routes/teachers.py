@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List
 from app.core.database import get_db
+from app.core.versioning import etag_for
 from app.schemas import schemas
 from app.services.crud import TeacherService
 
@@ -11,7 +12,7 @@ router = APIRouter(prefix="/teachers", tags=["teachers"])
 def create_teacher(teacher: schemas.TeacherCreate, db: Session = Depends(get_db)):
     return TeacherService.create(db, teacher)
 
-@router.get("/", response_model=List[schemas.Teacher])
+@router.get("/", response_model=List[schemas.Teacher], dependencies=[Depends(etag_for("teachers"))])
 def get_teachers(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
     return TeacherService.get_all(db, skip, limit)
 
@@ -0,0 +1,31 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from app.core.database import get_db
+from app.core.versioning import etag_for
+from app.services.rollups import GROUPINGS, ROLLUP_TABLES, rollup_cache
+from app.services.workload import WorkloadService
+
+router = APIRouter(prefix="/workload", tags=["workload"])
+
+@router.get("/")
+def get_workload(db: Session = Depends(get_db)):
+    """Teacher Load Report: per-teacher loads, extra load and payment, plus per-subject totals"""
+    return {
+        "teachers": WorkloadService.get_teacher_loads(db),
+        "subjects": WorkloadService.get_subject_loads(db),
+    }
+
+@router.get("/teachers/{teacher_id}/")
+def get_teacher_workload(teacher_id: int, db: Session = Depends(get_db)):
+    """Load report row for one teacher"""
+    loads = WorkloadService.get_teacher_loads(db, teacher_id)
+    if not loads:
+        raise HTTPException(status_code=404, detail="Teacher not found or has no assigned periods")
+    return loads[0]
+
+@router.get("/rollups/{group_by}/", dependencies=[Depends(etag_for(*ROLLUP_TABLES))])
+def get_workload_rollup(group_by: str, db: Session = Depends(get_db)):
+    """Periods, workload, extra load and payment totals by department, programme, semester or recruitment"""
+    if group_by not in GROUPINGS:
+        raise HTTPException(status_code=404, detail=f"Unknown grouping; use one of: {', '.join(GROUPINGS)}")
+    return rollup_cache.get(db, group_by)
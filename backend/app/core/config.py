@@ -5,6 +5,20 @@ class Settings(BaseSettings):
     SECRET_KEY: str = "your-secret-key-here"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    # Change log retention (see app/services/change_log.py)
+    CHANGE_LOG_RETENTION_DAYS: int = 30
+    CHANGE_LOG_MAX_ENTRIES: int = 100000
+    # Logging (see app/core/logging.py)
+    LOG_LEVEL: str = "INFO"
+    LOG_LEVELS: str = ""  # e.g. "app.services.crud=DEBUG,app.api.routes.deploy=WARNING"
+    LOG_SAMPLE_RATE: float = 0.01
+    # Background export jobs (see app/services/export_jobs.py)
+    EXPORT_WORKERS: int = 2
+    EXPORT_CACHE_DIR: str = "./export_cache"
+    EXPORT_CACHE_MAX_FILES: int = 50
+    # PDF timetables (see app/services/pdf_timetables.py)
+    PDF_WORKERS: int = 0  # processes for bulk rendering; 0 = one per CPU
+    PDF_CACHE_MAX_ENTRIES: int = 500
     
     class Config:
         env_file = ".env"
@@ -0,0 +1,119 @@
+"""Backend logging.
+
+All modules log through `logging.getLogger(__name__)` under the "app"
+namespace. setup_logging() (called from an app.main startup hook) routes
+those records through a QueueHandler to a QueueListener thread, so request
+handlers never block on console writes (slow on the Windows console the
+launcher opens).
+
+Configuration (settings / .env):
+
+- LOG_LEVEL: level of the "app" logger, e.g. INFO
+- LOG_LEVELS: per-module overrides, e.g.
+  "app.services.crud=DEBUG,app.api.routes.deploy=WARNING"
+- LOG_SAMPLE_RATE: share of hot-path debug events that are emitted
+
+Hot-path events are logged with `extra=sampled(...)`; SamplingFilter keeps
+one in every 1/LOG_SAMPLE_RATE of them per call site. Any other `extra`
+fields are appended to the message as key=value pairs.
+"""
+import atexit
+import logging
+import logging.handlers
+import queue
+import threading
+from app.core.config import settings
+
+APP_LOGGER = "app"
+
+# LogRecord attributes that are not user-supplied fields
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "sampled"}
+
+_listener = None
+_lock = threading.Lock()
+
+
+def sampled(**fields) -> dict:
+    """`extra` for a hot-path event that should be sampled"""
+    return {"sampled": True, **fields}
+
+
+class SamplingFilter(logging.Filter):
+    """Pass one in every `1 / rate` records marked sampled, counted per call site"""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.every = max(1, round(1 / rate)) if rate > 0 else 0
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not getattr(record, "sampled", False):
+            return True
+        if not self.every:
+            return False
+        key = (record.pathname, record.lineno)
+        with self._lock:
+            count = self._counts.get(key, 0)
+            self._counts[key] = count + 1
+        if count % self.every:
+            return False
+        if self.every > 1:
+            record.sample_rate = f"1/{self.every}"
+        return True
+
+
+class KeyValueFormatter(logging.Formatter):
+    """Standard format followed by the record's extra fields as key=value pairs"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        message = super().format(record)
+        fields = {key: value for key, value in vars(record).items() if key not in _RESERVED}
+        if fields:
+            message += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return message
+
+
+def parse_levels(spec: str) -> dict:
+    """'a.b=DEBUG,c=WARNING' -> {'a.b': 'DEBUG', 'c': 'WARNING'}"""
+    levels = {}
+    for item in (spec or "").split(","):
+        name, _, level = item.partition("=")
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging():
+    """Configure the "app" logger tree once; later calls are no-ops"""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            return
+
+        console = logging.StreamHandler()
+        console.setFormatter(KeyValueFormatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+        _listener = logging.handlers.QueueListener(queue.SimpleQueue(), console, respect_handler_level=True)
+
+        queue_handler = logging.handlers.QueueHandler(_listener.queue)
+        # Drop unsampled hot-path records before they are queued
+        queue_handler.addFilter(SamplingFilter(settings.LOG_SAMPLE_RATE))
+
+        app_logger = logging.getLogger(APP_LOGGER)
+        app_logger.handlers = [queue_handler]
+        app_logger.setLevel(settings.LOG_LEVEL.upper())
+        app_logger.propagate = False
+        for name, level in parse_levels(settings.LOG_LEVELS).items():
+            logging.getLogger(name).setLevel(level)
+
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
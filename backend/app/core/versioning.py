@@ -0,0 +1,159 @@
+"""Data versions for conditional GETs (ETag / If-None-Match).
+
+Every commit made through SessionLocal stamps the tables it wrote with a new
+value of one process-wide, monotonically increasing counter. Writes are
+collected per session by two event hooks and applied only after the commit
+succeeds:
+
+- after_flush records the tables of every new, changed or deleted ORM object
+- do_orm_execute records the table of bulk INSERT/UPDATE/DELETE statements
+
+Tables listed in KEYED_TABLES are also versioned per key (class routine
+entries per class), so saving one class does not invalidate the cached
+routine of every other class. Bulk statements say which keys they touch with
+`execution_options(**version_keys(...))`; without it the whole table counts as
+changed.
+
+An ETag is the boot id plus the highest stamp among the tables (and keys) a
+response is built from. The boot id changes on every restart, so ETags handed
+out before a restart never match. Like the occupancy index, versions live in
+process memory; run a single API worker.
+"""
+import itertools
+import threading
+import uuid
+from fastapi import HTTPException, Request, Response
+from sqlalchemy import event
+from app.core.database import SessionLocal
+
+# table name -> column whose value is the version key
+KEYED_TABLES = {
+    'class_routine_entries': 'class_id',
+    'routine_entry_teachers': 'class_id',
+}
+
+_PENDING = 'pending_versions'
+
+
+def version_keys(*keys):
+    """Execution options telling the version tracker which keys a bulk statement touches"""
+    return {'version_keys': keys}
+
+
+class DataVersions:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counter = itertools.count(1)
+        self.boot_id = uuid.uuid4().hex[:8]
+        # table name -> stamp of the last commit writing it
+        self._tables = {}
+        # table name -> stamp of the last commit writing it without saying which keys
+        self._unkeyed = {}
+        # (table name, key) -> stamp of the last commit writing that key
+        self._keys = {}
+
+    def record(self, session, table: str, keys=None):
+        """Remember that `session` wrote `table` (optionally only `keys` of it) in the current transaction"""
+        pending = session.info.setdefault(_PENDING, {})
+        touched = pending.setdefault(table, set())
+        if keys is None or table not in KEYED_TABLES:
+            touched.add(None)
+        else:
+            touched.update(keys)
+
+    def apply(self, session):
+        """Stamp everything the session wrote; called after a successful commit"""
+        pending = session.info.pop(_PENDING, None)
+        if not pending:
+            return
+        with self._lock:
+            stamp = next(self._counter)
+            for table, keys in pending.items():
+                self._tables[table] = stamp
+                for key in keys:
+                    if key is None:
+                        self._unkeyed[table] = stamp
+                    else:
+                        self._keys[(table, key)] = stamp
+
+    def discard(self, session):
+        session.info.pop(_PENDING, None)
+
+    def current(self, tables=(), keys=()):
+        """Highest stamp among whole `tables` and (table, key) pairs in `keys`"""
+        with self._lock:
+            stamps = [self._tables.get(table, 0) for table in tables]
+            for table, key in keys:
+                stamps.append(self._unkeyed.get(table, 0))
+                stamps.append(self._keys.get((table, key), 0))
+        return max(stamps, default=0)
+
+    def etag(self, tables=(), keys=()):
+        return f'W/"{self.boot_id}-{self.current(tables, keys)}"'
+
+
+data_versions = DataVersions()
+
+
+@event.listens_for(SessionLocal, 'after_flush')
+def _record_flush(session, flush_context):
+    for obj in itertools.chain(session.new, session.dirty, session.deleted):
+        table = getattr(obj, '__tablename__', None)
+        if table is None:
+            continue
+        key_column = KEYED_TABLES.get(table)
+        data_versions.record(session, table, None if key_column is None else (getattr(obj, key_column),))
+
+
+@event.listens_for(SessionLocal, 'do_orm_execute')
+def _record_bulk_statement(orm_execute_state):
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    table = getattr(orm_execute_state.statement.table, 'name', None)
+    if table is not None:
+        data_versions.record(
+            orm_execute_state.session, table, orm_execute_state.execution_options.get('version_keys')
+        )
+
+
+@event.listens_for(SessionLocal, 'after_commit')
+def _apply_commit(session):
+    data_versions.apply(session)
+
+
+@event.listens_for(SessionLocal, 'after_soft_rollback')
+def _discard_rollback(session, previous_transaction):
+    if previous_transaction.parent is None:
+        data_versions.discard(session)
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    # Weak comparison: W/"x" matches "x"
+    bare = etag[2:] if etag.startswith('W/') else etag
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == bare:
+            return True
+    return False
+
+
+def check_etag(request: Request, response: Response, etag: str) -> str:
+    """Answer 304 if the client already has `etag`, otherwise tag the response with it"""
+    headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+    if _matches(request.headers.get('if-none-match'), etag):
+        raise HTTPException(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return etag
+
+
+def etag_for(*tables: str):
+    """Route dependency making a GET conditional on the data versions of `tables`"""
+    def dependency(request: Request, response: Response) -> str:
+        return check_etag(request, response, data_versions.etag(tables))
+    return dependency
@@ -1,7 +1,14 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.core.database import engine, Base
-from app.api.routes import departments, teachers, subjects, schedules, programmes, semesters, semester_subjects, classes, rooms, days, periods, teacher_subjects, class_routines, finance, deploy, auth, users
+from app.core.logging import setup_logging
+from app.core.database import engine, Base, SessionLocal
+from app.models import models
+from app.services.crud import ClassRoutineService
+from app.services.workload import WorkloadService
+from app.services.occupancy import occupancy_index
+from app.services import change_log
+from app.services.pdf_timetables import shutdown_render_pool
+from app.api.routes import departments, teachers, subjects, schedules, programmes, semesters, semester_subjects, classes, rooms, days, periods, teacher_subjects, class_routines, changes, workload, exports, finance, deploy, auth, users
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
@@ -44,9 +51,54 @@ app.include_router(days.router, prefix="/api")
 app.include_router(periods.router, prefix="/api")
 app.include_router(teacher_subjects.router, prefix="/api")
 app.include_router(class_routines.router, prefix="/api")
+app.include_router(changes.router, prefix="/api")
+app.include_router(workload.router, prefix="/api")
+app.include_router(exports.router, prefix="/api")
 app.include_router(finance.router, prefix="/api/finance", tags=["finance"])
 app.include_router(deploy.router, prefix="/api/deploy", tags=["deploy"])
 
+@app.on_event("startup")
+def start_logging():
+    """Configure backend logging before the other startup hooks run"""
+    setup_logging()
+
+@app.on_event("startup")
+def build_routine_indexes():
+    """Backfill routine_entry_teachers if needed and build the in-memory occupancy index"""
+    db = SessionLocal()
+    try:
+        if db.query(models.RoutineEntryTeacher.id).first() is None and db.query(models.ClassRoutineEntry.id).first() is not None:
+            # Databases created before routine_entry_teachers existed (this also builds the index)
+            ClassRoutineService.rebuild_entry_teachers(db)
+        else:
+            occupancy_index.rebuild(db)
+    finally:
+        db.close()
+
+@app.on_event("startup")
+def backfill_teacher_loads():
+    """Fill the materialized teacher_loads table on databases created before it existed"""
+    db = SessionLocal()
+    try:
+        if db.query(models.TeacherLoad.id).first() is None and db.query(models.ClassRoutineEntry.id).first() is not None:
+            WorkloadService.rebuild(db)
+    finally:
+        db.close()
+
+@app.on_event("startup")
+def compact_change_log():
+    """Apply the change log retention policy"""
+    db = SessionLocal()
+    try:
+        change_log.compact(db)
+    finally:
+        db.close()
+
+@app.on_event("shutdown")
+def stop_pdf_workers():
+    """Stop the PDF render worker processes instead of leaving them to exit handlers"""
+    shutdown_render_pool()
+
 @app.get("/")
 def root():
     return {
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Time, Float, DateTime
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Time, Float, DateTime, Index, JSON, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.core.database import Base
@@ -30,7 +30,7 @@ class Semester(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
     semester_number = Column(Integer, nullable=False)
-    programme_id = Column(Integer, ForeignKey("programmes.id"))
+    programme_id = Column(Integer, ForeignKey("programmes.id"), index=True)
     is_active = Column(Boolean, default=True)
     
     programme = relationship("Programme", back_populates="semesters")
@@ -43,8 +43,8 @@ class Class(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
     section = Column(String, nullable=False)
-    semester_id = Column(Integer, ForeignKey("semesters.id"))
-    department_id = Column(Integer, ForeignKey("departments.id"))
+    semester_id = Column(Integer, ForeignKey("semesters.id"), index=True)
+    department_id = Column(Integer, ForeignKey("departments.id"), index=True)
     room_no = Column(String)
     effective_date = Column(String)  # Date in string format
     
@@ -160,6 +160,18 @@ class Room(Base):
 
 class ClassRoutineEntry(Base):
     __tablename__ = "class_routine_entries"
+    __table_args__ = (
+        # Composite indexes backing the routine search filters
+        Index("ix_routine_class_day_period", "class_id", "day_id", "period_id"),
+        Index("ix_routine_day_period", "day_id", "period_id"),
+        Index("ix_routine_subject_day", "subject_id", "day_id"),
+        Index("ix_routine_lead_teacher_day", "lead_teacher_id", "day_id"),
+        Index("ix_routine_assist_teacher_1_day", "assist_teacher_1_id", "day_id"),
+        Index("ix_routine_assist_teacher_2_day", "assist_teacher_2_id", "day_id"),
+        Index("ix_routine_assist_teacher_3_day", "assist_teacher_3_id", "day_id"),
+        Index("ix_routine_lab_day", "is_lab", "day_id"),
+        Index("ix_routine_lab_room_day", "lab_room", "day_id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     class_id = Column(Integer, ForeignKey("classes.id"))
@@ -186,6 +198,54 @@ class ClassRoutineEntry(Base):
     assist_teacher_2 = relationship("Teacher", foreign_keys=[assist_teacher_2_id])
     assist_teacher_3 = relationship("Teacher", foreign_keys=[assist_teacher_3_id])
 
+class RoutineEntryTeacher(Base):
+    """Normalized teacher membership of routine entries (one row per teacher slot)"""
+    __tablename__ = "routine_entry_teachers"
+    __table_args__ = (
+        Index("ix_routine_entry_teachers_teacher_day_span", "teacher_id", "day_id", "start_order", "end_order"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    entry_id = Column(Integer, ForeignKey("class_routine_entries.id", ondelete="CASCADE"), nullable=False, index=True)
+    teacher_id = Column(Integer, ForeignKey("teachers.id"), nullable=False)
+    role = Column(String, nullable=False)  # lead, assist_1, assist_2, assist_3
+    class_id = Column(Integer, ForeignKey("classes.id"), nullable=False, index=True)
+    day_id = Column(Integer, ForeignKey("days.id"), nullable=False)
+    start_order = Column(Integer, nullable=True)  # Period order of the entry's first period
+    end_order = Column(Integer, nullable=True)  # Period order of the entry's last period (num_periods span)
+    
+    entry = relationship("ClassRoutineEntry")
+    teacher = relationship("Teacher")
+
+class TeacherLoad(Base):
+    """Materialized teacher workload per subject and theory/lab, kept up to date by routine saves"""
+    __tablename__ = "teacher_loads"
+    __table_args__ = (
+        UniqueConstraint("teacher_id", "subject_name", "is_lab", name="uq_teacher_loads_teacher_subject_lab"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    teacher_id = Column(Integer, ForeignKey("teachers.id"), nullable=False, index=True)
+    subject_name = Column(String, nullable=False)  # Grouped by name, as the load report does
+    is_lab = Column(Boolean, nullable=False)
+    periods = Column(Integer, nullable=False, default=0)
+    workload_tenths = Column(Integer, nullable=False, default=0)  # Workload in tenths of a period
+    entry_count = Column(Integer, nullable=False, default=0)  # Teacher slots contributing to this row
+    first_entry_id = Column(Integer, nullable=True)  # Orders subjects as they first appear in the routine
+
+class ChangeLogEntry(Base):
+    """Append-only log of data changes, read by clients syncing through GET /changes"""
+    __tablename__ = "change_log"
+    # AUTOINCREMENT keeps ids (the sync cursor) from being reused after compaction
+    __table_args__ = {"sqlite_autoincrement": True}
+    
+    id = Column(Integer, primary_key=True)
+    table_name = Column(String, nullable=False)
+    row_id = Column(Integer, nullable=True)  # NULL for "reset": refetch the whole table
+    operation = Column(String, nullable=False)  # insert, update, delete, reset
+    data = Column(JSON, nullable=True)  # Column values after insert/update
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+
 class PositionRate(Base):
     __tablename__ = "position_rates"
     
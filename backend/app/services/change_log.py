@@ -0,0 +1,165 @@
+"""Append-only change log backing GET /changes.
+
+Every insert, update and delete made through SessionLocal is written to the
+change_log table in the same transaction as the change itself, so a client
+that remembers the last id it saw can fetch everything that happened since
+and apply it as a delta instead of refetching whole lists.
+
+- ORM changes are logged per row by an after_flush hook, with all of the
+  row's column values as `data` (deletes carry only the row id).
+- Bulk statements cannot be logged per row automatically. Callers that log
+  their rows themselves with record_changes() mark the statements with
+  `execution_options(**EXPLICITLY_LOGGED)`; any other bulk statement logs a
+  single "reset" entry telling clients to refetch that table.
+
+Old entries are removed by compact(). A client whose cursor points before the
+oldest retained entry gets `reset: true` and must reload everything.
+Ids are the cursor; this relies on commits being serialized (SQLite).
+"""
+from datetime import date, datetime, time, timedelta
+from sqlalchemy import event, func, insert, inspect, select
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models import models
+
+# change_log itself, derived tables and credentials are never logged
+EXCLUDED_TABLES = {'change_log', 'routine_entry_teachers', 'teacher_loads', 'users'}
+
+EXPLICITLY_LOGGED = {'change_logged': True}
+
+
+def _jsonable(value):
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    return value
+
+
+def _row_data(session, obj, row_id):
+    """Every column value of a flushed ORM object. Attributes that are expired or were never
+    loaded are read back from the row in one SELECT, so clients always get whole rows."""
+    state = inspect(obj)
+    data = {attr.key: state.dict[attr.key] for attr in state.mapper.column_attrs if attr.key in state.dict}
+    missing = [attr for attr in state.mapper.column_attrs if attr.key not in data]
+    if missing and row_id is not None:
+        row = session.connection().execute(
+            select(*[attr.columns[0] for attr in missing]).where(state.mapper.primary_key[0] == row_id)
+        ).first()
+        if row is not None:
+            data.update(zip([attr.key for attr in missing], row))
+    return {key: _jsonable(value) for key, value in data.items()}
+
+
+def record_changes(db: Session, table_name: str, operation: str, rows):
+    """Log bulk changes to `table_name`: dicts with an 'id' for insert/update, plain ids for delete"""
+    if table_name in EXCLUDED_TABLES or not rows:
+        return
+    now = datetime.utcnow()
+    if operation == 'delete':
+        entries = [{'table_name': table_name, 'row_id': row_id, 'operation': operation, 'data': None,
+                    'created_at': now} for row_id in rows]
+    else:
+        entries = [{'table_name': table_name, 'row_id': row['id'], 'operation': operation,
+                    'data': {key: _jsonable(value) for key, value in row.items()}, 'created_at': now}
+                   for row in rows]
+    # Core insert on the session's connection: same transaction, no ORM flush events
+    db.connection().execute(insert(models.ChangeLogEntry.__table__), entries)
+
+
+@event.listens_for(SessionLocal, 'after_flush')
+def _log_flush(session, flush_context):
+    entries = []
+    now = datetime.utcnow()
+    for operation, objects in (('insert', session.new), ('update', session.dirty), ('delete', session.deleted)):
+        for obj in objects:
+            table_name = getattr(obj, '__tablename__', None)
+            if table_name is None or table_name in EXCLUDED_TABLES:
+                continue
+            if operation == 'update' and not session.is_modified(obj, include_collections=False):
+                continue
+            state = inspect(obj)
+            # New objects get their identity key only after the flush completes
+            row_id = state.identity[0] if state.identity else state.dict.get(state.mapper.primary_key[0].key)
+            entries.append({
+                'table_name': table_name,
+                'row_id': row_id,
+                'operation': operation,
+                'data': None if operation == 'delete' else _row_data(session, obj, row_id),
+                'created_at': now,
+            })
+    if entries:
+        session.connection().execute(insert(models.ChangeLogEntry.__table__), entries)
+
+
+@event.listens_for(SessionLocal, 'do_orm_execute')
+def _log_bulk_statement(orm_execute_state):
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    if orm_execute_state.execution_options.get('change_logged'):
+        return
+    table_name = getattr(orm_execute_state.statement.table, 'name', None)
+    if table_name is None or table_name in EXCLUDED_TABLES:
+        return
+    orm_execute_state.session.connection().execute(insert(models.ChangeLogEntry.__table__), [{
+        'table_name': table_name,
+        'row_id': None,
+        'operation': 'reset',
+        'data': None,
+        'created_at': datetime.utcnow(),
+    }])
+
+
+def get_changes(db: Session, since: int = 0, limit: int = 1000):
+    """Changes with id > since, oldest first.
+
+    `reset` is true when entries after `since` were already compacted away (or the
+    cursor is from another database); the client must then reload everything and
+    continue from `next_cursor`. `latest_cursor` is the newest id, where a client
+    that has just loaded everything can start.
+    """
+    Entry = models.ChangeLogEntry
+    oldest, latest = db.query(func.min(Entry.id), func.max(Entry.id)).one()
+    latest = latest or 0
+    if since > latest or (oldest is not None and since < oldest - 1):
+        return {'changes': [], 'next_cursor': latest, 'latest_cursor': latest, 'has_more': False, 'reset': True}
+
+    rows = db.query(Entry).filter(Entry.id > since).order_by(Entry.id).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        'changes': [
+            {
+                'id': row.id,
+                'table': row.table_name,
+                'row_id': row.row_id,
+                'operation': row.operation,
+                'data': row.data,
+                'created_at': row.created_at,
+            }
+            for row in rows
+        ],
+        'next_cursor': rows[-1].id if rows else since,
+        'latest_cursor': latest,
+        'has_more': has_more,
+        'reset': False,
+    }
+
+
+def compact(db: Session, retention_days: int = None, max_entries: int = None):
+    """Apply the retention policy: drop entries older than `retention_days` and all but the
+    newest `max_entries`. The newest entry is always kept so cursors stay comparable."""
+    retention_days = settings.CHANGE_LOG_RETENTION_DAYS if retention_days is None else retention_days
+    max_entries = settings.CHANGE_LOG_MAX_ENTRIES if max_entries is None else max_entries
+    Entry = models.ChangeLogEntry
+    latest = db.query(func.max(Entry.id)).scalar()
+    if latest is None:
+        return 0
+
+    cutoff_id = latest - max(max_entries, 1)
+    expired = datetime.utcnow() - timedelta(days=retention_days)
+    deleted = db.query(Entry).filter(
+        Entry.id < latest,
+        (Entry.id <= cutoff_id) | (Entry.created_at < expired),
+    ).delete(synchronize_session=False)
+    db.commit()
+    return deleted
@@ -1,7 +1,18 @@
+import logging
+from sqlalchemy import bindparam, func, insert, or_, select, update
 from sqlalchemy.orm import Session
+from app.core.versioning import version_keys
+from app.services.change_log import EXPLICITLY_LOGGED, record_changes
 from app.models import models
 from app.schemas import schemas
+from app.services.notifications import routine_events
+from app.services.occupancy import occupancy_index, span_end
+from app.services.reference_cache import reference_cache
+from app.services.workload import WorkloadService
 from typing import List, Optional
+from app.core.logging import sampled
+
+logger = logging.getLogger(__name__)
 
 class DepartmentService:
     @staticmethod
@@ -9,12 +20,13 @@ class DepartmentService:
         db_department = models.Department(**department.dict())
         db.add(db_department)
         db.commit()
+        reference_cache.invalidate()
         db.refresh(db_department)
         return db_department
     
     @staticmethod
     def get_all(db: Session, skip: int = 0, limit: int = 100):
-        return db.query(models.Department).offset(skip).limit(limit).all()
+        return reference_cache.get(db).departments[skip:skip + limit]
     
     @staticmethod
     def get_by_id(db: Session, department_id: int):
@@ -28,6 +40,7 @@ class DepartmentService:
             for key, value in update_data.items():
                 setattr(db_department, key, value)
             db.commit()
+            reference_cache.invalidate()
             db.refresh(db_department)
         return db_department
     
@@ -37,6 +50,7 @@ class DepartmentService:
         if db_department:
             db.delete(db_department)
             db.commit()
+            reference_cache.invalidate()
         return db_department
 
 class ProgrammeService:
@@ -45,12 +59,13 @@ class ProgrammeService:
         db_programme = models.Programme(**programme.dict())
         db.add(db_programme)
         db.commit()
+        reference_cache.invalidate()
         db.refresh(db_programme)
         return db_programme
     
     @staticmethod
     def get_all(db: Session, skip: int = 0, limit: int = 100):
-        return db.query(models.Programme).offset(skip).limit(limit).all()
+        return reference_cache.get(db).programmes[skip:skip + limit]
     
     @staticmethod
     def get_by_id(db: Session, programme_id: int):
@@ -58,7 +73,7 @@ class ProgrammeService:
     
     @staticmethod
     def get_by_department(db: Session, department_id: int):
-        return db.query(models.Programme).filter(models.Programme.department_id == department_id).all()
+        return [p for p in reference_cache.get(db).programmes if p['department_id'] == department_id]
     
     @staticmethod
     def update(db: Session, programme_id: int, programme: schemas.ProgrammeUpdate):
@@ -68,6 +83,7 @@ class ProgrammeService:
             for key, value in update_data.items():
                 setattr(db_programme, key, value)
             db.commit()
+            reference_cache.invalidate()
             db.refresh(db_programme)
         return db_programme
     
@@ -77,6 +93,7 @@ class ProgrammeService:
         if db_programme:
             db.delete(db_programme)
             db.commit()
+            reference_cache.invalidate()
         return db_programme
 
 class TeacherService:
@@ -145,6 +162,9 @@ class SubjectService:
                 setattr(db_subject, key, value)
             db.commit()
             db.refresh(db_subject)
+            if 'name' in update_data:
+                # teacher_loads rows are keyed by subject name
+                WorkloadService.rebuild(db)
         return db_subject
     
     @staticmethod
@@ -153,6 +173,7 @@ class SubjectService:
         if db_subject:
             db.delete(db_subject)
             db.commit()
+            WorkloadService.rebuild(db)
         return db_subject
 
 class ClassService:
@@ -314,12 +335,13 @@ class RoomService:
         db_room = models.Room(**room.dict())
         db.add(db_room)
         db.commit()
+        reference_cache.invalidate()
         db.refresh(db_room)
         return db_room
     
     @staticmethod
     def get_all(db: Session, skip: int = 0, limit: int = 100):
-        return db.query(models.Room).order_by(models.Room.room_number).offset(skip).limit(limit).all()
+        return reference_cache.get(db).rooms[skip:skip + limit]
     
     @staticmethod
     def get_by_id(db: Session, room_id: int):
@@ -333,6 +355,7 @@ class RoomService:
             for key, value in update_data.items():
                 setattr(db_room, key, value)
             db.commit()
+            reference_cache.invalidate()
             db.refresh(db_room)
         return db_room
     
@@ -342,6 +365,7 @@ class RoomService:
         if db_room:
             db.delete(db_room)
             db.commit()
+            reference_cache.invalidate()
         return db_room
 
 class DayService:
@@ -350,12 +374,13 @@ class DayService:
         db_day = models.Day(**day.dict())
         db.add(db_day)
         db.commit()
+        reference_cache.invalidate()
         db.refresh(db_day)
         return db_day
     
     @staticmethod
     def get_all(db: Session, skip: int = 0, limit: int = 100):
-        return db.query(models.Day).order_by(models.Day.order).offset(skip).limit(limit).all()
+        return reference_cache.get(db).days[skip:skip + limit]
     
     @staticmethod
     def get_by_id(db: Session, day_id: int):
@@ -369,6 +394,7 @@ class DayService:
             for key, value in update_data.items():
                 setattr(db_day, key, value)
             db.commit()
+            reference_cache.invalidate()
             db.refresh(db_day)
         return db_day
     
@@ -378,6 +404,7 @@ class DayService:
         if db_day:
             db.delete(db_day)
             db.commit()
+            reference_cache.invalidate()
         return db_day
 
 class PeriodService:
@@ -386,12 +413,13 @@ class PeriodService:
         db_period = models.Period(**period.dict())
         db.add(db_period)
         db.commit()
+        reference_cache.invalidate()
         db.refresh(db_period)
         return db_period
     
     @staticmethod
     def get_all(db: Session, skip: int = 0, limit: int = 100):
-        return db.query(models.Period).order_by(models.Period.order).offset(skip).limit(limit).all()
+        return reference_cache.get(db).periods[skip:skip + limit]
     
     @staticmethod
     def get_by_id(db: Session, period_id: int):
@@ -405,7 +433,10 @@ class PeriodService:
             for key, value in update_data.items():
                 setattr(db_period, key, value)
             db.commit()
+            reference_cache.invalidate()
             db.refresh(db_period)
+            # Period orders are denormalized into routine_entry_teachers spans
+            ClassRoutineService.rebuild_entry_teachers(db)
         return db_period
     
     @staticmethod
@@ -414,6 +445,8 @@ class PeriodService:
         if db_period:
             db.delete(db_period)
             db.commit()
+            reference_cache.invalidate()
+            ClassRoutineService.rebuild_entry_teachers(db)
         return db_period
 
 class TeacherSubjectService:
@@ -475,48 +508,278 @@ class TeacherSubjectService:
         return [ts.teacher for ts in teacher_subjects]
 
 class ClassRoutineService:
+    # Columns that identify a stored entry when diffing a save, and the ones compared for updates
+    ENTRY_KEY_FIELDS = ('day_id', 'period_id', 'subject_id', 'group', 'lab_group_id')
+    ENTRY_VALUE_FIELDS = (
+        'is_lab', 'is_half_lab', 'num_periods',
+        'lead_teacher_id', 'assist_teacher_1_id', 'assist_teacher_2_id', 'assist_teacher_3_id',
+        'lab_room',
+    )
+    
     @staticmethod
-    def save_routine(db: Session, class_id: int, routine_entries: List[dict], room_no: str = None):
-        """Save or update routine for a class"""
-        # Update the class's room_no if provided
-        if room_no is not None:
-            class_obj = db.query(models.Class).filter(models.Class.id == class_id).first()
-            if class_obj:
-                class_obj.room_no = room_no
-        
-        # Delete existing routine entries for this class
-        db.query(models.ClassRoutineEntry).filter(
-            models.ClassRoutineEntry.class_id == class_id
-        ).delete()
+    def _entry_values(class_id: int, entry_data: dict):
+        """Column values for a routine entry posted by the frontend"""
+        return {
+            'class_id': class_id,
+            'day_id': entry_data['dayId'],
+            'period_id': entry_data['periodId'],
+            'subject_id': entry_data['subject_id'],
+            'is_lab': entry_data.get('is_lab', False),
+            'is_half_lab': entry_data.get('is_half_lab', False),
+            'num_periods': entry_data.get('num_periods', 1),
+            'lead_teacher_id': entry_data.get('lead_teacher_id'),
+            'assist_teacher_1_id': entry_data.get('assist_teacher_1_id'),
+            'assist_teacher_2_id': entry_data.get('assist_teacher_2_id'),
+            'assist_teacher_3_id': entry_data.get('assist_teacher_3_id'),
+            'group': entry_data.get('group'),
+            'lab_room': entry_data.get('lab_room'),
+            'lab_group_id': entry_data.get('lab_group_id'),
+        }
+    
+    @staticmethod
+    def _apply_routines(db: Session, routines: List[dict]):
+        """Write class routines as diffs against the stored entries, without committing.
         
-        # Create new entries
-        created_entries = []
-        for entry_data in routine_entries:
-            # Skip continuation entries (they're handled by num_periods)
-            if entry_data.get('isContinuation'):
-                continue
+        `routines` is a list of {'class_id', 'entries', 'room_no'} dicts. Stored and posted
+        entries are matched per class on (day, period, subject, group, lab_group_id); only new,
+        changed and removed entries are written, each kind in one executemany statement
+        covering every class (inserts go one by one on databases without INSERT ... RETURNING).
+        Returns inserted/updated/deleted/unchanged counts per class.
+        """
+        Entry = models.ClassRoutineEntry
+        class_ids = [routine['class_id'] for routine in routines]
+        
+        # Update each class's room_no if provided
+        room_numbers = {
+            routine['class_id']: routine['room_no'] for routine in routines if routine.get('room_no') is not None
+        }
+        if room_numbers:
+            for class_obj in db.query(models.Class).filter(models.Class.id.in_(room_numbers)).all():
+                class_obj.room_no = room_numbers[class_obj.id]
+        
+        key_columns = [getattr(Entry, field) for field in ClassRoutineService.ENTRY_KEY_FIELDS]
+        value_columns = [getattr(Entry, field) for field in ClassRoutineService.ENTRY_VALUE_FIELDS]
+        stored = {}
+        for row in db.query(Entry.id, Entry.class_id, *key_columns, *value_columns).filter(
+            Entry.class_id.in_(class_ids)
+        ).order_by(Entry.id):
+            key = tuple(getattr(row, field) for field in ClassRoutineService.ENTRY_KEY_FIELDS)
+            stored.setdefault((row.class_id, key), []).append(row)
+        
+        to_insert = []
+        to_update = []
+        replaced = []  # Stored versions of updated and deleted entries
+        summary = {class_id: {'inserted': 0, 'updated': 0, 'deleted': 0, 'unchanged': 0} for class_id in class_ids}
+        for routine in routines:
+            class_id = routine['class_id']
+            counts = summary[class_id]
+            for entry_data in routine['entries']:
+                # Skip continuation entries (they're handled by num_periods)
+                if entry_data.get('isContinuation'):
+                    continue
+                
+                values = ClassRoutineService._entry_values(class_id, entry_data)
+                key = tuple(values[field] for field in ClassRoutineService.ENTRY_KEY_FIELDS)
+                matches = stored.get((class_id, key))
+                if not matches:
+                    to_insert.append(values)
+                    counts['inserted'] += 1
+                    continue
                 
-            entry = models.ClassRoutineEntry(
-                class_id=class_id,
-                day_id=entry_data['dayId'],
-                period_id=entry_data['periodId'],
-                subject_id=entry_data['subject_id'],
-                is_lab=entry_data.get('is_lab', False),
-                is_half_lab=entry_data.get('is_half_lab', False),
-                num_periods=entry_data.get('num_periods', 1),
-                lead_teacher_id=entry_data.get('lead_teacher_id'),
-                assist_teacher_1_id=entry_data.get('assist_teacher_1_id'),
-                assist_teacher_2_id=entry_data.get('assist_teacher_2_id'),
-                assist_teacher_3_id=entry_data.get('assist_teacher_3_id'),
-                group=entry_data.get('group'),
-                lab_room=entry_data.get('lab_room'),
-                lab_group_id=entry_data.get('lab_group_id'),
+                current = matches.pop(0)
+                if all(getattr(current, field) == values[field] for field in ClassRoutineService.ENTRY_VALUE_FIELDS):
+                    counts['unchanged'] += 1
+                else:
+                    to_update.append({'id': current.id, **values})
+                    replaced.append(current._asdict())
+                    counts['updated'] += 1
+        
+        to_delete = []
+        for (class_id, _), rows in stored.items():
+            to_delete.extend(row.id for row in rows)
+            replaced.extend(row._asdict() for row in rows)
+            summary[class_id]['deleted'] += len(rows)
+        
+        # Teacher rows of changed and removed entries are rewritten below
+        stale_ids = to_delete + [values['id'] for values in to_update]
+        touched = {**version_keys(*class_ids), **EXPLICITLY_LOGGED}
+        if stale_ids:
+            db.query(models.RoutineEntryTeacher).filter(
+                models.RoutineEntryTeacher.entry_id.in_(stale_ids)
+            ).execution_options(**touched).delete(synchronize_session=False)
+        if to_delete:
+            db.query(Entry).filter(Entry.id.in_(to_delete)).execution_options(**touched).delete(
+                synchronize_session=False
             )
-            db.add(entry)
-            created_entries.append(entry)
+        if to_update:
+            db.execute(update(Entry), to_update, execution_options=touched)
+        if to_insert:
+            if db.get_bind().dialect.insert_executemany_returning_sort_by_parameter_order:
+                new_ids = db.scalars(
+                    insert(Entry).returning(Entry.id, sort_by_parameter_order=True), to_insert,
+                    execution_options=touched,
+                ).all()
+            else:
+                # No INSERT ... RETURNING (SQLite before 3.35): one statement per entry
+                new_ids = [
+                    db.execute(insert(Entry).values(values), execution_options=touched).inserted_primary_key[0]
+                    for values in to_insert
+                ]
+            for values, new_id in zip(to_insert, new_ids):
+                values['id'] = new_id
+        
+        record_changes(db, Entry.__tablename__, 'delete', to_delete)
+        record_changes(db, Entry.__tablename__, 'update', to_update)
+        record_changes(db, Entry.__tablename__, 'insert', to_insert)
         
+        ClassRoutineService._insert_entry_teachers(db, to_update + to_insert)
+        WorkloadService.apply_entry_changes(db, replaced, to_update + to_insert)
+        
+        return summary
+    
+    @staticmethod
+    def save_routine(db: Session, class_id: int, routine_entries: List[dict], room_no: str = None):
+        """Save or update routine for a class; returns inserted/updated/deleted/unchanged counts"""
+        summary = ClassRoutineService._apply_routines(db, [
+            {'class_id': class_id, 'entries': routine_entries, 'room_no': room_no}
+        ])
         db.commit()
-        return created_entries
+        occupancy_index.refresh_class(db, class_id)
+        routine_events.publish_class(class_id, occupancy_index.class_bookings(class_id))
+        return summary[class_id]
+    
+    @staticmethod
+    def save_routines_bulk(db: Session, routines: List[dict]):
+        """Save routines for many classes in one transaction: either all of them commit or none do"""
+        try:
+            summary = ClassRoutineService._apply_routines(db, routines)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        for class_id in summary:
+            occupancy_index.refresh_class(db, class_id)
+            routine_events.publish_class(class_id, occupancy_index.class_bookings(class_id))
+        return summary
+    
+    @staticmethod
+    def check_bulk_conflicts(db: Session, routines: List[dict]):
+        """Find teacher double-bookings a bulk save would create.
+        
+        Posted entries are checked against each other across classes, and against the
+        stored routines of every class that is not part of the batch.
+        """
+        period_order_map = ClassRoutineService._get_period_order_map(db)
+        batch_class_ids = {routine['class_id'] for routine in routines}
+        occupancy_index.ensure_built(db)
+        
+        # (teacher_id, day_id) -> [(start_order, end_order, class_id, entry)]
+        bookings = {}
+        for routine in routines:
+            for entry_data in routine['entries']:
+                if entry_data.get('isContinuation'):
+                    continue
+                values = ClassRoutineService._entry_values(routine['class_id'], entry_data)
+                start_order = period_order_map.get(values['period_id'])
+                if start_order is None:
+                    continue
+                end_order = span_end(start_order, values['num_periods'])
+                for teacher_id in {values[slot] for slot in ClassRoutineService.TEACHER_SLOTS} - {None}:
+                    bookings.setdefault((teacher_id, values['day_id']), []).append(
+                        (start_order, end_order, routine['class_id'], values)
+                    )
+        
+        conflicts = []
+        for (teacher_id, day_id), spans in bookings.items():
+            # Against other posted classes
+            for i, (start, end, class_id, values) in enumerate(spans):
+                for other_start, other_end, other_class_id, other_values in spans[i + 1:]:
+                    if other_class_id != class_id and start <= other_end and other_start <= end:
+                        conflicts.append({
+                            'teacher_id': teacher_id,
+                            'day_id': day_id,
+                            'class_id': class_id,
+                            'period_order': f"{start}-{end}" if end > start else str(start),
+                            'conflicting_class_id': other_class_id,
+                            'conflicting_period_order': f"{other_start}-{other_end}" if other_end > other_start else str(other_start),
+                        })
+                
+                # Against stored routines outside the batch
+                for entry_id, other_start, other_end in occupancy_index.find_conflicts(
+                    teacher_id, day_id, start, end, exclude_class_ids=batch_class_ids
+                ):
+                    conflicts.append({
+                        'teacher_id': teacher_id,
+                        'day_id': day_id,
+                        'class_id': class_id,
+                        'period_order': f"{start}-{end}" if end > start else str(start),
+                        'conflicting_entry_id': entry_id,
+                        'conflicting_period_order': f"{other_start}-{other_end}" if other_end > other_start else str(other_start),
+                    })
+        
+        return conflicts
+    
+    # Teacher slots on a routine entry and their role in routine_entry_teachers
+    TEACHER_SLOTS = ('lead_teacher_id', 'assist_teacher_1_id', 'assist_teacher_2_id', 'assist_teacher_3_id')
+    TEACHER_ROLES = ('lead', 'assist_1', 'assist_2', 'assist_3')
+    
+    @staticmethod
+    def _get_period_order_map(db: Session):
+        """Map period id to its order"""
+        return reference_cache.get(db).period_order
+    
+    @staticmethod
+    def _insert_entry_teachers(db: Session, entries, period_order_map: dict = None):
+        """Insert routine_entry_teachers rows for entries given as column-value dicts (including id)"""
+        if period_order_map is None:
+            period_order_map = ClassRoutineService._get_period_order_map(db)
+        
+        rows = []
+        for entry in entries:
+            start_order = period_order_map.get(entry['period_id'])
+            end_order = span_end(start_order, entry['num_periods']) if start_order is not None else None
+            for slot, role in zip(ClassRoutineService.TEACHER_SLOTS, ClassRoutineService.TEACHER_ROLES):
+                teacher_id = entry[slot]
+                if teacher_id is None:
+                    continue
+                rows.append({
+                    'entry_id': entry['id'],
+                    'teacher_id': teacher_id,
+                    'role': role,
+                    'class_id': entry['class_id'],
+                    'day_id': entry['day_id'],
+                    'start_order': start_order,
+                    'end_order': end_order,
+                })
+        
+        if rows:
+            db.execute(
+                insert(models.RoutineEntryTeacher), rows,
+                execution_options=version_keys(*{row['class_id'] for row in rows}),
+            )
+        return len(rows)
+    
+    @staticmethod
+    def rebuild_entry_teachers(db: Session):
+        """Recreate routine_entry_teachers from the teacher columns of every entry"""
+        Entry = models.ClassRoutineEntry
+        db.query(models.RoutineEntryTeacher).delete()
+        entries = db.query(
+            Entry.id, Entry.class_id, Entry.day_id, Entry.period_id, Entry.num_periods,
+            *[getattr(Entry, slot) for slot in ClassRoutineService.TEACHER_SLOTS]
+        ).all()
+        count = ClassRoutineService._insert_entry_teachers(db, [row._asdict() for row in entries])
+        db.commit()
+        occupancy_index.rebuild(db)
+        routine_events.publish_reset('rebuild')
+        return count
+    
+    @staticmethod
+    def _teacher_entry_ids(teacher_id: int):
+        """Subquery of entry ids a teacher is assigned to in any slot"""
+        return select(models.RoutineEntryTeacher.entry_id).where(
+            models.RoutineEntryTeacher.teacher_id == teacher_id
+        )
     
     @staticmethod
     def get_routine_by_class(db: Session, class_id: int):
@@ -553,175 +816,445 @@ class ClassRoutineService:
         return result
     
     @staticmethod
-    def get_all_routines(db: Session):
-        """Get all routine entries with related data"""
-        try:
-            entries = db.query(models.ClassRoutineEntry).all()
-            print(f"Found {len(entries)} routine entries")
+    def _routine_projection_query(db: Session):
+        """Single SELECT over routine entries joined to subject, class, semester and programme"""
+        return db.query(
+            models.ClassRoutineEntry.id,
+            models.ClassRoutineEntry.day_id,
+            models.ClassRoutineEntry.period_id,
+            models.ClassRoutineEntry.class_id,
+            models.ClassRoutineEntry.subject_id,
+            models.ClassRoutineEntry.is_lab,
+            models.ClassRoutineEntry.is_half_lab,
+            models.ClassRoutineEntry.num_periods,
+            models.ClassRoutineEntry.lead_teacher_id,
+            models.ClassRoutineEntry.assist_teacher_1_id,
+            models.ClassRoutineEntry.assist_teacher_2_id,
+            models.ClassRoutineEntry.assist_teacher_3_id,
+            models.ClassRoutineEntry.group,
+            models.ClassRoutineEntry.lab_room,
+            models.ClassRoutineEntry.lab_group_id,
+            models.Subject.id.label('subject_pk'),
+            models.Subject.name.label('subject_name'),
+            models.Subject.code.label('subject_code'),
+            models.Class.id.label('class_pk'),
+            models.Class.name.label('class_name'),
+            models.Class.section.label('class_section'),
+            models.Class.room_no.label('class_room_no'),
+            models.Semester.id.label('semester_pk'),
+            models.Semester.name.label('semester_name'),
+            models.Programme.id.label('programme_pk'),
+            models.Programme.code.label('programme_code'),
+            models.Programme.name.label('programme_name'),
+        ).outerjoin(
+            models.Subject, models.Subject.id == models.ClassRoutineEntry.subject_id
+        ).outerjoin(
+            models.Class, models.Class.id == models.ClassRoutineEntry.class_id
+        ).outerjoin(
+            models.Semester, models.Semester.id == models.Class.semester_id
+        ).outerjoin(
+            models.Programme, models.Programme.id == models.Semester.programme_id
+        ).order_by(models.ClassRoutineEntry.id)
+    
+    @staticmethod
+    def _routine_row_to_dict(row):
+        """Build the get_all_routines response dict from a projection row"""
+        subject_dict = None
+        if row.subject_pk is not None:
+            subject_dict = {
+                'id': row.subject_pk,
+                'name': row.subject_name,
+                'code': row.subject_code,
+            }
+        
+        class_dict = None
+        if row.class_pk is not None:
+            programme_dict = None
+            semester_dict = None
             
-            result = []
-            for entry in entries:
-                try:
-                    class_info = entry.class_
-                    
-                    # Build subject dict
-                    subject_dict = None
-                    if entry.subject:
-                        subject_dict = {
-                            'id': entry.subject.id,
-                            'name': entry.subject.name,
-                            'code': entry.subject.code,
-                        }
-                    
-                    # Build class dict
-                    class_dict = None
-                    if class_info:
-                        programme_dict = None
-                        semester_dict = None
-                        
-                        if class_info.semester:
-                            semester_dict = {'name': class_info.semester.name}
-                            if class_info.semester.programme:
-                                programme_dict = {
-                                    'code': class_info.semester.programme.code,
-                                    'name': class_info.semester.programme.name,
-                                }
-                        
-                        class_dict = {
-                            'id': class_info.id,
-                            'name': class_info.name,
-                            'section': class_info.section,
-                            'room_no': class_info.room_no,
-                            'programme': programme_dict,
-                            'semester': semester_dict,
-                        }
-                    
-                    result.append({
-                        'id': entry.id,
-                        'day_id': entry.day_id,
-                        'period_id': entry.period_id,
-                        'class_id': entry.class_id,
-                        'subject_id': entry.subject_id,
-                        'is_lab': entry.is_lab,
-                        'is_half_lab': entry.is_half_lab,
-                        'num_periods': entry.num_periods,
-                        'lead_teacher_id': entry.lead_teacher_id,
-                        'assist_teacher_1_id': entry.assist_teacher_1_id,
-                        'assist_teacher_2_id': entry.assist_teacher_2_id,
-                        'assist_teacher_3_id': entry.assist_teacher_3_id,
-                        'group': entry.group,
-                        'lab_room': entry.lab_room,
-                        'lab_group_id': entry.lab_group_id,
-                        'subject': subject_dict,
-                        'class': class_dict,
-                    })
-                except Exception as e:
-                    print(f"Error processing entry {entry.id}: {e}")
-                    import traceback
-                    traceback.print_exc()
-                    continue
+            if row.semester_pk is not None:
+                semester_dict = {'name': row.semester_name}
+                if row.programme_pk is not None:
+                    programme_dict = {
+                        'code': row.programme_code,
+                        'name': row.programme_name,
+                    }
             
-            print(f"Returning {len(result)} processed entries")
+            class_dict = {
+                'id': row.class_pk,
+                'name': row.class_name,
+                'section': row.class_section,
+                'room_no': row.class_room_no,
+                'programme': programme_dict,
+                'semester': semester_dict,
+            }
+        
+        return {
+            'id': row.id,
+            'day_id': row.day_id,
+            'period_id': row.period_id,
+            'class_id': row.class_id,
+            'subject_id': row.subject_id,
+            'is_lab': row.is_lab,
+            'is_half_lab': row.is_half_lab,
+            'num_periods': row.num_periods,
+            'lead_teacher_id': row.lead_teacher_id,
+            'assist_teacher_1_id': row.assist_teacher_1_id,
+            'assist_teacher_2_id': row.assist_teacher_2_id,
+            'assist_teacher_3_id': row.assist_teacher_3_id,
+            'group': row.group,
+            'lab_room': row.lab_room,
+            'lab_group_id': row.lab_group_id,
+            'subject': subject_dict,
+            'class': class_dict,
+        }
+    
+    @staticmethod
+    def get_all_routines(db: Session):
+        """Get all routine entries with related data in a single query"""
+        try:
+            rows = ClassRoutineService._routine_projection_query(db).all()
+            result = [ClassRoutineService._routine_row_to_dict(row) for row in rows]
+            logger.debug("Loaded all routine entries", extra={'entries': len(result)})
             return result
-        except Exception as e:
-            print(f"Error in get_all_routines: {e}")
-            import traceback
-            traceback.print_exc()
+        except Exception:
+            logger.exception("Error in get_all_routines")
             return []
     
+    @staticmethod
+    def iter_all_routines(db: Session, batch_size: int = 500):
+        """Yield routine entries in get_all_routines shape, fetching `batch_size` rows at a time"""
+        query = ClassRoutineService._routine_projection_query(db).yield_per(batch_size)
+        for row in query:
+            yield ClassRoutineService._routine_row_to_dict(row)
+    
+    @staticmethod
+    def search_routines(
+        db: Session,
+        programme_id: int = None,
+        semester_id: int = None,
+        department_id: int = None,
+        class_id: int = None,
+        day_id: int = None,
+        period_from: int = None,
+        period_to: int = None,
+        teacher_id: int = None,
+        subject_id: int = None,
+        is_lab: bool = None,
+        lab_room: str = None,
+        after_id: int = None,
+        limit: int = 100,
+    ):
+        """Filter routine entries with keyset pagination on entry id.
+        
+        period_from/period_to are period orders (inclusive); an entry matches when
+        any period it spans (num_periods, NULL counting as one) falls inside the range. Returns a tuple of
+        (entries, next_cursor) where next_cursor is None on the last page.
+        """
+        Entry = models.ClassRoutineEntry
+        query = ClassRoutineService._routine_projection_query(db)
+        
+        if programme_id is not None:
+            query = query.filter(models.Semester.programme_id == programme_id)
+        if semester_id is not None:
+            query = query.filter(models.Class.semester_id == semester_id)
+        if department_id is not None:
+            query = query.filter(models.Class.department_id == department_id)
+        if class_id is not None:
+            query = query.filter(Entry.class_id == class_id)
+        if day_id is not None:
+            query = query.filter(Entry.day_id == day_id)
+        if period_from is not None or period_to is not None:
+            query = query.join(models.Period, models.Period.id == Entry.period_id)
+            if period_to is not None:
+                query = query.filter(models.Period.order <= period_to)
+            if period_from is not None:
+                query = query.filter(models.Period.order + func.coalesce(Entry.num_periods, 1) - 1 >= period_from)
+        if teacher_id is not None:
+            query = query.filter(Entry.id.in_(ClassRoutineService._teacher_entry_ids(teacher_id)))
+        if subject_id is not None:
+            query = query.filter(Entry.subject_id == subject_id)
+        if is_lab is not None:
+            query = query.filter(Entry.is_lab == is_lab)
+        if lab_room is not None:
+            query = query.filter(Entry.lab_room == lab_room)
+        if after_id is not None:
+            query = query.filter(Entry.id > after_id)
+        
+        # Fetch one extra row to know whether another page exists
+        rows = query.limit(limit + 1).all()
+        next_cursor = rows[limit - 1].id if len(rows) > limit else None
+        entries = [ClassRoutineService._routine_row_to_dict(row) for row in rows[:limit]]
+        return entries, next_cursor
+    
+    @staticmethod
+    def get_teacher_timetables(db: Session, teacher_id: int = None):
+        """Build day x period timetables for one teacher (or all teachers) in a single pass.
+        
+        Cells are keyed "<day_id>-<period_id>" like TeacherRoutine.jsx. Load is 1.0 per
+        theory period and 0.8 per lab period; partners are the other teachers on a lab entry.
+        """
+        Entry = models.ClassRoutineEntry
+        entry_query = ClassRoutineService._routine_projection_query(db)
+        if teacher_id is not None:
+            entry_query = entry_query.filter(Entry.id.in_(ClassRoutineService._teacher_entry_ids(teacher_id)))
+        else:
+            entry_query = entry_query.filter(or_(
+                Entry.lead_teacher_id.isnot(None),
+                Entry.assist_teacher_1_id.isnot(None),
+                Entry.assist_teacher_2_id.isnot(None),
+                Entry.assist_teacher_3_id.isnot(None),
+            ))
+        
+        # All teachers are needed to name lab partners, even for a single timetable
+        teachers = db.query(models.Teacher).order_by(models.Teacher.id).all()
+        abbreviations = {teacher.id: teacher.abbreviation or teacher.name for teacher in teachers}
+        timetables = {
+            teacher.id: {
+                'teacher_id': teacher.id,
+                'teacher_name': teacher.name,
+                'abbreviation': teacher.abbreviation,
+                'department_id': teacher.department_id,
+                'total_load': 0.0,
+                'routine': {},
+            }
+            for teacher in teachers
+            if teacher_id is None or teacher.id == teacher_id
+        }
+        
+        for row in entry_query:
+            slot_teachers = [getattr(row, slot) for slot in ClassRoutineService.TEACHER_SLOTS]
+            num_periods = row.num_periods or 1
+            key = f"{row.day_id}-{row.period_id}"
+            
+            for member_id in dict.fromkeys(t for t in slot_teachers if t is not None):
+                timetable = timetables.get(member_id)
+                if timetable is None:
+                    continue
+                
+                partner_ids = []
+                if row.is_lab:
+                    partner_ids = [t for t in slot_teachers if t is not None and t != member_id]
+                
+                timetable['total_load'] += num_periods * 0.8 if row.is_lab else num_periods * 1.0
+                timetable['routine'][key] = {
+                    'entry_id': row.id,
+                    'class_id': row.class_id,
+                    'subject_name': row.subject_name or 'N/A',
+                    'subject_code': row.subject_code or '',
+                    'class_name': row.class_name or 'N/A',
+                    'section': row.class_section or '',
+                    'room_no': row.class_room_no or '',
+                    'is_lab': row.is_lab,
+                    'num_periods': num_periods,
+                    'role': 'Lead' if row.lead_teacher_id == member_id else 'Assistant',
+                    'partner_ids': partner_ids,
+                    'partner_names': [abbreviations.get(t, 'Unknown') for t in partner_ids],
+                    'programme_code': row.programme_code or '',
+                    'semester_name': row.semester_name or '',
+                }
+        
+        for timetable in timetables.values():
+            timetable['total_load'] = round(timetable['total_load'], 2)
+        
+        return list(timetables.values())
+    
     @staticmethod
     def delete_routine(db: Session, class_id: int):
         """Delete all routine entries for a class"""
+        db.query(models.RoutineEntryTeacher).filter(
+            models.RoutineEntryTeacher.class_id == class_id
+        ).execution_options(**version_keys(class_id)).delete()
+        Entry = models.ClassRoutineEntry
+        entries = [row._asdict() for row in db.query(
+            Entry.id, Entry.subject_id, Entry.is_lab, Entry.is_half_lab, Entry.num_periods,
+            *[getattr(Entry, slot) for slot in ClassRoutineService.TEACHER_SLOTS]
+        ).filter(Entry.class_id == class_id)]
+        entry_ids = [entry['id'] for entry in entries]
         db.query(models.ClassRoutineEntry).filter(
             models.ClassRoutineEntry.class_id == class_id
-        ).delete()
+        ).execution_options(**version_keys(class_id), **EXPLICITLY_LOGGED).delete()
+        record_changes(db, models.ClassRoutineEntry.__tablename__, 'delete', entry_ids)
+        WorkloadService.apply_entry_changes(db, entries, [])
         db.commit()
+        occupancy_index.remove_class(class_id)
+        routine_events.publish_class(class_id, [])
         return True
     
     @staticmethod
     def check_teacher_conflicts(db: Session, teacher_id: int, day_id: int, period_ids: list, exclude_class_id: int = None):
         """Check if a teacher has conflicts in the given time slots (including multi-period overlaps)"""
-        print(f"Checking conflicts for teacher {teacher_id}, day {day_id}, periods {period_ids}, exclude_class {exclude_class_id}")
-        
-        # Get all periods ordered by their order to calculate ranges
-        all_periods = db.query(models.Period).order_by(models.Period.order).all()
-        period_order_map = {p.id: p.order for p in all_periods}
-        
-        # Calculate the range of periods being checked (min to max)
-        if not period_ids:
-            return {'has_conflict': False, 'conflicts': []}
-            
-        checked_orders = [period_order_map.get(pid) for pid in period_ids if pid in period_order_map]
-        if not checked_orders:
-            return {'has_conflict': False, 'conflicts': []}
-            
-        min_checked_order = min(checked_orders)
-        max_checked_order = max(checked_orders)
-        
-        print(f"Checking period range: {min_checked_order} to {max_checked_order}")
-        
-        # Find all assignments for this teacher on this day
-        query = db.query(models.ClassRoutineEntry).filter(
-            models.ClassRoutineEntry.day_id == day_id
-        ).filter(
-            (models.ClassRoutineEntry.lead_teacher_id == teacher_id) |
-            (models.ClassRoutineEntry.assist_teacher_1_id == teacher_id) |
-            (models.ClassRoutineEntry.assist_teacher_2_id == teacher_id) |
-            (models.ClassRoutineEntry.assist_teacher_3_id == teacher_id)
-        )
+        result = ClassRoutineService.check_teacher_conflicts_batch(db, [{
+            'teacher_id': teacher_id,
+            'day_id': day_id,
+            'period_ids': period_ids,
+            'exclude_class_id': exclude_class_id,
+        }])[0]
+        return {'has_conflict': result['has_conflict'], 'conflicts': result['conflicts']}
+    
+    @staticmethod
+    def check_teacher_conflicts_batch(db: Session, probes: List[dict]):
+        """Check many (teacher_id, day_id, period_ids, exclude_class_id) probes at once.
         
-        if exclude_class_id:
-            query = query.filter(models.ClassRoutineEntry.class_id != exclude_class_id)
+        Each probe is answered from the occupancy index using the min..max order of its
+        periods; class and subject names for all conflicts are fetched with one query.
+        Results are returned in probe order.
+        """
+        period_order_map = reference_cache.get(db).period_order
         
-        all_assignments = query.all()
-        print(f"Found {len(all_assignments)} existing assignments for this teacher on this day")
+        occupancy_index.ensure_built(db)
         
-        conflicts = []
-        for assignment in all_assignments:
-            assignment_period_order = period_order_map.get(assignment.period_id)
-            if assignment_period_order is None:
+        overlaps_per_probe = []
+        for probe in probes:
+            checked_orders = [
+                period_order_map[pid] for pid in (probe.get('period_ids') or []) if pid in period_order_map
+            ]
+            if not checked_orders:
+                overlaps_per_probe.append([])
                 continue
-                
-            # Calculate the range this assignment covers
-            assignment_start = assignment_period_order
-            assignment_end = assignment_period_order + (assignment.num_periods - 1)
-            
-            print(f"Checking assignment: period {assignment_period_order}, num_periods {assignment.num_periods}, range {assignment_start}-{assignment_end}")
             
-            # Check if ranges overlap
-            # Two ranges overlap if: start1 <= end2 AND start2 <= end1
-            if assignment_start <= max_checked_order and min_checked_order <= assignment_end:
-                print(f"CONFLICT DETECTED: Assignment range {assignment_start}-{assignment_end} overlaps with checked range {min_checked_order}-{max_checked_order}")
-                conflicts.append(assignment)
-            else:
-                print(f"No overlap: Assignment range {assignment_start}-{assignment_end} does not overlap with {min_checked_order}-{max_checked_order}")
+            # Overlapping bookings come from the in-memory occupancy bitmasks
+            overlaps_per_probe.append(occupancy_index.find_conflicts(
+                probe['teacher_id'], probe['day_id'], min(checked_orders), max(checked_orders),
+                probe.get('exclude_class_id')
+            ))
         
-        print(f"Total conflicts found: {len(conflicts)}")
+        # The routine tables are only read to describe conflicts that were found
+        conflict_entry_ids = {entry_id for overlaps in overlaps_per_probe for entry_id, _, _ in overlaps}
+        names = {}
+        if conflict_entry_ids:
+            names = {
+                row.id: row for row in db.query(
+                    models.ClassRoutineEntry.id,
+                    models.Class.name.label('class_name'),
+                    models.Subject.name.label('subject_name'),
+                ).outerjoin(
+                    models.Class, models.Class.id == models.ClassRoutineEntry.class_id
+                ).outerjoin(
+                    models.Subject, models.Subject.id == models.ClassRoutineEntry.subject_id
+                ).filter(
+                    models.ClassRoutineEntry.id.in_(conflict_entry_ids)
+                ).all()
+            }
         
-        if conflicts:
+        results = []
+        for probe, overlaps in zip(probes, overlaps_per_probe):
             conflict_details = []
-            for conflict in conflicts:
-                class_info = db.query(models.Class).filter(models.Class.id == conflict.class_id).first()
-                period_info = db.query(models.Period).filter(models.Period.id == conflict.period_id).first()
-                subject_info = conflict.subject
-                
-                conflict_period_order = period_order_map.get(conflict.period_id, 0)
-                conflict_range = f"{conflict_period_order}-{conflict_period_order + conflict.num_periods - 1}" if conflict.num_periods > 1 else str(conflict_period_order)
-                
-                print(f"Conflict: class={class_info.name if class_info else 'Unknown'}, period range={conflict_range}, subject={subject_info.name if subject_info else 'Unknown'}")
-                
+            for entry_id, start_order, end_order in overlaps:
+                row = names.get(entry_id)
+                conflict_range = f"{start_order}-{end_order}" if end_order > start_order else str(start_order)
                 conflict_details.append({
-                    'class_name': class_info.name if class_info else 'Unknown',
+                    'class_name': row.class_name if row and row.class_name else 'Unknown',
                     'period_order': conflict_range,
-                    'subject_name': subject_info.name if subject_info else 'Unknown',
+                    'subject_name': row.subject_name if row and row.subject_name else 'Unknown',
                 })
             
-            return {
-                'has_conflict': True,
-                'conflicts': conflict_details
-            }
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Teacher conflict check", extra=sampled(
+                    teacher_id=probe['teacher_id'], day_id=probe['day_id'],
+                    period_ids=probe.get('period_ids'), exclude_class_id=probe.get('exclude_class_id'),
+                    conflicts=len(conflict_details),
+                ))
+            
+            results.append({
+                'teacher_id': probe['teacher_id'],
+                'day_id': probe['day_id'],
+                'period_ids': probe.get('period_ids') or [],
+                'exclude_class_id': probe.get('exclude_class_id'),
+                'has_conflict': bool(conflict_details),
+                'conflicts': conflict_details,
+            })
         
-        return {'has_conflict': False, 'conflicts': []}
+        return results
+
+
+# Generic bulk upsert
+# SQLite before 3.32 allows at most 999 bound parameters per statement
+MAX_BOUND_PARAMETERS = 999
+
+
+def _chunks(items: list, size: int):
+    """`items` in consecutive slices of at most `size`"""
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def _dialect_insert(db: Session, model):
+    """INSERT construct with ON CONFLICT support for the session's database, or None when
+    the database has none (SQLite before 3.24)"""
+    dialect = db.get_bind().dialect
+    if dialect.name == 'sqlite':
+        if dialect.server_version_info and dialect.server_version_info < (3, 24):
+            return None
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    elif dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        return None
+    return dialect_insert(model)
+
+
+def bulk_upsert(db: Session, model, rows: List[dict], key: str, update_columns: Optional[List[str]] = None):
+    """Insert or update `rows` (column dicts) of `model`, matched on the unique column `key`.
+
+    An existence check (key IN ...), INSERT ... ON CONFLICT DO UPDATE statements and
+    one commit. Statements are split to stay within MAX_BOUND_PARAMETERS, so a batch
+    takes a handful of statements however many rows it has. On databases without
+    ON CONFLICT, new rows go in one executemany INSERT and existing ones in one
+    executemany UPDATE instead. Rows sharing a key collapse to the last one.
+    `update_columns` defaults to every column given in the rows except `key`.
+    Returns the stored objects in input order.
+    """
+    if not rows:
+        return []
+    column = getattr(model, key)
+    by_key = {row[key]: row for row in rows}
+    keys = list(by_key)
+    key_chunks = _chunks(keys, MAX_BOUND_PARAMETERS)
+    if update_columns is None:
+        update_columns = [name for name in rows[0] if name != key]
+
+    existing = set()
+    for chunk in key_chunks:
+        existing.update(db.scalars(select(column).where(column.in_(chunk))))
+    insert_stmt = _dialect_insert(db, model)
+    if insert_stmt is not None:
+        rows_per_statement = max(1, MAX_BOUND_PARAMETERS // len(rows[0]))
+        for chunk in _chunks(list(by_key.values()), rows_per_statement):
+            stmt = insert_stmt.values(chunk)
+            if update_columns:
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[key],
+                    set_={name: stmt.excluded[name] for name in update_columns},
+                )
+            else:
+                stmt = stmt.on_conflict_do_nothing(index_elements=[key])
+            db.execute(stmt, execution_options=EXPLICITLY_LOGGED)
+    else:
+        new_rows = [row for k, row in by_key.items() if k not in existing]
+        if new_rows:
+            db.execute(insert(model), new_rows, execution_options=EXPLICITLY_LOGGED)
+        if update_columns and existing:
+            stmt = update(model.__table__).where(column == bindparam('_key')).values(
+                {name: bindparam(f'_{name}') for name in update_columns}
+            )
+            db.execute(stmt, [
+                {'_key': k, **{f'_{name}': row[name] for name in update_columns}}
+                for k, row in by_key.items() if k in existing
+            ], execution_options=EXPLICITLY_LOGGED)
+
+    stored = [
+        row._asdict() for chunk in key_chunks
+        for row in db.query(*model.__table__.columns).filter(column.in_(chunk)).all()
+    ]
+    record_changes(db, model.__tablename__, 'insert', [row for row in stored if row[key] not in existing])
+    record_changes(db, model.__tablename__, 'update', [row for row in stored if row[key] in existing])
+    db.commit()
+
+    objects = {
+        getattr(obj, key): obj for chunk in key_chunks
+        for obj in db.query(model).filter(column.in_(chunk)).all()
+    }
+    return [objects[k] for k in keys]
 
 
 # Position Rate CRUD operations
@@ -735,31 +1268,7 @@ def get_position_rate_by_position(db: Session, position: str):
 
 def create_or_update_position_rates(db: Session, rates: List[schemas.PositionRateCreate]):
     """Create or update multiple position rates"""
-    result = []
-    for rate_data in rates:
-        # Check if position rate already exists
-        existing_rate = db.query(models.PositionRate).filter(
-            models.PositionRate.position == rate_data.position
-        ).first()
-        
-        if existing_rate:
-            # Update existing rate
-            existing_rate.rate = rate_data.rate
-            db.commit()
-            db.refresh(existing_rate)
-            result.append(existing_rate)
-        else:
-            # Create new rate
-            new_rate = models.PositionRate(
-                position=rate_data.position,
-                rate=rate_data.rate
-            )
-            db.add(new_rate)
-            db.commit()
-            db.refresh(new_rate)
-            result.append(new_rate)
-    
-    return result
+    return bulk_upsert(db, models.PositionRate, [rate.dict() for rate in rates], key='position')
 
 def delete_position_rate(db: Session, position: str):
     """Delete a position rate"""
@@ -783,33 +1292,7 @@ def get_effective_load_by_teacher(db: Session, teacher_id: int):
 
 def create_or_update_effective_loads(db: Session, loads: List[schemas.TeacherEffectiveLoadCreate]):
     """Create or update multiple teacher effective loads"""
-    result = []
-    for load_data in loads:
-        # Check if effective load already exists for this teacher
-        existing_load = db.query(models.TeacherEffectiveLoad).filter(
-            models.TeacherEffectiveLoad.teacher_id == load_data.teacher_id
-        ).first()
-        
-        if existing_load:
-            # Update existing load
-            existing_load.effective_load = load_data.effective_load
-            existing_load.position = load_data.position
-            db.commit()
-            db.refresh(existing_load)
-            result.append(existing_load)
-        else:
-            # Create new load
-            new_load = models.TeacherEffectiveLoad(
-                teacher_id=load_data.teacher_id,
-                effective_load=load_data.effective_load,
-                position=load_data.position
-            )
-            db.add(new_load)
-            db.commit()
-            db.refresh(new_load)
-            result.append(new_load)
-    
-    return result
+    return bulk_upsert(db, models.TeacherEffectiveLoad, [load.dict() for load in loads], key='teacher_id')
 
 def delete_effective_load(db: Session, teacher_id: int):
     """Delete a teacher effective load"""
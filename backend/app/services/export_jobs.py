@@ -0,0 +1,259 @@
+"""Background export jobs.
+
+POST /exports/jobs/ queues an export and returns at once; a bounded thread
+pool (EXPORT_WORKERS) renders it while the client polls GET /exports/jobs/{id}/
+for progress, then downloads the file. Large exports no longer hold a request
+worker for their whole run.
+
+Finished files are cached in EXPORT_CACHE_DIR under a key made of the export
+type, its parameters and the data version: the id of the newest change_log
+entry, which every write made through the API advances and which survives
+restarts. Asking again for an export with no changes in between is answered
+from the cache without rendering, and asking for one that is still being
+rendered joins the running job. Only the newest EXPORT_CACHE_MAX_FILES files
+are kept.
+
+Writes made outside the API (scripts, direct SQL) do not advance the version;
+clear the cache directory after them. Jobs themselves live in process memory.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Callable, Dict, Optional
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models import models
+from app.services.exports import ExportService
+from app.services.payroll import PayrollService
+
+logger = logging.getLogger(__name__)
+
+# Finished jobs remembered for polling and download
+MAX_FINISHED_JOBS = 200
+
+
+def _write_payroll(db: Session, path: str, params: dict, progress):
+    with open(path, 'wb') as f:
+        f.write(PayrollService.to_xlsx(PayrollService.get_rows(db, **params)))
+
+
+def _no_classes(db: Session, params: dict) -> Optional[str]:
+    query = db.query(models.Class.id)
+    if params.get('semester_id') is not None:
+        query = query.filter(models.Class.semester_id == params['semester_id'])
+    if query.first() is None:
+        return "No classes available to export"
+    return None
+
+
+def _no_teachers(db: Session, params: dict) -> Optional[str]:
+    if db.query(models.Teacher.id).first() is None:
+        return "No teachers available to export"
+    return None
+
+
+@dataclass(frozen=True)
+class ExportType:
+    filename: str  # file name without the date suffix
+    params: Dict[str, type]  # accepted parameters and their types
+    render: Callable  # render(db, path, params, progress)
+    check: Optional[Callable] = None  # check(db, params): error message when there is nothing to export
+
+
+EXPORT_TYPES = {
+    'class-routines': ExportType(
+        'All_Class_Routines', {'semester_id': int},
+        lambda db, path, params, progress: ExportService.write_class_routines(
+            db, path, params.get('semester_id'), progress=progress),
+        _no_classes,
+    ),
+    'day-wise': ExportType(
+        'Day_Wise_Routine', {},
+        lambda db, path, params, progress: ExportService.write_day_wise(db, path, progress=progress),
+        _no_classes,
+    ),
+    'teachers': ExportType(
+        'All_Teachers_Routines', {},
+        lambda db, path, params, progress: ExportService.write_teacher_routines(db, path, progress=progress),
+        _no_teachers,
+    ),
+    'payroll': ExportType(
+        'payroll', {'department_id': int, 'recruitment': str, 'include_unassigned': bool},
+        _write_payroll,
+    ),
+}
+
+
+def data_version(db: Session) -> int:
+    """Id of the newest change_log entry (0 before the first logged write)"""
+    return db.query(func.max(models.ChangeLogEntry.id)).scalar() or 0
+
+
+def clean_params(export_type: str, params: Optional[dict]) -> dict:
+    """Validate `params` for `export_type`; unset (None) values are dropped"""
+    spec = EXPORT_TYPES.get(export_type)
+    if spec is None:
+        raise ValueError(f"Unknown export type: {export_type}; use one of: {', '.join(EXPORT_TYPES)}")
+    cleaned = {}
+    for name, value in (params or {}).items():
+        expected = spec.params.get(name)
+        if expected is None:
+            raise ValueError(f"Unknown parameter for {export_type} export: {name}")
+        if value is None:
+            continue
+        if expected is bool:
+            if not isinstance(value, bool):
+                raise ValueError(f"{name} must be true or false")
+        else:
+            try:
+                value = expected(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"{name} must be of type {expected.__name__}")
+        cleaned[name] = value
+    return cleaned
+
+
+@dataclass
+class ExportJob:
+    id: str
+    type: str
+    params: dict
+    key: str
+    filename: str
+    status: str = 'queued'  # queued, running, done, failed
+    progress: float = 0.0
+    cached: bool = False
+    error: Optional[str] = None
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    finished_at: Optional[datetime] = None
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'type': self.type,
+            'params': self.params,
+            'status': self.status,
+            'progress': self.progress,
+            'cached': self.cached,
+            'error': self.error,
+            'filename': self.filename,
+            'created_at': self.created_at,
+            'finished_at': self.finished_at,
+        }
+
+
+class ExportJobManager:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._jobs = OrderedDict()  # job id -> job, oldest first
+        self._active = {}  # cache key -> queued or running job
+
+    @property
+    def cache_dir(self) -> str:
+        return settings.EXPORT_CACHE_DIR
+
+    def cache_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.xlsx")
+
+    def submit(self, db: Session, export_type: str, params: Optional[dict] = None) -> ExportJob:
+        """Queue an export, or answer it from the cache or a matching job already running.
+        Raises ValueError for bad parameters or when there is nothing to export."""
+        params = clean_params(export_type, params)
+        check = EXPORT_TYPES[export_type].check
+        error = check(db, params) if check else None
+        if error:
+            raise ValueError(error)
+        version = data_version(db)
+        key = hashlib.sha256(
+            json.dumps([export_type, params, version], sort_keys=True).encode()
+        ).hexdigest()[:32]
+        filename = f"{EXPORT_TYPES[export_type].filename}_{date.today().isoformat()}.xlsx"
+
+        with self._lock:
+            active = self._active.get(key)
+            if active is not None:
+                return active
+            job = ExportJob(id=uuid.uuid4().hex, type=export_type, params=params, key=key, filename=filename)
+            path = self.cache_path(key)
+            if os.path.exists(path):
+                # Keep recently used files at the front of the cache
+                os.utime(path)
+                job.status, job.progress, job.cached = 'done', 1.0, True
+                job.finished_at = datetime.utcnow()
+            else:
+                self._active[key] = job
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=settings.EXPORT_WORKERS, thread_name_prefix='export'
+                    )
+                self._executor.submit(self._run, job)
+            self._jobs[job.id] = job
+            self._prune_jobs()
+        return job
+
+    def get(self, job_id: str) -> Optional[ExportJob]:
+        return self._jobs.get(job_id)
+
+    def _run(self, job: ExportJob):
+        path = self.cache_path(job.key)
+        partial = f"{path}.{job.id}.part"
+
+        def progress(done, total):
+            job.progress = round(done / total, 3) if total else 1.0
+
+        db = SessionLocal()
+        try:
+            job.status = 'running'
+            os.makedirs(self.cache_dir, exist_ok=True)
+            EXPORT_TYPES[job.type].render(db, partial, job.params, progress)
+            os.replace(partial, path)
+            job.progress = 1.0
+            job.status = 'done'
+            logger.info("Export finished", extra={'job': job.id, 'type': job.type})
+        except Exception as e:
+            logger.exception("Export failed", extra={'job': job.id, 'type': job.type})
+            job.status = 'failed'
+            job.error = str(e)
+            if os.path.exists(partial):
+                os.unlink(partial)
+        finally:
+            db.close()
+            job.finished_at = datetime.utcnow()
+            with self._lock:
+                self._active.pop(job.key, None)
+            self._prune_cache()
+
+    def _prune_jobs(self):
+        """Forget the oldest finished jobs beyond MAX_FINISHED_JOBS (caller holds the lock)"""
+        finished = [job_id for job_id, job in self._jobs.items() if job.status in ('done', 'failed')]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[job_id]
+
+    def _prune_cache(self):
+        """Keep the newest EXPORT_CACHE_MAX_FILES files"""
+        try:
+            files = [
+                entry for entry in os.scandir(self.cache_dir)
+                if entry.is_file() and entry.name.endswith('.xlsx')
+            ]
+        except FileNotFoundError:
+            return
+        files.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+        for entry in files[settings.EXPORT_CACHE_MAX_FILES:]:
+            try:
+                os.unlink(entry.path)
+            except OSError:
+                pass
+
+
+export_jobs = ExportJobManager()
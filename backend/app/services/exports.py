@@ -0,0 +1,455 @@
+"""Routine spreadsheets written on the server.
+
+Each export produces the workbook the frontend used to build in the browser
+with xlsx-js-style (same cells, merges, styles, column widths and row
+heights), so the pages can download a file instead of assembling it from
+the full routine dump.
+
+Workbooks are written with XlsxWriter in constant_memory mode: a row is
+flushed to a temporary file as soon as the next one starts, and entries are
+read with yield_per in the order the sheets are written, so memory stays flat
+however many sheets there are. The caller passes the path to write (and
+optionally a progress(done, total) callback, called after each sheet); routes
+stream it back and delete it afterwards, export jobs keep it in their cache.
+
+The sheets share one grid model (grid_rows): one row per day holding a
+(text, span) cell per period, or None where a multi-period entry to the left
+covers the period. The PDF timetables (app.services.pdf_timetables) are
+built from the same grids.
+"""
+import re
+from decimal import ROUND_HALF_UP, Decimal
+from itertools import groupby
+from operator import attrgetter, itemgetter
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+import xlsxwriter
+from app.models import models
+from app.services.crud import ClassRoutineService
+from app.services.reference_cache import reference_cache
+
+COLLEGE_NAME = 'Kantipur Engineering College'
+
+COLUMN_WIDTH = 11.27
+SLOT_ROW_HEIGHT = 85.5
+# Title, subtitle, class/room, effective date, spacer, period header
+HEADER_ROW_HEIGHTS = (24, 20, 18, 18, 5, 20)
+HEADER_ROWS = len(HEADER_ROW_HEIGHTS)
+
+PAPER_A4 = 9
+
+# Sheets of the day-wise master routine
+WORK_DAYS = ('sunday', 'monday', 'tuesday', 'wednesday', 'thursday')
+SESSION_SEPARATOR = '\n--------------------\n'
+
+INVALID_SHEET_CHARS = re.compile(r'[:\\/?*\[\]]')
+
+
+def period_label(period) -> str:
+    """'HH:MM-HH:MM' header of a period column"""
+    def hhmm(value):
+        return str(value)[:5] if value is not None else ''
+    return f"{hhmm(period['start_time'])}-{hhmm(period['end_time'])}"
+
+
+def grid_rows(slot_entries, days, periods, cell_text, empty='-', num_periods=attrgetter('num_periods')):
+    """Day x period grid of `slot_entries` ({(day_id, period_id): entry}).
+
+    Returns [(day, cells)] with one cell per period: (text, span) where an entry
+    starts, (empty, 1) for a free period and None for periods covered by a
+    multi-period entry to the left. Spans are cut at the last period.
+    """
+    rows = []
+    for day in days:
+        cells = []
+        skip = 0
+        for index, period in enumerate(periods):
+            if skip > 0:
+                skip -= 1
+                cells.append(None)
+                continue
+            entry = slot_entries.get((day['id'], period['id']))
+            if entry is None:
+                cells.append((empty, 1))
+                continue
+            span = num_periods(entry) or 1
+            cells.append((cell_text(entry), min(span, len(periods) - index)))
+            skip = span - 1
+        rows.append((day, cells))
+    return rows
+
+
+class SheetNames:
+    """Excel-safe, unique worksheet names"""
+
+    def __init__(self):
+        self._used = set()
+
+    def __call__(self, name: str) -> str:
+        base = INVALID_SHEET_CHARS.sub('-', name or 'Sheet')[:31]
+        candidate, n = base, 1
+        while candidate.casefold() in self._used:
+            n += 1
+            suffix = f' ({n})'
+            candidate = base[:31 - len(suffix)] + suffix
+        self._used.add(candidate.casefold())
+        return candidate
+
+
+class GridFormats:
+    """Formats shared by the routine sheets"""
+
+    def __init__(self, workbook):
+        border = {'border': 1}
+        # Unstyled; in constant_memory mode a row is only written out if it has a cell
+        self.plain = workbook.add_format()
+        self.title = workbook.add_format({'bold': True, 'font_size': 16, 'align': 'center', 'valign': 'vcenter'})
+        self.subtitle = workbook.add_format({'bold': True, 'font_size': 14, 'align': 'center', 'valign': 'vcenter'})
+        self.info_left = workbook.add_format({'bold': True, 'align': 'left', 'valign': 'vcenter'})
+        self.info_center = workbook.add_format({'bold': True, 'align': 'center', 'valign': 'vcenter'})
+        self.info_right = workbook.add_format({'bold': True, 'align': 'right', 'valign': 'vcenter'})
+        self.header = workbook.add_format({
+            'bold': True, 'bg_color': '#D3D3D3', **border,
+            'align': 'center', 'valign': 'vcenter', 'text_wrap': True,
+        })
+        self.day = workbook.add_format({
+            'bold': True, 'bg_color': '#F0F0F0', **border, 'align': 'center', 'valign': 'vcenter',
+        })
+        self.day_wrapped = workbook.add_format({
+            'bold': True, 'bg_color': '#F0F0F0', **border, 'align': 'center', 'valign': 'vcenter', 'text_wrap': True,
+        })
+        self.cell = workbook.add_format({**border, 'text_wrap': True, 'align': 'center', 'valign': 'vcenter'})
+
+
+def to_fixed(value, digits: int = 1) -> str:
+    """JavaScript Number.toFixed: halves round away from zero on the exact binary value"""
+    return str(Decimal(value).quantize(Decimal(1).scaleb(-digits), rounding=ROUND_HALF_UP))
+
+
+def write_titles(sheet, formats: GridFormats, last_col: int, subtitle: str):
+    """Column widths, header row heights and the two centred title rows of a grid sheet"""
+    sheet.set_column(0, last_col, COLUMN_WIDTH)
+    for row, height in enumerate(HEADER_ROW_HEIGHTS):
+        sheet.set_row(row, height)
+    sheet.merge_range(0, 0, 0, last_col, COLLEGE_NAME, formats.title)
+    sheet.merge_range(1, 0, 1, last_col, subtitle, formats.subtitle)
+
+
+def write_period_header(sheet, formats: GridFormats, periods):
+    """Spacer row and the 'Days \\ Time' header row of a grid sheet"""
+    sheet.write_blank(4, 0, None, formats.plain)
+    sheet.write(5, 0, 'Days \\ Time', formats.header)
+    for col, period in enumerate(periods, start=1):
+        sheet.write(5, col, period_label(period), formats.header)
+
+
+def setup_print(sheet, last_row: int, last_col: int):
+    """A4 landscape, one page wide, with the page margins the browser exports used"""
+    sheet.set_landscape()
+    sheet.set_paper(PAPER_A4)
+    sheet.fit_to_pages(1, 0)
+    sheet.set_margins(left=0.5, right=0.5, top=0.75, bottom=0.75)
+    sheet.print_area(0, 0, last_row, last_col)
+
+
+def write_grid(sheet, formats: GridFormats, first_row: int, rows, day_format=None):
+    """Write grid_rows() output starting at `first_row`, day names in column 0"""
+    for offset, (day, cells) in enumerate(rows):
+        row = first_row + offset
+        sheet.set_row(row, SLOT_ROW_HEIGHT)
+        sheet.write(row, 0, day['name'], day_format or formats.day)
+        for index, cell in enumerate(cells):
+            if cell is None:
+                continue
+            text, span = cell
+            col = index + 1
+            if span > 1:
+                sheet.merge_range(row, col, row, col + span - 1, text, formats.cell)
+            else:
+                sheet.write(row, col, text, formats.cell)
+
+
+def line_count(text) -> int:
+    return str(text).count('\n') + 1 if text else 1
+
+
+class ExportService:
+    @staticmethod
+    def _teacher_labels(db: Session):
+        """teacher id -> abbreviation (or name when it has none)"""
+        return {
+            row.id: row.abbreviation or row.name
+            for row in db.query(models.Teacher.id, models.Teacher.name, models.Teacher.abbreviation).all()
+        }
+
+    @staticmethod
+    def _class_entry_text(entry, teachers) -> str:
+        """Cell text of a class routine entry, as ClassRoutine.jsx exported it"""
+        text = entry.subject_name or 'N/A'
+        if entry.is_lab:
+            text += ' (Lab)'
+        if entry.lead_teacher_id and entry.lead_teacher_id in teachers:
+            text += f"\n({teachers[entry.lead_teacher_id]})"
+        assistants = [
+            f"({teachers[teacher_id]})"
+            for teacher_id in (entry.assist_teacher_1_id, entry.assist_teacher_2_id)
+            if teacher_id and teacher_id in teachers
+        ]
+        if assistants:
+            text += f", {', '.join(assistants)}"
+        if entry.is_lab and entry.group:
+            text += f"\nGroup: {entry.group}"
+        return text
+
+    @staticmethod
+    def _classes(db: Session, semester_id: int = None, class_id: int = None):
+        query = db.query(models.Class.id, models.Class.name, models.Class.room_no)
+        if semester_id is not None:
+            query = query.filter(models.Class.semester_id == semester_id)
+        if class_id is not None:
+            query = query.filter(models.Class.id == class_id)
+        return query.order_by(models.Class.id).all()
+
+    @staticmethod
+    def _class_entries(db: Session, semester_id: int = None, class_id: int = None, batch_size: int = 500):
+        """Routine entries with their subject name, ordered by (class, id), read in batches"""
+        Entry = models.ClassRoutineEntry
+        query = db.query(
+            Entry.id, Entry.class_id, Entry.day_id, Entry.period_id, Entry.is_lab, Entry.num_periods,
+            Entry.lead_teacher_id, Entry.assist_teacher_1_id, Entry.assist_teacher_2_id, Entry.group,
+            models.Subject.name.label('subject_name'),
+        ).outerjoin(
+            models.Subject, models.Subject.id == Entry.subject_id
+        )
+        if semester_id is not None:
+            query = query.join(models.Class, models.Class.id == Entry.class_id).filter(
+                models.Class.semester_id == semester_id
+            )
+        if class_id is not None:
+            query = query.filter(Entry.class_id == class_id)
+        return query.order_by(Entry.class_id, Entry.id).yield_per(batch_size)
+
+    @staticmethod
+    def class_slot_entries(db: Session, classes, semester_id: int = None, class_id: int = None):
+        """Yield (class, {(day_id, period_id): entry}) for `classes` (ordered by id, as
+        _classes returns them); entries are read in one pass with the same filters"""
+        # Entries arrive grouped by class in class id order, like the classes
+        groups = groupby(ExportService._class_entries(db, semester_id, class_id), key=attrgetter('class_id'))
+        pending = next(groups, None)
+        for class_ in classes:
+            while pending is not None and (pending[0] is None or pending[0] < class_.id):
+                pending = next(groups, None)
+            slot_entries = {}
+            if pending is not None and pending[0] == class_.id:
+                # Later entries in the same slot replace earlier ones, as in the browser export
+                for entry in pending[1]:
+                    slot_entries[(entry.day_id, entry.period_id)] = entry
+                pending = next(groups, None)
+            yield class_, slot_entries
+
+    @staticmethod
+    def write_class_routines(db: Session, path: str, semester_id: int = None, progress=None) -> int:
+        """"Export All Classes": one sheet per class (of one semester, or all). Returns the sheet count."""
+        reference = reference_cache.get(db)
+        days, periods = reference.days, reference.periods
+        teachers = ExportService._teacher_labels(db)
+        classes = ExportService._classes(db, semester_id)
+        last_col = len(periods)
+
+        workbook = xlsxwriter.Workbook(path, {'constant_memory': True})
+        formats = GridFormats(workbook)
+        sheet_name = SheetNames()
+        class_grids = ExportService.class_slot_entries(db, classes, semester_id)
+        for done, (class_, slot_entries) in enumerate(class_grids, start=1):
+            sheet = workbook.add_worksheet(sheet_name(class_.name))
+            write_titles(sheet, formats, last_col, 'Class Routine')
+            sheet.write(2, 0, f"Class: {class_.name}", formats.info_left)
+            for col in range(1, last_col):
+                sheet.write_blank(2, col, None, formats.info_center)
+            sheet.write(2, last_col, f"Room: {class_.room_no or 'N/A'}", formats.info_right)
+            sheet.write(3, 0, 'Effective From: N/A', formats.info_left)
+            write_period_header(sheet, formats, periods)
+
+            rows = grid_rows(
+                slot_entries, days, periods,
+                lambda entry: ExportService._class_entry_text(entry, teachers),
+            )
+            write_grid(sheet, formats, HEADER_ROWS, rows)
+            setup_print(sheet, HEADER_ROWS - 1 + len(days), last_col)
+            if progress:
+                progress(done, len(classes))
+
+        workbook.close()
+        return len(classes)
+
+    @staticmethod
+    def _day_wise_entry_text(entry, teachers) -> str:
+        """Text of one session in a day-wise cell, as ClassRoutine.jsx exported it"""
+        text = entry.subject_name or 'N/A'
+        if entry.lead_teacher_id in teachers:
+            text += f" ({teachers[entry.lead_teacher_id]})"
+        if entry.is_lab and entry.group:
+            text += f" ({entry.group})"
+        return text
+
+    @staticmethod
+    def _day_wise_entries(db: Session, batch_size: int = 500):
+        """Entries on the working days in (day order, class, period, id) order, read in batches"""
+        Entry = models.ClassRoutineEntry
+        return db.query(
+            Entry.id, Entry.class_id, Entry.day_id, Entry.period_id, Entry.is_lab, Entry.num_periods,
+            Entry.lead_teacher_id, Entry.group,
+            models.Subject.name.label('subject_name'),
+        ).select_from(models.Day).join(
+            Entry, Entry.day_id == models.Day.id
+        ).outerjoin(
+            models.Subject, models.Subject.id == Entry.subject_id
+        ).filter(
+            func.lower(models.Day.name).in_(WORK_DAYS)
+        ).order_by(
+            models.Day.order, Entry.class_id, Entry.period_id, Entry.id
+        ).yield_per(batch_size)
+
+    @staticmethod
+    def write_day_wise(db: Session, path: str, progress=None) -> int:
+        """Day-wise master routine: a Sunday-Thursday sheet each, a row per class and a column
+        per period; sessions sharing a slot are listed one under another. Returns the sheet count."""
+        reference = reference_cache.get(db)
+        periods = reference.periods
+        work_days = [day for day in reference.days if day['name'].lower() in WORK_DAYS]
+        day_position = {day['id']: position for position, day in enumerate(work_days)}
+        teachers = ExportService._teacher_labels(db)
+        classes = ExportService._classes(db)
+
+        workbook = xlsxwriter.Workbook(path, {'constant_memory': True})
+        header = workbook.add_format({
+            'bold': True, 'font_size': 11, 'bg_color': '#D3D3D3', 'border': 1,
+            'align': 'center', 'valign': 'vcenter', 'text_wrap': True,
+        })
+        label = workbook.add_format({
+            'bold': True, 'font_size': 10, 'bg_color': '#F0F0F0', 'border': 1,
+            'align': 'left', 'valign': 'vcenter', 'text_wrap': True,
+        })
+        cell = workbook.add_format({
+            'font_size': 9, 'border': 1, 'align': 'left', 'valign': 'top', 'text_wrap': True,
+        })
+        sheet_name = SheetNames()
+
+        groups = groupby(
+            ExportService._day_wise_entries(db),
+            key=lambda entry: (day_position[entry.day_id], entry.class_id if entry.class_id is not None else -1),
+        )
+        pending = next(groups, None)
+        for position, day in enumerate(work_days):
+            sheet = workbook.add_worksheet(sheet_name(day['name']))
+            sheet.set_column(0, 0, 20)
+            sheet.set_column(1, len(periods), 25)
+            sheet.set_row(0, 30)
+            sheet.write(0, 0, 'Class \\ Time', header)
+            for col, period in enumerate(periods, start=1):
+                sheet.write(0, col, period_label(period), header)
+
+            for row, class_ in enumerate(classes, start=1):
+                while pending is not None and pending[0] < (position, class_.id):
+                    pending = next(groups, None)
+                sessions = {}
+                if pending is not None and pending[0] == (position, class_.id):
+                    for entry in pending[1]:
+                        sessions.setdefault(entry.period_id, []).append(entry)
+                    pending = next(groups, None)
+
+                values = [f"{class_.name}\n[{class_.room_no or 'N/A'}]"]
+                skip = 0
+                for period in periods:
+                    if skip > 0:
+                        skip -= 1
+                        values.append('')
+                        continue
+                    slot = sessions.get(period['id'], [])
+                    values.append(SESSION_SEPARATOR.join(
+                        ExportService._day_wise_entry_text(entry, teachers) for entry in slot
+                    ))
+                    # Only the first session decides how many periods the slot covers
+                    if slot and (slot[0].num_periods or 1) > 1:
+                        skip = slot[0].num_periods - 1
+
+                sheet.set_row(row, max(25, max(line_count(value) for value in values) * 15))
+                sheet.write(row, 0, values[0], label)
+                for col, value in enumerate(values[1:], start=1):
+                    sheet.write(row, col, value, cell)
+
+            sheet.set_landscape()
+            sheet.set_paper(PAPER_A4)
+            sheet.fit_to_pages(1, 0)
+            sheet.set_margins(left=0.4, right=0.4, top=0.5, bottom=0.5)
+            if progress:
+                progress(position + 1, len(work_days))
+
+        workbook.close()
+        return len(work_days)
+
+    @staticmethod
+    def _teacher_cell_text(cell, teachers) -> str:
+        """Text of a teacher timetable cell, as TeacherRoutine.jsx exported it"""
+        text = cell['subject_name']
+        if cell['is_lab']:
+            text += ' (Lab)'
+        text += f"\n[{cell['class_name']}]"
+        if cell['room_no']:
+            text += f"\nRoom: {cell['room_no']}"
+        if cell['partner_ids']:
+            partners = ', '.join(f"({teachers[p]})" for p in cell['partner_ids'] if p in teachers)
+            text += f"\nWith: {partners}"
+        return text
+
+    @staticmethod
+    def write_teacher_routines(db: Session, path: str, progress=None) -> int:
+        """All teachers' routines, one sheet per teacher. Grids, lab partners (the other teachers
+        of the same entry) and total load come from ClassRoutineService.get_teacher_timetables,
+        one scan over the routine entries. Returns the sheet count."""
+        reference = reference_cache.get(db)
+        days, periods = reference.days, reference.periods
+        departments = {d['id']: d['name'] for d in reference.departments}
+        teachers = ExportService._teacher_labels(db)
+        timetables = ClassRoutineService.get_teacher_timetables(db)
+        last_col = len(periods)
+        # Department / teacher name on the left (A:D), effective date / load on the right (I:K)
+        right_col = 8
+
+        workbook = xlsxwriter.Workbook(path, {'constant_memory': True})
+        formats = GridFormats(workbook)
+        sheet_name = SheetNames()
+        for done, timetable in enumerate(timetables, start=1):
+            department_id = timetable['department_id']
+            department = departments.get(department_id, 'N/A') if department_id else 'Not Assigned'
+
+            sheet = workbook.add_worksheet(sheet_name(timetable['teacher_name']))
+            write_titles(sheet, formats, last_col, "Teacher's Routine")
+            for row, left, right in (
+                (2, f"Department: {department}", 'Effective From: N/A'),
+                (3, f"Teacher: {timetable['teacher_name']}", f"Total Load: {to_fixed(timetable['total_load'])}"),
+            ):
+                sheet.merge_range(row, 0, row, 3, left, formats.info_left)
+                for col in range(4, right_col):
+                    sheet.write_blank(row, col, None, formats.info_left)
+                sheet.merge_range(row, right_col, row, right_col + 2, right, formats.info_right)
+                for col in range(right_col + 3, last_col + 1):
+                    sheet.write_blank(row, col, None, formats.info_right)
+            write_period_header(sheet, formats, periods)
+
+            slot_entries = {
+                tuple(int(part) for part in key.split('-')): cell
+                for key, cell in timetable['routine'].items()
+            }
+            rows = grid_rows(
+                slot_entries, days, periods,
+                lambda cell: ExportService._teacher_cell_text(cell, teachers),
+                num_periods=itemgetter('num_periods'),
+            )
+            write_grid(sheet, formats, HEADER_ROWS, rows, day_format=formats.day_wrapped)
+            setup_print(sheet, HEADER_ROWS - 1 + len(days), last_col)
+            if progress:
+                progress(done, len(timetables))
+
+        workbook.close()
+        return len(timetables)
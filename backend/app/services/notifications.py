@@ -0,0 +1,107 @@
+"""Server-sent routine events.
+
+After a routine save/delete commits, ClassRoutineService publishes the class's
+new teacher occupancy (as held by the occupancy index) to every client
+connected to GET /class-routines/events/, so editors working on other
+classes can keep their availability view current without polling:
+
+    event: class_occupancy
+    data: {"seq": 12, "class_id": 3, "bookings": [[teacher_id, day_id, start_order, end_order, entry_id], ...]}
+
+`bookings` replaces everything previously known for that class (an empty list
+means the routine was deleted). An `occupancy_reset` event means period
+orders changed and clients should reload their whole view. A client whose
+queue overflows is sent `occupancy_reset` and then dropped.
+
+Publishing happens from sync route handlers (threadpool threads), so events
+are handed to each subscriber's event loop with call_soon_threadsafe. Like the
+occupancy index this is per process; run a single API worker.
+"""
+import asyncio
+import itertools
+import json
+import threading
+
+SUBSCRIBER_QUEUE_SIZE = 256
+KEEPALIVE_SECONDS = 15
+
+
+class RoutineEventBroadcaster:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._seq = itertools.count(1)
+        # queue -> event loop the queue belongs to
+        self._subscribers = {}
+
+    def subscribe(self) -> asyncio.Queue:
+        """Register a subscriber; must be called from the subscriber's event loop"""
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers[queue] = asyncio.get_running_loop()
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        with self._lock:
+            self._subscribers.pop(queue, None)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def publish(self, event_type: str, **payload):
+        """Send an event to every subscriber; safe to call from any thread"""
+        with self._lock:
+            if not self._subscribers:
+                return
+            subscribers = list(self._subscribers.items())
+            event = (event_type, {'seq': next(self._seq), **payload})
+        for queue, loop in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._deliver, queue, event)
+            except RuntimeError:
+                # The subscriber's loop is closed
+                self.unsubscribe(queue)
+
+    def _deliver(self, queue: asyncio.Queue, event):
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Slow client: tell it to reload and stop sending it events
+            self.unsubscribe(queue)
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(('occupancy_reset', {'seq': event[1]['seq'], 'reason': 'overflow'}))
+            queue.put_nowait(None)
+
+    def publish_class(self, class_id: int, bookings):
+        self.publish('class_occupancy', class_id=class_id, bookings=bookings)
+
+    def publish_reset(self, reason: str):
+        self.publish('occupancy_reset', reason=reason)
+
+
+routine_events = RoutineEventBroadcaster()
+
+
+def format_sse(event_type: str, data: dict) -> str:
+    return f"id: {data['seq']}\nevent: {event_type}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+async def sse_stream(request, broadcaster: RoutineEventBroadcaster = routine_events):
+    """Yield SSE messages for one client until it disconnects (None in the queue ends the stream)"""
+    queue = broadcaster.subscribe()
+    try:
+        yield "retry: 3000\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                yield ": keep-alive\n\n"
+                continue
+            if event is None:
+                break
+            yield format_sse(*event)
+    finally:
+        broadcaster.unsubscribe(queue)
@@ -0,0 +1,153 @@
+"""In-memory teacher occupancy index used for conflict checks.
+
+For every (teacher, day) the index keeps, per class, the teacher's bookings
+(entry id -> start and end period order, multi-period entries spanning their
+num_periods) and one bitmask OR-ing all of them (bit n set = period with order
+n occupied). A conflict check ANDs each class's mask with the mask of the
+checked range and only looks at the bookings of classes where that is
+non-zero. It is built from routine_entry_teachers at startup and refreshed by
+ClassRoutineService after each routine save/delete commit, so conflict checks
+need no routine query unless a conflict is found.
+
+Overlap answers are the ones the original check_teacher_conflicts loop gave
+(start <= max AND start + num_periods - 1 >= min). Spans a bitmask cannot
+hold (a negative order, or an end before its start from a zero or negative
+num_periods) are left out of the mask; a class holding one has its bookings
+compared as intervals on every check.
+
+The index lives in process memory; run a single API worker (as run.py does)
+or every worker keeps its own copy and only sees its own writes.
+"""
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+from sqlalchemy.orm import Session
+from app.models import models
+
+
+def span_end(start_order: int, num_periods: Optional[int]) -> int:
+    """Last period order an entry covers, as the original conflict check computed it
+    (start + num_periods - 1). NULL num_periods counts as one period; 0 stays an empty
+    span that ends before it starts."""
+    return start_order + (1 if num_periods is None else num_periods) - 1
+
+
+def span_mask(start_order: int, end_order: int) -> Optional[int]:
+    """Bitmask with bits start_order..end_order (inclusive) set, or None when the span
+    cannot be represented (negative order or end before start)"""
+    if start_order < 0 or end_order < start_order:
+        return None
+    return ((1 << (end_order - start_order + 1)) - 1) << start_order
+
+
+@dataclass
+class ClassBookings:
+    """One class's bookings of a teacher on a day"""
+    mask: int = 0  # OR of the spans' masks
+    unmasked: int = 0  # spans with no mask
+    entries: Dict[int, Tuple[int, int]] = field(default_factory=dict)  # entry id -> (start, end)
+
+
+class OccupancyIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._built = False
+        # (teacher_id, day_id) -> class_id -> ClassBookings
+        self._slots = {}
+        # class_id -> set of (teacher_id, day_id) keys that class contributes to
+        self._class_keys = {}
+
+    @staticmethod
+    def _load_rows(db: Session, class_id: int = None):
+        EntryTeacher = models.RoutineEntryTeacher
+        query = db.query(
+            EntryTeacher.entry_id,
+            EntryTeacher.teacher_id,
+            EntryTeacher.class_id,
+            EntryTeacher.day_id,
+            EntryTeacher.start_order,
+            EntryTeacher.end_order,
+        ).filter(EntryTeacher.start_order.isnot(None))
+        if class_id is not None:
+            query = query.filter(EntryTeacher.class_id == class_id)
+        return query.all()
+
+    def _add_rows(self, rows):
+        for row in rows:
+            key = (row.teacher_id, row.day_id)
+            bookings = self._slots.setdefault(key, {}).setdefault(row.class_id, ClassBookings())
+            bookings.entries[row.entry_id] = (row.start_order, row.end_order)
+            mask = span_mask(row.start_order, row.end_order)
+            if mask is None:
+                bookings.unmasked += 1
+            else:
+                bookings.mask |= mask
+            self._class_keys.setdefault(row.class_id, set()).add(key)
+
+    def _drop_class(self, class_id: int):
+        for key in self._class_keys.pop(class_id, ()):
+            classes = self._slots.get(key)
+            if classes is None:
+                continue
+            classes.pop(class_id, None)
+            if not classes:
+                del self._slots[key]
+
+    def rebuild(self, db: Session):
+        """Rebuild the whole index from routine_entry_teachers"""
+        rows = self._load_rows(db)
+        with self._lock:
+            self._slots = {}
+            self._class_keys = {}
+            self._add_rows(rows)
+            self._built = True
+
+    def ensure_built(self, db: Session):
+        """Build the index on first use (e.g. when the startup hook did not run)"""
+        if not self._built:
+            self.rebuild(db)
+
+    def refresh_class(self, db: Session, class_id: int):
+        """Reload one class's bookings after its routine was committed"""
+        if not self._built:
+            return self.rebuild(db)
+        rows = self._load_rows(db, class_id)
+        with self._lock:
+            self._drop_class(class_id)
+            self._add_rows(rows)
+
+    def remove_class(self, class_id: int):
+        """Forget one class's bookings after its routine was deleted"""
+        with self._lock:
+            self._drop_class(class_id)
+
+    def class_bookings(self, class_id: int):
+        """Sorted [teacher_id, day_id, start_order, end_order, entry_id] bookings of one class"""
+        with self._lock:
+            bookings = [
+                [teacher_id, day_id, start_order, end_order, entry_id]
+                for teacher_id, day_id in self._class_keys.get(class_id, ())
+                for entry_id, (start_order, end_order) in self._slots[(teacher_id, day_id)][class_id].entries.items()
+            ]
+        bookings.sort()
+        return bookings
+
+    def find_conflicts(self, teacher_id: int, day_id: int, min_order: int, max_order: int,
+                       exclude_class_id: int = None, exclude_class_ids=()):
+        """Return (entry_id, start_order, end_order) of bookings overlapping min_order..max_order, by entry id"""
+        checked = span_mask(min_order, max_order)
+        conflicts = []
+        with self._lock:
+            for class_id, bookings in self._slots.get((teacher_id, day_id), {}).items():
+                if (exclude_class_id and class_id == exclude_class_id) or class_id in exclude_class_ids:
+                    continue
+                if checked is not None and not bookings.unmasked and not bookings.mask & checked:
+                    continue
+                for entry_id, (start_order, end_order) in bookings.entries.items():
+                    if start_order <= max_order and end_order >= min_order:
+                        conflicts.append((entry_id, start_order, end_order))
+        conflicts.sort()
+        return conflicts
+
+
+occupancy_index = OccupancyIndex()
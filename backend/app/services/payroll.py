@@ -0,0 +1,159 @@
+"""Payroll report: extra-load payment per teacher.
+
+One query joins every teacher to their summed teacher_loads, effective load,
+position rate and department; payment follows the load report rules
+(extra load * rate * 15 for positive extra load with a rated position).
+The rows can be rendered as CSV (streamed line by line) or XLSX.
+"""
+import csv
+import io
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+import xlsxwriter
+from app.models import models
+from app.services.workload import DEFAULT_EFFECTIVE_LOAD, PAYMENT_WEEKS
+
+# (key, header, XLSX column width)
+COLUMNS = [
+    ('teacher_id', 'Teacher ID', 10),
+    ('teacher_name', 'Teacher', 28),
+    ('abbreviation', 'Abbreviation', 12),
+    ('department_name', 'Department', 24),
+    ('recruitment', 'Recruitment', 14),
+    ('position', 'Position', 18),
+    ('rate', 'Rate', 10),
+    ('effective_load', 'Effective Load', 14),
+    ('total_periods', 'Periods', 10),
+    ('total_workload', 'Total Workload', 14),
+    ('extra_load', 'Extra Load', 12),
+    ('total_payment', 'Total Payment', 16),
+]
+
+
+class PayrollService:
+    @staticmethod
+    def get_rows(db: Session, department_id: int = None, recruitment: str = None,
+                 include_unassigned: bool = False):
+        """Payroll rows for all (or filtered) teachers, sorted by teacher name"""
+        Load = models.TeacherLoad
+        loads = db.query(
+            Load.teacher_id,
+            func.sum(Load.periods).label('periods'),
+            func.sum(Load.workload_tenths).label('workload_tenths'),
+        ).group_by(Load.teacher_id).subquery()
+
+        query = db.query(
+            models.Teacher.id,
+            models.Teacher.name,
+            models.Teacher.abbreviation,
+            models.Teacher.department_id,
+            models.Department.name.label('department_name'),
+            models.Teacher.recruitment,
+            models.TeacherEffectiveLoad.effective_load,
+            models.TeacherEffectiveLoad.position,
+            models.PositionRate.rate,
+            loads.c.periods,
+            loads.c.workload_tenths,
+        ).outerjoin(
+            loads, loads.c.teacher_id == models.Teacher.id
+        ).outerjoin(
+            models.TeacherEffectiveLoad, models.TeacherEffectiveLoad.teacher_id == models.Teacher.id
+        ).outerjoin(
+            models.PositionRate, models.PositionRate.position == models.TeacherEffectiveLoad.position
+        ).outerjoin(
+            models.Department, models.Department.id == models.Teacher.department_id
+        )
+        if department_id is not None:
+            query = query.filter(models.Teacher.department_id == department_id)
+        if recruitment is not None:
+            query = query.filter(models.Teacher.recruitment == recruitment)
+
+        rows = []
+        for row in query.all():
+            total_periods = row.periods or 0
+            if total_periods <= 0 and not include_unassigned:
+                continue
+            effective_load = row.effective_load if row.effective_load is not None else DEFAULT_EFFECTIVE_LOAD
+            total_workload = (row.workload_tenths or 0) / 10
+            extra_load = total_workload - effective_load
+            payment = 0
+            if extra_load > 0 and row.position and row.rate:
+                payment = extra_load * row.rate * PAYMENT_WEEKS
+            rows.append({
+                'teacher_id': row.id,
+                'teacher_name': row.name,
+                'abbreviation': row.abbreviation,
+                'department_id': row.department_id,
+                'department_name': row.department_name if row.department_id else 'Not Assigned',
+                'recruitment': row.recruitment,
+                'position': row.position,
+                'rate': row.rate,
+                'effective_load': effective_load,
+                'total_periods': total_periods,
+                'total_workload': total_workload,
+                'extra_load': extra_load,
+                'total_payment': payment,
+            })
+        rows.sort(key=lambda r: ((r['teacher_name'] or '').casefold(), r['teacher_name'] or ''))
+        return rows
+
+    @staticmethod
+    def totals(rows):
+        return {
+            'teachers': len(rows),
+            'total_periods': sum(r['total_periods'] for r in rows),
+            'total_workload': round(sum(r['total_workload'] for r in rows), 1),
+            'total_payment': sum(r['total_payment'] for r in rows),
+        }
+
+    @staticmethod
+    def iter_csv(rows):
+        """CSV text, one chunk per line"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+
+        def flush():
+            chunk = buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            return chunk
+
+        writer.writerow([header for _, header, _ in COLUMNS])
+        yield flush()
+        for row in rows:
+            writer.writerow(['' if row[key] is None else row[key] for key, _, _ in COLUMNS])
+            yield flush()
+
+    @staticmethod
+    def to_xlsx(rows) -> bytes:
+        """XLSX workbook with one row per teacher and a totals row"""
+        output = io.BytesIO()
+        workbook = xlsxwriter.Workbook(output, {'in_memory': True})
+        sheet = workbook.add_worksheet('Payroll')
+        header = workbook.add_format({'bold': True, 'bg_color': '#D9E1F2', 'border': 1})
+        number = workbook.add_format({'num_format': '0.0'})
+        money = workbook.add_format({'num_format': '#,##0.00'})
+        bold_number = workbook.add_format({'bold': True, 'num_format': '0.0'})
+        bold_money = workbook.add_format({'bold': True, 'num_format': '#,##0.00'})
+        formats = {'effective_load': number, 'total_workload': number, 'extra_load': number,
+                   'rate': money, 'total_payment': money}
+
+        for col, (_, title, width) in enumerate(COLUMNS):
+            sheet.write(0, col, title, header)
+            sheet.set_column(col, col, width)
+        for r, row in enumerate(rows, start=1):
+            for col, (key, _, _) in enumerate(COLUMNS):
+                value = row[key]
+                if value is None:
+                    continue
+                sheet.write(r, col, value, formats.get(key))
+
+        totals = PayrollService.totals(rows)
+        last = len(rows) + 1
+        sheet.write(last, 1, 'Total', header)
+        sheet.write(last, 8, totals['total_periods'], bold_number)
+        sheet.write(last, 9, totals['total_workload'], bold_number)
+        sheet.write(last, 11, totals['total_payment'], bold_money)
+        sheet.freeze_panes(1, 0)
+        workbook.close()
+        return output.getvalue()
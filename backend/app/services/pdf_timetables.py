@@ -0,0 +1,372 @@
+"""Printable PDF timetables for notice boards: per class, teacher and room.
+
+Each timetable is built from the same grid model as the routine workbooks
+(grid_rows, with the cell texts of the class and teacher exports) and drawn
+with reportlab as one A4 landscape page, shrunk to fit when a day holds a lot
+of text.
+
+Rendered PDFs are cached per entity and data version (see
+app.core.versioning): a class's PDF is re-rendered only after its own routine
+entries or the classes, days, periods, subjects or teachers change; teacher
+and room PDFs follow the whole routine. Like the versions, the cache is per
+process and bounded by PDF_CACHE_MAX_ENTRIES.
+
+Rendering all classes at once (class_pdfs) sends the timetables that are not
+cached to a process pool (PDF_WORKERS) so they render in parallel. Timetables
+are plain picklable data and render_pdf touches neither the database nor the
+cache, so it runs the same in a worker process. In the frozen (PyInstaller)
+build the workers start through run.py's multiprocessing.freeze_support().
+The pool is shut down with the app (shutdown_render_pool).
+
+A room's timetable holds the lab entries assigned to it (lab_room) and the
+theory entries of classes whose room it is (room_no).
+"""
+import io
+import multiprocessing
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from operator import itemgetter
+from typing import List, Optional, Tuple
+from xml.sax.saxutils import escape
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.platypus import KeepInFrame, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.versioning import data_versions
+from app.models import models
+from app.services.crud import ClassRoutineService
+from app.services.exports import (
+    COLLEGE_NAME, SESSION_SEPARATOR, ExportService, grid_rows, period_label, to_fixed,
+)
+from app.services.reference_cache import reference_cache
+
+# Tables each kind of timetable is built from; class routine entries are
+# versioned per class, so a class PDF also depends on its own entries only
+CLASS_TABLES = ('classes', 'days', 'periods', 'subjects', 'teachers')
+TEACHER_TABLES = ('teachers', 'departments', 'classes', 'days', 'periods', 'subjects', 'class_routine_entries')
+ROOM_TABLES = ('rooms', 'classes', 'days', 'periods', 'subjects', 'teachers', 'class_routine_entries')
+
+PAGE_SIZE = landscape(A4)
+MARGIN = 0.5 * inch
+HEADER_GREY = colors.HexColor('#D3D3D3')
+DAY_GREY = colors.HexColor('#F0F0F0')
+
+STYLES = {
+    'title': ParagraphStyle('title', fontName='Helvetica-Bold', fontSize=16, leading=20, alignment=TA_CENTER),
+    'subtitle': ParagraphStyle('subtitle', fontName='Helvetica-Bold', fontSize=14, leading=18, alignment=TA_CENTER),
+    'info_left': ParagraphStyle('info_left', fontName='Helvetica-Bold', fontSize=10, leading=13, alignment=TA_LEFT),
+    'info_right': ParagraphStyle('info_right', fontName='Helvetica-Bold', fontSize=10, leading=13, alignment=TA_RIGHT),
+    'header': ParagraphStyle('header', fontName='Helvetica-Bold', fontSize=8, leading=10, alignment=TA_CENTER),
+    'day': ParagraphStyle('day', fontName='Helvetica-Bold', fontSize=9, leading=11, alignment=TA_CENTER),
+    'cell': ParagraphStyle('cell', fontName='Helvetica', fontSize=8, leading=10, alignment=TA_CENTER),
+}
+
+UNSAFE_FILENAME_CHARS = re.compile(r'[^\w.-]+')
+
+
+@dataclass(frozen=True)
+class Timetable:
+    """Everything render_pdf draws; plain data so it can be sent to a worker process"""
+    filename: str
+    subtitle: str
+    info: Tuple[Tuple[str, str], ...]  # (left, right) lines above the grid
+    period_labels: Tuple[str, ...]
+    rows: Tuple[Tuple[str, tuple], ...]  # (day name, grid_rows cells)
+
+
+def pdf_filename(*parts) -> str:
+    return UNSAFE_FILENAME_CHARS.sub('_', '_'.join(str(part) for part in parts)).strip('_') + '.pdf'
+
+
+def _paragraph(text, style: str) -> Paragraph:
+    return Paragraph(escape(str(text)).replace('\n', '<br/>'), STYLES[style])
+
+
+def render_pdf(timetable: Timetable) -> bytes:
+    """One A4 landscape page: titles, info lines and the day x period grid"""
+    width, height = PAGE_SIZE[0] - 2 * MARGIN, PAGE_SIZE[1] - 2 * MARGIN
+    story = [
+        _paragraph(COLLEGE_NAME, 'title'),
+        _paragraph(timetable.subtitle, 'subtitle'),
+        Spacer(1, 6),
+    ]
+    if timetable.info:
+        info = Table(
+            [[_paragraph(left, 'info_left'), _paragraph(right, 'info_right')] for left, right in timetable.info],
+            colWidths=[width / 2] * 2,
+        )
+        info.setStyle(TableStyle([('LEFTPADDING', (0, 0), (-1, -1), 0), ('RIGHTPADDING', (0, 0), (-1, -1), 0)]))
+        story += [info, Spacer(1, 6)]
+
+    grid = [[_paragraph('Days \\ Time', 'header')] + [_paragraph(label, 'header') for label in timetable.period_labels]]
+    spans = []
+    for row, (day_name, cells) in enumerate(timetable.rows, start=1):
+        line = [_paragraph(day_name, 'day')]
+        for col, cell in enumerate(cells, start=1):
+            if cell is None:
+                line.append('')
+                continue
+            text, span = cell
+            line.append(_paragraph(text, 'cell'))
+            if span > 1:
+                spans.append(('SPAN', (col, row), (col + span - 1, row)))
+        grid.append(line)
+    table = Table(grid, colWidths=[width / len(grid[0])] * len(grid[0]), repeatRows=1)
+    table.setStyle(TableStyle([
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+        ('BACKGROUND', (0, 0), (-1, 0), HEADER_GREY),
+        ('BACKGROUND', (0, 1), (0, -1), DAY_GREY),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('TOPPADDING', (0, 1), (-1, -1), 6),
+        ('BOTTOMPADDING', (0, 1), (-1, -1), 6),
+        *spans,
+    ]))
+    story.append(table)
+
+    output = io.BytesIO()
+    document = SimpleDocTemplate(
+        output, pagesize=PAGE_SIZE, leftMargin=MARGIN, rightMargin=MARGIN, topMargin=MARGIN,
+        bottomMargin=MARGIN, title=timetable.filename[:-len('.pdf')], author=COLLEGE_NAME,
+    )
+    # Keep every timetable on one page: shrink instead of breaking the grid
+    document.build([KeepInFrame(width, height, story, mode='shrink')])
+    return output.getvalue()
+
+
+def _grid(reference, slot_entries, cell_text, **options):
+    """grid_rows over the reference days and periods, reduced to picklable (day name, cells)"""
+    rows = grid_rows(slot_entries, reference.days, reference.periods, cell_text, **options)
+    return tuple((day['name'], tuple(cells)) for day, cells in rows)
+
+
+class PdfCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (kind, entity id) -> (data version, filename, pdf), least recently used first
+        self._entries = OrderedDict()
+
+    def get(self, key, version) -> Optional[Tuple[str, bytes]]:
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is None or cached[0] != version:
+                return None
+            self._entries.move_to_end(key)
+            return cached[1], cached[2]
+
+    def put(self, key, version, filename: str, pdf: bytes):
+        with self._lock:
+            current = self._entries.get(key)
+            if current is not None and current[0] > version:
+                return
+            self._entries[key] = (version, filename, pdf)
+            self._entries.move_to_end(key)
+            while len(self._entries) > settings.PDF_CACHE_MAX_ENTRIES:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+pdf_cache = PdfCache()
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _render_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: forking a process with live threads and database connections is unsafe
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.PDF_WORKERS or None, mp_context=multiprocessing.get_context('spawn')
+            )
+        return _pool
+
+
+def shutdown_render_pool():
+    """Stop the render worker processes, if any were started"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
+
+
+class PdfTimetableService:
+    @staticmethod
+    def _class_version(class_id: int):
+        return data_versions.current(CLASS_TABLES, [('class_routine_entries', class_id)])
+
+    @staticmethod
+    def class_timetables(db: Session, classes, semester_id: int = None, class_id: int = None) -> List[Timetable]:
+        """Timetables of `classes` (rows of ExportService._classes), laid out like the class sheets"""
+        reference = reference_cache.get(db)
+        teachers = ExportService._teacher_labels(db)
+        period_labels = tuple(period_label(period) for period in reference.periods)
+        return [
+            Timetable(
+                filename=pdf_filename('Class_Routine', class_.name),
+                subtitle='Class Routine',
+                info=((f"Class: {class_.name}", f"Room: {class_.room_no or 'N/A'}"),),
+                period_labels=period_labels,
+                rows=_grid(reference, slot_entries, lambda entry: ExportService._class_entry_text(entry, teachers)),
+            )
+            for class_, slot_entries in ExportService.class_slot_entries(db, classes, semester_id, class_id)
+        ]
+
+    @staticmethod
+    def class_pdf(db: Session, class_id: int) -> Optional[Tuple[str, bytes]]:
+        """(filename, pdf) of one class, or None if it does not exist"""
+        key = ('class', class_id)
+        # Read the version before building, as the rollup cache does
+        version = PdfTimetableService._class_version(class_id)
+        cached = pdf_cache.get(key, version)
+        if cached is not None:
+            return cached
+        classes = ExportService._classes(db, class_id=class_id)
+        if not classes:
+            return None
+        timetable = PdfTimetableService.class_timetables(db, classes, class_id=class_id)[0]
+        pdf = render_pdf(timetable)
+        pdf_cache.put(key, version, timetable.filename, pdf)
+        return timetable.filename, pdf
+
+    @staticmethod
+    def class_pdfs(db: Session, semester_id: int = None) -> List[Tuple[str, bytes]]:
+        """(filename, pdf) of every class (of one semester), in class id order. Timetables
+        missing from the cache are rendered in parallel in the process pool."""
+        classes = ExportService._classes(db, semester_id)
+        versions = {class_.id: PdfTimetableService._class_version(class_.id) for class_ in classes}
+        results = {class_.id: pdf_cache.get(('class', class_.id), versions[class_.id]) for class_ in classes}
+        missing = [class_ for class_ in classes if results[class_.id] is None]
+        if missing:
+            timetables = PdfTimetableService.class_timetables(db, missing, semester_id)
+            if len(timetables) > 1:
+                pdfs = _render_pool().map(render_pdf, timetables, chunksize=max(1, len(timetables) // 32))
+            else:
+                pdfs = map(render_pdf, timetables)
+            for class_, timetable, pdf in zip(missing, timetables, pdfs):
+                pdf_cache.put(('class', class_.id), versions[class_.id], timetable.filename, pdf)
+                results[class_.id] = (timetable.filename, pdf)
+        return [results[class_.id] for class_ in classes]
+
+    @staticmethod
+    def teacher_pdf(db: Session, teacher_id: int) -> Optional[Tuple[str, bytes]]:
+        """(filename, pdf) of one teacher, laid out like the teacher sheets, or None if they do not exist"""
+        key = ('teacher', teacher_id)
+        version = data_versions.current(TEACHER_TABLES)
+        cached = pdf_cache.get(key, version)
+        if cached is not None:
+            return cached
+        timetables = ClassRoutineService.get_teacher_timetables(db, teacher_id)
+        if not timetables:
+            return None
+        timetable = timetables[0]
+        reference = reference_cache.get(db)
+        departments = {d['id']: d['name'] for d in reference.departments}
+        department_id = timetable['department_id']
+        department = departments.get(department_id, 'N/A') if department_id else 'Not Assigned'
+        teachers = ExportService._teacher_labels(db)
+        slot_entries = {
+            tuple(int(part) for part in slot.split('-')): cell
+            for slot, cell in timetable['routine'].items()
+        }
+        document = Timetable(
+            filename=pdf_filename('Teacher_Routine', timetable['teacher_name']),
+            subtitle="Teacher's Routine",
+            info=(
+                (f"Teacher: {timetable['teacher_name']}", f"Total Load: {to_fixed(timetable['total_load'])}"),
+                (f"Department: {department}", ''),
+            ),
+            period_labels=tuple(period_label(period) for period in reference.periods),
+            rows=_grid(
+                reference, slot_entries, lambda cell: ExportService._teacher_cell_text(cell, teachers),
+                num_periods=itemgetter('num_periods'),
+            ),
+        )
+        pdf = render_pdf(document)
+        pdf_cache.put(key, version, document.filename, pdf)
+        return document.filename, pdf
+
+    @staticmethod
+    def _room_entry_text(entry, teachers) -> str:
+        text = entry.subject_name or 'N/A'
+        if entry.is_lab:
+            text += ' (Lab)'
+        text += f"\n[{entry.class_name}]"
+        labels = [
+            teachers[teacher_id]
+            for teacher_id in (entry.lead_teacher_id, entry.assist_teacher_1_id,
+                               entry.assist_teacher_2_id, entry.assist_teacher_3_id)
+            if teacher_id in teachers
+        ]
+        if labels:
+            text += f"\n({', '.join(labels)})"
+        if entry.is_lab and entry.group:
+            text += f"\nGroup: {entry.group}"
+        return text
+
+    @staticmethod
+    def _room_entries(db: Session, room_number: str):
+        """Lab entries in the room and theory entries of the classes it houses"""
+        Entry = models.ClassRoutineEntry
+        return db.query(
+            Entry.id, Entry.day_id, Entry.period_id, Entry.is_lab, Entry.num_periods, Entry.group,
+            Entry.lead_teacher_id, Entry.assist_teacher_1_id, Entry.assist_teacher_2_id, Entry.assist_teacher_3_id,
+            models.Subject.name.label('subject_name'),
+            models.Class.name.label('class_name'),
+        ).join(
+            models.Class, models.Class.id == Entry.class_id
+        ).outerjoin(
+            models.Subject, models.Subject.id == Entry.subject_id
+        ).filter(or_(
+            and_(Entry.is_lab.is_(True), Entry.lab_room == room_number),
+            and_(or_(Entry.is_lab.is_(False), Entry.is_lab.is_(None)), models.Class.room_no == room_number),
+        )).order_by(Entry.day_id, Entry.period_id, Entry.id).all()
+
+    @staticmethod
+    def room_pdf(db: Session, room_id: int) -> Optional[Tuple[str, bytes]]:
+        """(filename, pdf) of one room, or None if it does not exist. Sessions sharing a slot
+        (lab groups) are listed one under another."""
+        key = ('room', room_id)
+        version = data_versions.current(ROOM_TABLES)
+        cached = pdf_cache.get(key, version)
+        if cached is not None:
+            return cached
+        room = db.query(models.Room).filter(models.Room.id == room_id).first()
+        if room is None:
+            return None
+        reference = reference_cache.get(db)
+        teachers = ExportService._teacher_labels(db)
+        slot_entries = {}
+        for entry in PdfTimetableService._room_entries(db, room.room_number):
+            slot_entries.setdefault((entry.day_id, entry.period_id), []).append(entry)
+        details = ', '.join(
+            part for part in (room.building, f"Capacity: {room.capacity}" if room.capacity else None) if part
+        )
+        document = Timetable(
+            filename=pdf_filename('Room_Routine', room.room_number),
+            subtitle='Room Routine',
+            info=((f"Room: {room.room_number}", details),),
+            period_labels=tuple(period_label(period) for period in reference.periods),
+            rows=_grid(
+                reference, slot_entries,
+                lambda entries: SESSION_SEPARATOR.join(
+                    PdfTimetableService._room_entry_text(entry, teachers) for entry in entries
+                ),
+                num_periods=lambda entries: max(entry.num_periods or 1 for entry in entries),
+            ),
+        )
+        pdf = render_pdf(document)
+        pdf_cache.put(key, version, document.filename, pdf)
+        return document.filename, pdf
@@ -0,0 +1,99 @@
+"""In-process cache of reference data: days, periods, departments, rooms and programmes.
+
+These tables change a few times a term but are read by nearly every request
+(period orders for every conflict check, day and period lists for every page).
+The cache loads all of them on first use and keeps them until a service write
+calls reference_cache.invalidate(); DayService, PeriodService,
+DepartmentService, RoomService and ProgrammeService do so after each commit.
+
+Edits made outside the API (scripts, direct SQL) are not seen until the next
+invalidation or restart. Like the occupancy index this is per process.
+"""
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+from sqlalchemy.orm import Session
+from app.models import models
+
+
+def _rows(db: Session, model, *order_by):
+    """All rows of `model` as plain column dicts"""
+    return [row._asdict() for row in db.query(*model.__table__.columns).order_by(*order_by).all()]
+
+
+@dataclass(frozen=True)
+class ReferenceData:
+    """One consistent snapshot of the reference tables; never mutate it"""
+    # Full rows (column dicts) in the order the list endpoints return them
+    days: List[dict] = field(default_factory=list)
+    periods: List[dict] = field(default_factory=list)
+    departments: List[dict] = field(default_factory=list)
+    rooms: List[dict] = field(default_factory=list)
+    programmes: List[dict] = field(default_factory=list)
+    # Typed lookups
+    period_order: Dict[int, int] = field(default_factory=dict)  # period id -> order
+    period_by_order: Dict[int, int] = field(default_factory=dict)  # order -> period id
+    period_ids: List[int] = field(default_factory=list)  # period ids in order
+    last_period_order: Optional[int] = None
+    day_order: Dict[int, int] = field(default_factory=dict)  # day id -> order
+    day_names: Dict[int, str] = field(default_factory=dict)  # day id -> name
+    day_ids: List[int] = field(default_factory=list)  # day ids in order
+    department_codes: Dict[int, str] = field(default_factory=dict)  # department id -> code
+    programme_codes: Dict[int, str] = field(default_factory=dict)  # programme id -> code
+    room_numbers: List[str] = field(default_factory=list)
+
+    @classmethod
+    def load(cls, db: Session) -> 'ReferenceData':
+        days = _rows(db, models.Day, models.Day.order, models.Day.id)
+        periods = _rows(db, models.Period, models.Period.order, models.Period.id)
+        departments = _rows(db, models.Department, models.Department.id)
+        rooms = _rows(db, models.Room, models.Room.room_number)
+        programmes = _rows(db, models.Programme, models.Programme.id)
+
+        period_order = {p['id']: p['order'] for p in periods}
+        return cls(
+            days=days,
+            periods=periods,
+            departments=departments,
+            rooms=rooms,
+            programmes=programmes,
+            period_order=period_order,
+            period_by_order={p['order']: p['id'] for p in reversed(periods)},
+            period_ids=[p['id'] for p in periods],
+            last_period_order=max(period_order.values()) if period_order else None,
+            day_order={d['id']: d['order'] for d in days},
+            day_names={d['id']: d['name'] for d in days},
+            day_ids=[d['id'] for d in days],
+            department_codes={d['id']: d['code'] for d in departments},
+            programme_codes={p['id']: p['code'] for p in programmes},
+            room_numbers=[r['room_number'] for r in rooms],
+        )
+
+
+class ReferenceCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data: Optional[ReferenceData] = None
+        self._generation = 0
+
+    def get(self, db: Session) -> ReferenceData:
+        """Current snapshot, loading it with `db` if it was invalidated"""
+        data = self._data
+        if data is not None:
+            return data
+        with self._lock:
+            generation = self._generation
+        data = ReferenceData.load(db)
+        with self._lock:
+            # Don't keep a snapshot that an invalidation raced with
+            if generation == self._generation:
+                self._data = data
+        return data
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._data = None
+
+
+reference_cache = ReferenceCache()
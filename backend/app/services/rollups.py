@@ -0,0 +1,205 @@
+"""Workload and cost rollups for department heads.
+
+Totals of theory/lab periods, workload, extra load and payment grouped by
+department, programme, semester or recruitment type (Full Time / Part Time).
+
+- department and recruitment group teachers by their own department and
+  recruitment; every figure is the sum over those teachers
+- programme and semester group the routine entries by the semester of the
+  class they are taught in. A teacher's extra load and payment are shared
+  out in proportion to the workload they teach in each group, so the group
+  totals add up to the same overall figures
+
+Extra load counts overload only (teachers below their effective load add 0).
+
+Results are cached per grouping and recomputed only when one of
+ROLLUP_TABLES has a newer data version (see app.core.versioning), so repeated
+dashboard views cost a version lookup. Like the versions, the cache is per
+process.
+"""
+import threading
+from collections import defaultdict
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import Session
+from app.core.versioning import data_versions
+from app.models import models
+from app.services.workload import HALF_LAB_TENTHS, LAB_TENTHS, THEORY_TENTHS, WorkloadService
+
+GROUPINGS = ('department', 'programme', 'semester', 'recruitment')
+
+# Tables the rollups are computed from
+ROLLUP_TABLES = (
+    'teacher_loads', 'teachers', 'teacher_effective_loads', 'position_rates', 'departments',
+    'programmes', 'semesters', 'classes', 'class_routine_entries', 'routine_entry_teachers', 'subjects',
+)
+
+NOT_ASSIGNED = 'Not Assigned'
+
+
+def _group(key, name):
+    return {
+        'key': key,
+        'name': name,
+        'teachers': set(),
+        'theory_periods': 0,
+        'lab_periods': 0,
+        'theory_tenths': 0,
+        'lab_tenths': 0,
+        'extra_load': 0.0,
+        'total_payment': 0.0,
+    }
+
+
+def _finish(groups):
+    """Group accumulators -> response rows sorted by name, plus a totals row"""
+    rows = []
+    for group in groups.values():
+        theory_tenths, lab_tenths = group.pop('theory_tenths'), group.pop('lab_tenths')
+        group['teachers'] = len(group['teachers'])
+        group['total_periods'] = group['theory_periods'] + group['lab_periods']
+        group['theory_workload'] = theory_tenths / 10
+        group['lab_workload'] = lab_tenths / 10
+        group['total_workload'] = (theory_tenths + lab_tenths) / 10
+        group['extra_load'] = round(group['extra_load'], 2)
+        group['total_payment'] = round(group['total_payment'], 2)
+        rows.append(group)
+    rows.sort(key=lambda g: (g['name'] == NOT_ASSIGNED, str(g['name']).casefold()))
+
+    totals = {field: sum(row[field] for row in rows) for field in (
+        'theory_periods', 'lab_periods', 'total_periods')}
+    for field in ('theory_workload', 'lab_workload', 'total_workload', 'extra_load', 'total_payment'):
+        totals[field] = round(sum(row[field] for row in rows), 2)
+    return {'groups': rows, 'totals': totals}
+
+
+class RollupService:
+    @staticmethod
+    def _teacher_groups(db: Session, grouping: str):
+        """Department / recruitment rollup over the teacher load report rows"""
+        groups = {}
+        for teacher in WorkloadService.get_teacher_loads(db):
+            if grouping == 'department':
+                key, name = teacher['department_id'], teacher['department_name']
+            else:
+                key = name = teacher['recruitment'] or NOT_ASSIGNED
+            group = groups.get(key)
+            if group is None:
+                group = groups[key] = _group(key, name)
+            group['teachers'].add(teacher['teacher_id'])
+            for subject in teacher['subjects'].values():
+                kind = 'lab' if subject['type'] == 'P' else 'theory'
+                group[f'{kind}_periods'] += subject['periods']
+                group[f'{kind}_tenths'] += round(subject['workload'] * 10)
+            group['extra_load'] += max(teacher['extra_load'], 0)
+            group['total_payment'] += teacher['total_payment']
+        return groups
+
+    @staticmethod
+    def _class_loads(db: Session):
+        """(teacher, semester, theory/lab) period and workload sums over the routine,
+        counted the same way as teacher_loads: entries without a subject (BREAK, LC, or
+        a deleted subject) are skipped there, so they are skipped here too, and entries
+        of a deleted class count as Not Assigned"""
+        Entry = models.ClassRoutineEntry
+        EntryTeacher = models.RoutineEntryTeacher
+        is_lab = case((Entry.is_lab.is_(True), 1), else_=0)
+        periods = case((func.coalesce(Entry.num_periods, 0) == 0, 1), else_=Entry.num_periods)
+        tenths = case(
+            (Entry.is_lab.is_(True) & Entry.is_half_lab.is_(True), periods * HALF_LAB_TENTHS),
+            (Entry.is_lab.is_(True), periods * LAB_TENTHS),
+            else_=periods * THEORY_TENTHS,
+        )
+        return db.query(
+            EntryTeacher.teacher_id,
+            models.Class.semester_id,
+            is_lab.label('is_lab'),
+            func.sum(periods).label('periods'),
+            func.sum(tenths).label('workload_tenths'),
+        ).join(
+            Entry, Entry.id == EntryTeacher.entry_id
+        ).outerjoin(
+            models.Class, models.Class.id == Entry.class_id
+        ).filter(
+            Entry.subject_id.in_(select(models.Subject.id))
+        ).group_by(
+            EntryTeacher.teacher_id, models.Class.semester_id, is_lab
+        ).all()
+
+    @staticmethod
+    def _class_groups(db: Session, grouping: str):
+        """Programme / semester rollup over the routine, with each teacher's extra load and
+        payment shared out by the workload they teach in each group"""
+        semesters = {
+            row.id: row for row in db.query(
+                models.Semester.id, models.Semester.name, models.Semester.programme_id,
+                models.Programme.name.label('programme_name'),
+            ).outerjoin(models.Programme, models.Programme.id == models.Semester.programme_id).all()
+        }
+        teachers = {t['teacher_id']: t for t in WorkloadService.get_teacher_loads(db)}
+
+        groups = {}
+        for row in RollupService._class_loads(db):
+            teacher = teachers.get(row.teacher_id)
+            if teacher is None:
+                continue
+            semester = semesters.get(row.semester_id)
+            if grouping == 'semester':
+                key = row.semester_id if semester else None
+                name = (f"{semester.programme_name} - {semester.name}" if semester.programme_name
+                        else semester.name) if semester else NOT_ASSIGNED
+            else:
+                key = semester.programme_id if semester else None
+                name = (semester.programme_name or NOT_ASSIGNED) if semester else NOT_ASSIGNED
+            group = groups.get(key)
+            if group is None:
+                group = groups[key] = _group(key, name)
+            group['teachers'].add(row.teacher_id)
+            kind = 'lab' if row.is_lab else 'theory'
+            group[f'{kind}_periods'] += row.periods
+            group[f'{kind}_tenths'] += row.workload_tenths
+
+            teacher_tenths = round(teacher['total_workload'] * 10)
+            if teacher_tenths:
+                share = row.workload_tenths / teacher_tenths
+                group['extra_load'] += max(teacher['extra_load'], 0) * share
+                group['total_payment'] += teacher['total_payment'] * share
+        return groups
+
+    @staticmethod
+    def compute(db: Session, grouping: str):
+        if grouping not in GROUPINGS:
+            raise ValueError(f"Unknown grouping: {grouping}")
+        if grouping in ('department', 'recruitment'):
+            groups = RollupService._teacher_groups(db, grouping)
+        else:
+            groups = RollupService._class_groups(db, grouping)
+        return {'group_by': grouping, **_finish(groups)}
+
+
+class RollupCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # grouping -> (data version, result)
+        self._results = {}
+
+    def get(self, db: Session, grouping: str):
+        """Rollup for `grouping`, recomputed only if the data changed since it was cached"""
+        # Read the version before computing: a write that lands meanwhile makes the
+        # stored result stale at once instead of hiding behind the newer version
+        version = data_versions.current(ROLLUP_TABLES)
+        cached = self._results.get(grouping)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        result = RollupService.compute(db, grouping)
+        with self._lock:
+            current = self._results.get(grouping)
+            if current is None or current[0] <= version:
+                self._results[grouping] = (version, result)
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+
+
+rollup_cache = RollupCache()
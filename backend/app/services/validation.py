@@ -0,0 +1,160 @@
+"""Whole-timetable validation.
+
+Scans every ClassRoutineEntry once, groups period intervals per
+(resource, day) and sweeps them in start order to report:
+
+- teacher double-bookings (lead or any assistant slot)
+- lab room clashes
+- overlapping entries within one class
+- entries whose num_periods run past the last period
+"""
+import heapq
+from collections import defaultdict
+from sqlalchemy.orm import Session
+from app.models import models
+from app.services.occupancy import span_end
+from app.services.reference_cache import reference_cache
+
+
+def _sweep(intervals):
+    """Yield every overlapping (entry_id, entry_id) pair from (start, end, entry_id) intervals (inclusive ends)"""
+    intervals.sort()
+    active = []  # heap of (end, entry_id)
+    for start, end, entry_id in intervals:
+        while active and active[0][0] < start:
+            heapq.heappop(active)
+        for _, other_id in active:
+            yield other_id, entry_id
+        heapq.heappush(active, (end, entry_id))
+
+
+class TimetableValidationService:
+    @staticmethod
+    def validate(db: Session):
+        """Validate the whole timetable and return a report of every clash found"""
+        Entry = models.ClassRoutineEntry
+        entries = db.query(
+            Entry.id,
+            Entry.class_id,
+            Entry.day_id,
+            Entry.period_id,
+            Entry.is_lab,
+            Entry.num_periods,
+            Entry.lead_teacher_id,
+            Entry.assist_teacher_1_id,
+            Entry.assist_teacher_2_id,
+            Entry.assist_teacher_3_id,
+            Entry.group,
+            Entry.lab_room,
+            Entry.lab_group_id,
+        ).all()
+
+        reference = reference_cache.get(db)
+        period_order_map = reference.period_order
+        last_order = reference.last_period_order
+        class_names = {c.id: c.name for c in db.query(models.Class.id, models.Class.name).all()}
+        teacher_names = {t.id: t.abbreviation for t in db.query(models.Teacher.id, models.Teacher.abbreviation).all()}
+        day_names = reference.day_names
+
+        teacher_intervals = defaultdict(list)
+        room_intervals = defaultdict(list)
+        class_intervals = defaultdict(list)
+        # entry_id -> (class_id, group, lab_group_id, start, end)
+        details = {}
+        period_overruns = []
+
+        def overrun(entry_id, class_id, day_id, period_id, reason):
+            period_overruns.append({
+                'entry_id': entry_id,
+                'class_id': class_id,
+                'class_name': class_names.get(class_id, 'Unknown'),
+                'day_id': day_id,
+                'day_name': day_names.get(day_id, 'Unknown'),
+                'period_id': period_id,
+                'reason': reason,
+            })
+
+        # Rows are unpacked as plain tuples; attribute access per row is the hot spot at 10k entries
+        for (entry_id, class_id, day_id, period_id, is_lab, num_periods,
+             lead_id, assist_1_id, assist_2_id, assist_3_id, group, lab_room, lab_group_id) in entries:
+            start = period_order_map.get(period_id)
+            if start is None:
+                overrun(entry_id, class_id, day_id, period_id, 'unknown period')
+                continue
+
+            end = span_end(start, num_periods)
+            details[entry_id] = (class_id, group, lab_group_id, start, end)
+            if last_order is not None and end > last_order:
+                overrun(entry_id, class_id, day_id, period_id,
+                        f'periods {start}-{end} run past the last period ({last_order})')
+
+            interval = (start, end, entry_id)
+            for teacher_id in {lead_id, assist_1_id, assist_2_id, assist_3_id}:
+                if teacher_id is not None:
+                    teacher_intervals[(teacher_id, day_id)].append(interval)
+            if is_lab and lab_room:
+                room_intervals[(lab_room, day_id)].append(interval)
+            class_intervals[(class_id, day_id)].append(interval)
+
+        def shares_session(a, b):
+            """Parts of one multi-subject lab session of the same class"""
+            return a[0] == b[0] and a[2] is not None and a[2] == b[2]
+
+        def split_groups(a, b):
+            """Same class, different lab groups (e.g. Y and Z)"""
+            return a[1] is not None and b[1] is not None and a[1] != b[1]
+
+        def clash(kind, resource_key, resource_name, day_id, a_id, b_id):
+            a, b = details[a_id], details[b_id]
+            return {
+                kind: resource_key,
+                'resource': resource_name,
+                'day_id': day_id,
+                'day_name': day_names.get(day_id, 'Unknown'),
+                'entry_ids': [a_id, b_id],
+                'class_names': [class_names.get(a[0], 'Unknown'), class_names.get(b[0], 'Unknown')],
+                'periods': [f"{a[3]}-{a[4]}", f"{b[3]}-{b[4]}"],
+            }
+
+        teacher_conflicts = []
+        for (teacher_id, day_id), intervals in teacher_intervals.items():
+            for a_id, b_id in _sweep(intervals):
+                if not shares_session(details[a_id], details[b_id]):
+                    teacher_conflicts.append(
+                        clash('teacher_id', teacher_id, teacher_names.get(teacher_id, 'Unknown'), day_id, a_id, b_id)
+                    )
+
+        lab_room_conflicts = []
+        for (lab_room, day_id), intervals in room_intervals.items():
+            for a_id, b_id in _sweep(intervals):
+                if not shares_session(details[a_id], details[b_id]):
+                    lab_room_conflicts.append(clash('lab_room', lab_room, lab_room, day_id, a_id, b_id))
+
+        class_overlaps = []
+        for (class_id, day_id), intervals in class_intervals.items():
+            for a_id, b_id in _sweep(intervals):
+                a, b = details[a_id], details[b_id]
+                if not shares_session(a, b) and not split_groups(a, b):
+                    class_overlaps.append(
+                        clash('class_id', class_id, class_names.get(class_id, 'Unknown'), day_id, a_id, b_id)
+                    )
+
+        for issues in (teacher_conflicts, lab_room_conflicts, class_overlaps):
+            issues.sort(key=lambda issue: (issue['day_id'], issue['entry_ids']))
+        period_overruns.sort(key=lambda issue: issue['entry_id'])
+
+        issue_counts = {
+            'teacher_conflicts': len(teacher_conflicts),
+            'lab_room_conflicts': len(lab_room_conflicts),
+            'class_overlaps': len(class_overlaps),
+            'period_overruns': len(period_overruns),
+        }
+        return {
+            'valid': not any(issue_counts.values()),
+            'entry_count': len(entries),
+            'issue_counts': issue_counts,
+            'teacher_conflicts': teacher_conflicts,
+            'lab_room_conflicts': lab_room_conflicts,
+            'class_overlaps': class_overlaps,
+            'period_overruns': period_overruns,
+        }
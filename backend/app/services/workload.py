@@ -0,0 +1,317 @@
+"""Teacher workload (the Teacher Load Report).
+
+Same rules as the report used to compute in the browser (Schedules.jsx):
+
+- every teacher slot of a routine entry (lead and assistants) counts, entries
+  without a subject are skipped
+- workload per period: theory 1.0, lab 0.8, half lab 0.4
+- extra load = total workload - effective load (default 20)
+- payment = extra load * position rate * 15 when extra load > 0 and the
+  teacher's position has a rate
+
+Loads are kept in tenths of a period so sums are exact decimals, in the
+materialized teacher_loads table (one row per teacher, subject name and
+theory/lab). ClassRoutineService passes the old and new versions of every
+entry a routine save or delete touches to apply_entry_changes(), which adds
+and subtracts their contributions for the affected teachers only. rebuild()
+recomputes the table from scratch with one grouped query over
+routine_entry_teachers; check() compares the two.
+"""
+from collections import defaultdict
+from sqlalchemy import case, delete, func, insert, update
+from sqlalchemy.orm import Session
+from app.models import models
+from app.services.reference_cache import reference_cache
+
+TEACHER_SLOTS = ('lead_teacher_id', 'assist_teacher_1_id', 'assist_teacher_2_id', 'assist_teacher_3_id')
+
+DEFAULT_EFFECTIVE_LOAD = 20
+PAYMENT_WEEKS = 15
+# Workload per period in tenths
+THEORY_TENTHS = 10
+LAB_TENTHS = 8
+HALF_LAB_TENTHS = 4
+
+
+def entry_load(entry) -> tuple:
+    """(periods, workload tenths) one teacher slot of a routine entry contributes"""
+    periods = entry['num_periods'] or 1
+    if entry['is_lab']:
+        return periods, periods * (HALF_LAB_TENTHS if entry['is_half_lab'] else LAB_TENTHS)
+    return periods, periods * THEORY_TENTHS
+
+
+class WorkloadService:
+    @staticmethod
+    def _aggregate(db: Session, teacher_id: int = None):
+        """Recompute from the routine: one row per (teacher, subject name, theory/lab) with
+        period, workload and slot sums"""
+        Entry = models.ClassRoutineEntry
+        EntryTeacher = models.RoutineEntryTeacher
+        is_lab = case((Entry.is_lab.is_(True), 1), else_=0)
+        periods = case((func.coalesce(Entry.num_periods, 0) == 0, 1), else_=Entry.num_periods)
+        tenths = case(
+            (Entry.is_lab.is_(True) & Entry.is_half_lab.is_(True), periods * HALF_LAB_TENTHS),
+            (Entry.is_lab.is_(True), periods * LAB_TENTHS),
+            else_=periods * THEORY_TENTHS,
+        )
+        query = db.query(
+            EntryTeacher.teacher_id,
+            models.Subject.name.label('subject_name'),
+            is_lab.label('is_lab'),
+            func.sum(periods).label('periods'),
+            func.sum(tenths).label('workload_tenths'),
+            func.count().label('entry_count'),
+            func.min(Entry.id).label('first_entry_id'),
+        ).join(
+            Entry, Entry.id == EntryTeacher.entry_id
+        ).join(
+            models.Subject, models.Subject.id == Entry.subject_id
+        ).group_by(
+            EntryTeacher.teacher_id, models.Subject.name, is_lab
+        )
+        if teacher_id is not None:
+            query = query.filter(EntryTeacher.teacher_id == teacher_id)
+        return query.all()
+
+    @staticmethod
+    def _stored(db: Session, teacher_id: int = None):
+        """Rows of the materialized teacher_loads table"""
+        Load = models.TeacherLoad
+        query = db.query(
+            Load.teacher_id, Load.subject_name, Load.is_lab, Load.periods,
+            Load.workload_tenths, Load.entry_count, Load.first_entry_id,
+        )
+        if teacher_id is not None:
+            query = query.filter(Load.teacher_id == teacher_id)
+        return query.all()
+
+    @staticmethod
+    def _first_entry_id(db: Session, teacher_id: int, subject_name: str, is_lab: bool):
+        """Lowest entry id still contributing to one teacher_loads row"""
+        Entry = models.ClassRoutineEntry
+        EntryTeacher = models.RoutineEntryTeacher
+        lab_filter = Entry.is_lab.is_(True) if is_lab else func.coalesce(Entry.is_lab, False).is_(False)
+        return db.query(func.min(Entry.id)).join(
+            EntryTeacher, EntryTeacher.entry_id == Entry.id
+        ).join(
+            models.Subject, models.Subject.id == Entry.subject_id
+        ).filter(
+            EntryTeacher.teacher_id == teacher_id, models.Subject.name == subject_name, lab_filter
+        ).scalar()
+
+    @staticmethod
+    def apply_entry_changes(db: Session, removed_entries, added_entries):
+        """Update teacher_loads by the contributions of removed and added routine entries.
+
+        Entries are column-value dicts (id, subject_id, is_lab, is_half_lab, num_periods and
+        the teacher slots); an updated entry is passed as removed (old values) and added (new
+        values). Must run after the entries and their routine_entry_teachers rows are written,
+        in the same transaction, without committing.
+        """
+        subject_ids = {e['subject_id'] for e in [*removed_entries, *added_entries] if e['subject_id'] is not None}
+        if not subject_ids:
+            return
+        subject_names = dict(db.query(models.Subject.id, models.Subject.name).filter(
+            models.Subject.id.in_(subject_ids)
+        ).all())
+
+        # (teacher_id, subject_name, is_lab) -> [periods, tenths, slots]
+        deltas = defaultdict(lambda: [0, 0, 0])
+        removed_ids = defaultdict(set)
+        first_added = {}
+        for sign, entries in ((-1, removed_entries), (1, added_entries)):
+            for entry in entries:
+                subject_name = subject_names.get(entry['subject_id'])
+                if subject_name is None:
+                    continue
+                periods, tenths = entry_load(entry)
+                for slot in TEACHER_SLOTS:
+                    if entry[slot] is None:
+                        continue
+                    key = (entry[slot], subject_name, bool(entry['is_lab']))
+                    delta = deltas[key]
+                    delta[0] += sign * periods
+                    delta[1] += sign * tenths
+                    delta[2] += sign
+                    if sign < 0:
+                        removed_ids[key].add(entry['id'])
+                    else:
+                        first_added[key] = min(first_added.get(key, entry['id']), entry['id'])
+
+        Load = models.TeacherLoad
+        stored = {
+            (row.teacher_id, row.subject_name, row.is_lab): row
+            for row in db.query(
+                Load.id, Load.teacher_id, Load.subject_name, Load.is_lab,
+                Load.periods, Load.workload_tenths, Load.entry_count, Load.first_entry_id,
+            ).filter(Load.teacher_id.in_({key[0] for key in deltas})).all()
+        }
+        to_insert, to_update, to_delete = [], [], []
+        for key, (d_periods, d_tenths, d_slots) in deltas.items():
+            row = stored.get(key)
+            if row is None:
+                if d_slots > 0:
+                    to_insert.append({
+                        'teacher_id': key[0], 'subject_name': key[1], 'is_lab': key[2],
+                        'periods': d_periods, 'workload_tenths': d_tenths,
+                        'entry_count': d_slots, 'first_entry_id': first_added.get(key),
+                    })
+                continue
+            if not (d_periods or d_tenths or d_slots or key in removed_ids or key in first_added):
+                continue
+            if row.entry_count + d_slots <= 0:
+                to_delete.append(row.id)
+                continue
+            if row.first_entry_id in removed_ids.get(key, ()):
+                first_entry_id = WorkloadService._first_entry_id(db, *key)
+            else:
+                first_entry_id = min(i for i in (row.first_entry_id, first_added.get(key)) if i is not None)
+            to_update.append({
+                'id': row.id,
+                'periods': row.periods + d_periods,
+                'workload_tenths': row.workload_tenths + d_tenths,
+                'entry_count': row.entry_count + d_slots,
+                'first_entry_id': first_entry_id,
+            })
+
+        if to_delete:
+            db.execute(delete(Load).where(Load.id.in_(to_delete)))
+        if to_update:
+            db.execute(update(Load), to_update)
+        if to_insert:
+            db.execute(insert(Load), to_insert)
+
+    @staticmethod
+    def rebuild(db: Session):
+        """Recompute teacher_loads from the routine; returns the number of rows written"""
+        rows = [row._asdict() for row in WorkloadService._aggregate(db)]
+        for row in rows:
+            row['is_lab'] = bool(row['is_lab'])
+        db.execute(delete(models.TeacherLoad))
+        if rows:
+            db.execute(insert(models.TeacherLoad), rows)
+        db.commit()
+        return len(rows)
+
+    @staticmethod
+    def check(db: Session):
+        """Differences between the materialized teacher_loads and a fresh recomputation"""
+        fields = ('periods', 'workload_tenths', 'entry_count', 'first_entry_id')
+        stored = {(r.teacher_id, r.subject_name, bool(r.is_lab)): r for r in WorkloadService._stored(db)}
+        fresh = {(r.teacher_id, r.subject_name, bool(r.is_lab)): r for r in WorkloadService._aggregate(db)}
+        differences = []
+        for key in sorted(stored.keys() | fresh.keys(), key=lambda k: (k[0], k[1] or '', k[2])):
+            expected, actual = fresh.get(key), stored.get(key)
+            expected_values = {f: getattr(expected, f) for f in fields} if expected else None
+            actual_values = {f: getattr(actual, f) for f in fields} if actual else None
+            if expected_values != actual_values:
+                differences.append({
+                    'teacher_id': key[0],
+                    'subject_name': key[1],
+                    'is_lab': key[2],
+                    'expected': expected_values,
+                    'stored': actual_values,
+                })
+        return differences
+
+    @staticmethod
+    def _teachers(db: Session, teacher_id: int = None):
+        """Teachers with their effective load, position and position rate"""
+        query = db.query(
+            models.Teacher.id,
+            models.Teacher.name,
+            models.Teacher.abbreviation,
+            models.Teacher.department_id,
+            models.Teacher.recruitment,
+            models.TeacherEffectiveLoad.effective_load,
+            models.TeacherEffectiveLoad.position,
+            models.PositionRate.rate,
+        ).outerjoin(
+            models.TeacherEffectiveLoad, models.TeacherEffectiveLoad.teacher_id == models.Teacher.id
+        ).outerjoin(
+            models.PositionRate, models.PositionRate.position == models.TeacherEffectiveLoad.position
+        )
+        if teacher_id is not None:
+            query = query.filter(models.Teacher.id == teacher_id)
+        return query.all()
+
+    @staticmethod
+    def get_teacher_loads(db: Session, teacher_id: int = None):
+        """Per-teacher load report rows (teachers without assigned periods are left out), sorted by name"""
+        departments = {d['id']: d['name'] for d in reference_cache.get(db).departments}
+        loads = {}
+        for row in WorkloadService._teachers(db, teacher_id):
+            effective_load = row.effective_load if row.effective_load is not None else DEFAULT_EFFECTIVE_LOAD
+            loads[row.id] = {
+                'teacher_id': row.id,
+                'teacher_name': row.name,
+                'abbreviation': row.abbreviation,
+                'department_id': row.department_id,
+                'department_name': departments.get(row.department_id) if row.department_id else 'Not Assigned',
+                'recruitment': row.recruitment,
+                'effective_load': effective_load,
+                'position': row.position,
+                'subjects': {},
+                'total_periods': 0,
+                'total_workload': 0,
+                'extra_load': 0,
+                'total_payment': 0,
+                '_rate': row.rate,
+                '_tenths': 0,
+            }
+
+        # Subjects in the order they first appear in the routine
+        for row in sorted(WorkloadService._stored(db, teacher_id), key=lambda r: r.first_entry_id):
+            teacher = loads.get(row.teacher_id)
+            if teacher is None:
+                continue
+            subject_type = 'P' if row.is_lab else 'T'
+            teacher['subjects'][f"{row.subject_name}_{subject_type}"] = {
+                'subject_name': row.subject_name,
+                'type': subject_type,
+                'periods': row.periods,
+                'workload': row.workload_tenths / 10,
+            }
+            teacher['total_periods'] += row.periods
+            teacher['_tenths'] += row.workload_tenths
+
+        result = []
+        for teacher in loads.values():
+            rate = teacher.pop('_rate')
+            teacher['total_workload'] = teacher.pop('_tenths') / 10
+            if teacher['total_periods'] <= 0:
+                continue
+            teacher['extra_load'] = teacher['total_workload'] - teacher['effective_load']
+            if teacher['extra_load'] > 0 and teacher['position'] and rate:
+                teacher['total_payment'] = teacher['extra_load'] * rate * PAYMENT_WEEKS
+            result.append(teacher)
+
+        result.sort(key=lambda t: ((t['teacher_name'] or '').casefold(), t['teacher_name'] or ''))
+        return result
+
+    @staticmethod
+    def get_subject_loads(db: Session):
+        """Per-subject totals (theory and lab separately) summed over every teacher slot, sorted by subject name"""
+        subjects = {}
+        for row in sorted(WorkloadService._stored(db), key=lambda r: r.first_entry_id):
+            subject_type = 'P' if row.is_lab else 'T'
+            key = f"{row.subject_name}_{subject_type}"
+            subject = subjects.setdefault(key, {
+                'subject_name': row.subject_name,
+                'type': subject_type,
+                'periods': 0,
+                'workload': 0,
+                'teacher_ids': [],
+                '_tenths': 0,
+            })
+            subject['periods'] += row.periods
+            subject['_tenths'] += row.workload_tenths
+            subject['teacher_ids'].append(row.teacher_id)
+
+        result = []
+        for subject in subjects.values():
+            subject['workload'] = subject.pop('_tenths') / 10
+            result.append(subject)
+        result.sort(key=lambda s: ((s['subject_name'] or '').casefold(), s['type']))
+        return result
@@ -1,17 +1,21 @@
 
 # -*- mode: python ; coding: utf-8 -*-
+from PyInstaller.utils.hooks import collect_all
 
 block_cipher = None
 
+# reportlab loads font data and some modules dynamically
+reportlab_datas, reportlab_binaries, reportlab_hiddenimports = collect_all('reportlab')
+
 a = Analysis(
     ['run.py'],
     pathex=[],
-    binaries=[],
+    binaries=reportlab_binaries,
     datas=[
         ('kec_routine.db', '.'),
         ('app', 'app'),
         ('.env', '.'),
-    ],
+    ] + reportlab_datas,
     hiddenimports=[
         'uvicorn.logging',
         'uvicorn.loops',
@@ -24,7 +28,8 @@ a = Analysis(
         'uvicorn.lifespan',
         'uvicorn.lifespan.on',
         'sqlalchemy.ext.baked',
-    ],
+        'xlsxwriter',
+    ] + reportlab_hiddenimports,
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
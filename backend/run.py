@@ -1,7 +1,11 @@
+import multiprocessing
 import uvicorn
 import sys
 
 if __name__ == "__main__":
+    # Lets worker processes of a frozen (PyInstaller) build start without re-running the server
+    multiprocessing.freeze_support()
+    
     # Disable reload when running as executable (PyInstaller)
     is_executable = getattr(sys, 'frozen', False)
     reload_mode = False if is_executable else True
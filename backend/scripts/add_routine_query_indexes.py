@@ -0,0 +1,38 @@
+"""
+Migration script to create the indexes used by the routine search API
+(GET /class-routines/search/) and the routine exports on existing databases
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text
+from app.core.config import settings
+from app.models import models
+
+def add_routine_query_indexes():
+    # Create database engine
+    engine = create_engine(settings.DATABASE_URL)
+
+    tables = [
+        models.ClassRoutineEntry.__table__,
+        models.Class.__table__,
+        models.Semester.__table__,
+    ]
+
+    for table in tables:
+        for index in sorted(table.indexes, key=lambda i: i.name):
+            index.create(bind=engine, checkfirst=True)
+            print(f"✓ {table.name}.{index.name}")
+
+    # Dropped from the model: it duplicated ix_routine_day_period and ix_routine_class_day_period
+    with engine.begin() as connection:
+        connection.execute(text("DROP INDEX IF EXISTS ix_routine_day_class_period"))
+    print("✓ class_routine_entries.ix_routine_day_class_period dropped")
+
+    engine.dispose()
+
+if __name__ == "__main__":
+    print("Starting migration: Add routine query indexes")
+    add_routine_query_indexes()
+    print("Migration completed!")
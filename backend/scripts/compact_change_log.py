@@ -0,0 +1,27 @@
+"""
+Apply the change log retention policy (CHANGE_LOG_RETENTION_DAYS and
+CHANGE_LOG_MAX_ENTRIES). The API also does this on startup; run this from
+cron on servers that stay up for long periods.
+"""
+import sys
+from pathlib import Path
+
+# Add the parent directory to the path to import app modules
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.services import change_log
+
+def compact_change_log():
+    db = SessionLocal()
+    try:
+        deleted = change_log.compact(db)
+        print(f"✓ Removed {deleted} change log entries "
+              f"(keeping {settings.CHANGE_LOG_RETENTION_DAYS} days, at most {settings.CHANGE_LOG_MAX_ENTRIES} entries)")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    compact_change_log()
@@ -0,0 +1,35 @@
+"""
+Migration script to create the routine_entry_teachers table and backfill it
+from the lead/assist teacher columns of class_routine_entries
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.orm import sessionmaker
+from app.models.models import RoutineEntryTeacher
+from app.services.crud import ClassRoutineService
+from app.core.config import settings
+
+def create_routine_entry_teachers_table():
+    """Create routine_entry_teachers (if missing) and rebuild its rows"""
+    engine = create_engine(settings.DATABASE_URL)
+    
+    inspector = inspect(engine)
+    if 'routine_entry_teachers' in inspector.get_table_names():
+        print("✓ routine_entry_teachers table already exists")
+    else:
+        RoutineEntryTeacher.__table__.create(engine)
+        print("✓ routine_entry_teachers table created successfully!")
+    
+    db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        count = ClassRoutineService.rebuild_entry_teachers(db)
+        print(f"✓ Backfilled {count} teacher assignments")
+    finally:
+        db.close()
+        engine.dispose()
+
+if __name__ == "__main__":
+    create_routine_entry_teachers_table()
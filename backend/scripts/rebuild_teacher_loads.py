@@ -0,0 +1,47 @@
+"""
+Recompute the materialized teacher_loads table from the class routine.
+
+Before rewriting it, the incrementally maintained state is compared with a
+fresh recomputation and every difference is reported. Exits with status 1
+when differences were found.
+
+    python scripts/rebuild_teacher_loads.py              # check, then rebuild
+    python scripts/rebuild_teacher_loads.py --check-only # only report drift
+"""
+import argparse
+import sys
+from pathlib import Path
+
+# Add the parent directory to the path to import app modules
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from app.core.database import Base, SessionLocal, engine
+from app.services.workload import WorkloadService
+
+def rebuild_teacher_loads(check_only: bool = False) -> bool:
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        differences = WorkloadService.check(db)
+        for diff in differences:
+            kind = 'P' if diff['is_lab'] else 'T'
+            print(f"✗ teacher {diff['teacher_id']} {diff['subject_name']} ({kind}): "
+                  f"stored {diff['stored']} expected {diff['expected']}")
+        if differences:
+            print(f"{len(differences)} teacher load rows differ from the routine")
+        else:
+            print("✓ teacher_loads matches the routine")
+
+        if not check_only:
+            count = WorkloadService.rebuild(db)
+            print(f"✓ Rebuilt teacher_loads ({count} rows)")
+        return not differences
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--check-only", action="store_true", help="report differences without rebuilding")
+    args = parser.parse_args()
+    sys.exit(0 if rebuild_teacher_loads(args.check_only) else 1)
@@ -0,0 +1,134 @@
+"""
+Check crud.bulk_upsert on both of its paths, INSERT ... ON CONFLICT and the
+plain INSERT/UPDATE fallback used on SQLite before 3.24: new keys are
+inserted, existing keys are updated in place (same ids), duplicate keys in a
+batch collapse to the last row, the change log gets one insert or update per
+row, and a batch larger than SQLite's old 999 bound parameter limit goes
+through on a connection held to that limit.
+
+Runs against a throwaway in-memory SQLite database, so it is safe to run
+with `python scripts/test_bulk_upsert.py` or under pytest.
+"""
+import random
+import sqlite3
+import sys
+from pathlib import Path
+
+# Add the parent directory to the path to import app modules
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.core.database import Base
+from app.models import models
+from app.schemas import schemas
+from app.services import crud
+
+
+def make_session(on_conflict=True):
+    """Session on a fresh in-memory database limited to 999 bound parameters per statement,
+    like SQLite before 3.32; without `on_conflict` it reports a version before 3.24"""
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    event.listen(engine, "connect", lambda connection, _: connection.setlimit(
+        sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, crud.MAX_BOUND_PARAMETERS
+    ))
+    Base.metadata.create_all(bind=engine)
+    if not on_conflict:
+        engine.dialect.server_version_info = (3, 22, 0)
+    return engine, sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+
+
+def stored_loads(db):
+    return {
+        load.teacher_id: (load.id, load.effective_load, load.position)
+        for load in db.query(models.TeacherEffectiveLoad).all()
+    }
+
+
+def changes(db, after_id):
+    return [
+        (change.table_name, change.operation, change.row_id, change.data)
+        for change in db.query(models.ChangeLogEntry).filter(models.ChangeLogEntry.id > after_id)
+        .order_by(models.ChangeLogEntry.id)
+    ]
+
+
+def last_change_id(db):
+    last = db.query(models.ChangeLogEntry).order_by(models.ChangeLogEntry.id.desc()).first()
+    return last.id if last else 0
+
+
+def run_checks(on_conflict, seed_value=0, batch=1500):
+    rng = random.Random(seed_value)
+    engine, db = make_session(on_conflict)
+    try:
+        assert (crud._dialect_insert(db, models.PositionRate) is not None) == on_conflict
+
+        # Position rates: insert, then update one existing key and add a new one
+        rates = crud.create_or_update_position_rates(db, [
+            schemas.PositionRateCreate(position="Lecturer", rate=500),
+            schemas.PositionRateCreate(position="Professor", rate=900),
+        ])
+        lecturer_id = rates[0].id
+        before = last_change_id(db)
+        rates = crud.create_or_update_position_rates(db, [
+            schemas.PositionRateCreate(position="Lecturer", rate=550),
+            schemas.PositionRateCreate(position="Assistant", rate=300),
+            schemas.PositionRateCreate(position="Assistant", rate=350),
+        ])
+        assert [(rate.position, rate.rate) for rate in rates] == [("Lecturer", 550), ("Assistant", 350)]
+        assert rates[0].id == lecturer_id
+        assert sorted((rate.position, rate.rate) for rate in db.query(models.PositionRate)) == \
+            [("Assistant", 350), ("Lecturer", 550), ("Professor", 900)]
+        assert [(operation, row_id) for _, operation, row_id, _ in changes(db, before)] == \
+            [('insert', rates[1].id), ('update', lecturer_id)]
+
+        # Effective loads for a whole faculty, well past 999 parameters per batch
+        teacher_ids = list(range(1, batch + 1))
+        first = {teacher_id: (rng.choice([16.0, 18.0, 20.0]), rng.choice([None, "Lecturer"]))
+                 for teacher_id in rng.sample(teacher_ids, batch // 2)}
+        crud.create_or_update_effective_loads(db, [
+            schemas.TeacherEffectiveLoadCreate(teacher_id=teacher_id, effective_load=load, position=position)
+            for teacher_id, (load, position) in first.items()
+        ])
+        ids = {teacher_id: row[0] for teacher_id, row in stored_loads(db).items()}
+        assert set(ids) == set(first)
+
+        second = {teacher_id: (rng.choice([12.0, 20.0, 22.0]), rng.choice([None, "Professor"]))
+                  for teacher_id in teacher_ids}
+        before = last_change_id(db)
+        loads = crud.create_or_update_effective_loads(db, [
+            schemas.TeacherEffectiveLoadCreate(teacher_id=teacher_id, effective_load=load, position=position)
+            for teacher_id, (load, position) in second.items()
+        ])
+        assert [load.teacher_id for load in loads] == teacher_ids
+        stored = stored_loads(db)
+        assert {teacher_id: row[1:] for teacher_id, row in stored.items()} == second
+        assert all(stored[teacher_id][0] == ids[teacher_id] for teacher_id in first)
+
+        logged = changes(db, before)
+        assert sorted((operation, row_id) for _, operation, row_id, _ in logged) == sorted(
+            ('update' if teacher_id in first else 'insert', stored[teacher_id][0]) for teacher_id in teacher_ids
+        )
+        assert all(data['effective_load'] == second[data['teacher_id']][0] for _, _, _, data in logged)
+    finally:
+        db.close()
+        engine.dispose()
+
+
+def test_bulk_upsert_on_conflict():
+    run_checks(on_conflict=True)
+
+
+def test_bulk_upsert_fallback():
+    run_checks(on_conflict=False)
+
+
+if __name__ == "__main__":
+    run_checks(on_conflict=True)
+    run_checks(on_conflict=False)
+    print("✓ bulk upserts insert and update on both paths within the parameter limit")
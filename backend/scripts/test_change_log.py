@@ -0,0 +1,90 @@
+"""
+Check that the change log records whole rows: inserts with unset columns,
+updates of expired objects and updates of partially loaded objects must all
+log every column with its stored value, so clients can replace their copy of
+the row with `data`.
+
+Runs against a throwaway in-memory SQLite database, so it is safe to run
+with `python scripts/test_change_log.py` or under pytest.
+"""
+import sys
+from pathlib import Path
+
+# Add the parent directory to the path to import app modules
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import load_only
+from sqlalchemy.pool import StaticPool
+from app.core.database import Base, SessionLocal
+from app.models import models
+from app.services import change_log  # noqa: F401 (registers the SessionLocal hooks)
+
+TEACHER_COLUMNS = [column.key for column in models.Teacher.__table__.columns]
+
+
+def make_session():
+    """A SessionLocal session (so the change log hooks run) bound to a fresh in-memory database"""
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    return engine, SessionLocal(bind=engine)
+
+
+def last_change(db):
+    return db.query(models.ChangeLogEntry).order_by(models.ChangeLogEntry.id.desc()).first()
+
+
+def stored_row(db, teacher_id):
+    row = db.execute(models.Teacher.__table__.select().where(models.Teacher.id == teacher_id)).mappings().one()
+    return dict(row)
+
+
+def run_checks():
+    engine, db = make_session()
+    try:
+        department = models.Department(name="Computer", code="DOECE")
+        db.add(department)
+        db.commit()
+        department_id = department.id
+
+        # Insert leaving most columns unset
+        teacher = models.Teacher(name="Teacher", abbreviation="TT", recruitment="Full Time")
+        db.add(teacher)
+        db.commit()
+        teacher_id = teacher.id
+        change = last_change(db)
+        assert change.operation == 'insert' and sorted(change.data) == sorted(TEACHER_COLUMNS), change.data
+        assert change.data == stored_row(db, teacher_id)
+
+        # Update after commit expired every attribute
+        teacher.email = "teacher@example.com"
+        db.commit()
+        change = last_change(db)
+        assert change.operation == 'update' and change.data == stored_row(db, teacher_id), change.data
+
+        # Update of an object loaded with only some columns
+        db.expunge_all()
+        partial = db.query(models.Teacher).options(load_only(models.Teacher.id)).filter(
+            models.Teacher.id == teacher_id
+        ).one()
+        partial.department_id = department_id
+        db.commit()
+        change = last_change(db)
+        assert change.operation == 'update', change.operation
+        assert change.data == stored_row(db, teacher_id), change.data
+        assert change.data['name'] == "Teacher" and change.data['department_id'] == department_id
+    finally:
+        db.close()
+        engine.dispose()
+
+
+def test_change_log_records_whole_rows():
+    run_checks()
+
+
+if __name__ == "__main__":
+    run_checks()
+    print("✓ the change log records whole rows")
@@ -0,0 +1,149 @@
+"""
+Check that teacher conflict checks answered from the occupancy index give the
+same overlaps as the original check_teacher_conflicts loop (every entry of the
+teacher on that day, start..start + num_periods - 1 compared with the checked
+range), on random routines with multi-period, zero-period, NULL and
+negative-order edge cases.
+
+Runs against a throwaway in-memory SQLite database, so it is safe to run
+with `python scripts/test_occupancy_index.py` or under pytest.
+"""
+import random
+import sys
+from datetime import time
+from pathlib import Path
+
+# Add the parent directory to the path to import app modules
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.core.database import Base
+from app.models import models
+from app.services.crud import ClassRoutineService
+from app.services.occupancy import occupancy_index
+from app.services.reference_cache import reference_cache
+
+
+def make_session():
+    """Create a session bound to a fresh in-memory database"""
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    return engine, sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+
+
+def seed(db, rng, period_orders, num_classes=6, num_teachers=5):
+    """Random routines: each class gets entries in random slots with random teachers and lengths"""
+    teachers = [
+        models.Teacher(name=f"Teacher {i}", abbreviation=f"T{i}", recruitment="Full Time")
+        for i in range(num_teachers)
+    ]
+    subject = models.Subject(name="Mathematics", code="SH401")
+    days = [models.Day(name=f"Day {i}", order=i) for i in range(1, 4)]
+    periods = [
+        models.Period(name=f"P{order}", start_time=time(8), end_time=time(9), order=order)
+        for order in period_orders
+    ]
+    classes = [models.Class(name=f"Class {i}", section="A") for i in range(num_classes)]
+    db.add_all(teachers + [subject] + days + periods + classes)
+    db.flush()
+
+    teacher_ids = [None] + [teacher.id for teacher in teachers]
+    for class_ in classes:
+        for day in days:
+            for period in rng.sample(periods, k=rng.randint(1, len(periods))):
+                db.add(models.ClassRoutineEntry(
+                    class_id=class_.id, day_id=day.id, period_id=period.id, subject_id=subject.id,
+                    num_periods=rng.choice([0, 1, 1, 1, 2, 3, -1]),
+                    lead_teacher_id=rng.choice(teacher_ids),
+                    assist_teacher_1_id=rng.choice(teacher_ids),
+                    assist_teacher_2_id=rng.choice(teacher_ids),
+                ))
+    db.flush()
+    # The ORM would store the column default; databases migrated from older versions hold NULLs
+    Entry = models.ClassRoutineEntry
+    db.execute(update(Entry).where(Entry.id % 7 == 0).values(num_periods=None))
+    db.commit()
+    # Fills routine_entry_teachers and rebuilds the occupancy index
+    ClassRoutineService.rebuild_entry_teachers(db)
+    return [t.id for t in teachers], [d.id for d in days], periods, [c.id for c in classes]
+
+
+def baseline_conflicts(db, teacher_id, day_id, period_ids, exclude_class_id=None):
+    """Entry ids the original check_teacher_conflicts loop reported (it raised on a NULL
+    num_periods; that counts as one period everywhere now)"""
+    period_order_map = {period.id: period.order for period in db.query(models.Period).all()}
+    checked_orders = [period_order_map[period_id] for period_id in period_ids if period_id in period_order_map]
+    if not checked_orders:
+        return []
+    min_checked_order, max_checked_order = min(checked_orders), max(checked_orders)
+
+    Entry = models.ClassRoutineEntry
+    query = db.query(Entry).filter(Entry.day_id == day_id).filter(
+        (Entry.lead_teacher_id == teacher_id) |
+        (Entry.assist_teacher_1_id == teacher_id) |
+        (Entry.assist_teacher_2_id == teacher_id) |
+        (Entry.assist_teacher_3_id == teacher_id)
+    )
+    if exclude_class_id:
+        query = query.filter(Entry.class_id != exclude_class_id)
+
+    conflicts = []
+    for assignment in query.all():
+        assignment_start = period_order_map.get(assignment.period_id)
+        if assignment_start is None:
+            continue
+        num_periods = 1 if assignment.num_periods is None else assignment.num_periods
+        assignment_end = assignment_start + (num_periods - 1)
+        if assignment_start <= max_checked_order and min_checked_order <= assignment_end:
+            conflicts.append(assignment.id)
+    return sorted(conflicts)
+
+
+def compare(seed_value, period_orders, probes=300):
+    """Return the number of probes checked; raises AssertionError on the first mismatch"""
+    rng = random.Random(seed_value)
+    reference_cache.invalidate()
+    engine, db = make_session()
+    try:
+        teacher_ids, day_ids, periods, class_ids = seed(db, rng, period_orders)
+        for _ in range(probes):
+            teacher_id, day_id = rng.choice(teacher_ids), rng.choice(day_ids)
+            checked = rng.sample(periods, k=rng.randint(1, 3))
+            orders = [period.order for period in checked]
+            exclude_class_id = rng.choice([None] + class_ids)
+
+            period_ids = [period.id for period in checked]
+            expected = baseline_conflicts(db, teacher_id, day_id, period_ids, exclude_class_id)
+            found = occupancy_index.find_conflicts(teacher_id, day_id, min(orders), max(orders), exclude_class_id)
+            assert [entry_id for entry_id, _, _ in found] == expected, (teacher_id, day_id, orders, exclude_class_id)
+
+            result = ClassRoutineService.check_teacher_conflicts(db, teacher_id, day_id, period_ids, exclude_class_id)
+            assert result['has_conflict'] == bool(expected)
+            assert len(result['conflicts']) == len(expected)
+        return probes
+    finally:
+        db.close()
+        engine.dispose()
+        reference_cache.invalidate()
+
+
+def test_occupancy_index_matches_original_check():
+    for seed_value in range(5):
+        compare(seed_value, range(1, 9))
+
+
+def test_occupancy_index_matches_original_check_with_negative_orders():
+    for seed_value in range(5):
+        compare(seed_value, range(-2, 6))
+
+
+if __name__ == "__main__":
+    for seed_value in range(5):
+        compare(seed_value, range(1, 9))
+        compare(seed_value, range(-2, 6))
+    print("✓ occupancy index matches the original conflict check")
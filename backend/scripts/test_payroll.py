@@ -0,0 +1,115 @@
+"""
+Check the payroll report against the formula Schedules.jsx used in the
+browser: workload of 1.0 per theory period, 0.8 per lab period and 0.4 per
+half lab period; extra load = workload - effective load (20 when unset);
+payment = extra load * position rate * 15 for positive extra load with a
+rated position. Also checks the department and recruitment filters and that
+the totals add up the rows.
+
+Uses the routines and client-side reference from test_workload.py and runs
+against a throwaway in-memory SQLite database, so it is safe to run with
+`python scripts/test_payroll.py` or under pytest.
+"""
+import random
+import sys
+from pathlib import Path
+
+# Add the parent directory to the path to import app modules
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from app.models import models
+from app.services.payroll import PayrollService
+from app.services.reference_cache import reference_cache
+from test_workload import client_loads, make_session, seed
+
+
+def assign_departments(db, rng):
+    """Spread the seeded teachers over two departments (some unassigned) and two recruitments"""
+    departments = [models.Department(name=f"Department {i}", code=f"D{i}") for i in range(2)]
+    db.add_all(departments)
+    db.flush()
+    for teacher in db.query(models.Teacher).all():
+        teacher.department_id = rng.choice([None] + [department.id for department in departments])
+        teacher.recruitment = rng.choice(["Full Time", "Part Time"])
+    db.commit()
+    return [department.id for department in departments]
+
+
+def expected_row(teacher, client):
+    """A payroll row as the report displays it, from the client-side load"""
+    return {
+        'teacher_id': teacher.id,
+        'position': client['position'],
+        'effective_load': client['effective_load'],
+        'total_periods': client['total_periods'],
+        'total_workload': f"{client['total_workload']:.1f}",
+        'extra_load': f"{client['extra_load']:.1f}",
+        'total_payment': f"{client['total_payment']:.2f}",
+    }
+
+
+def displayed(row):
+    return {
+        'teacher_id': row['teacher_id'],
+        'position': row['position'],
+        'effective_load': row['effective_load'],
+        'total_periods': row['total_periods'],
+        'total_workload': f"{row['total_workload']:.1f}",
+        'extra_load': f"{row['extra_load']:.1f}",
+        'total_payment': f"{row['total_payment']:.2f}",
+    }
+
+
+def compare(seed_value):
+    rng = random.Random(seed_value)
+    reference_cache.invalidate()
+    engine, db = make_session()
+    try:
+        seed(db, rng)
+        department_ids = assign_departments(db, rng)
+        teachers = {teacher.id: teacher for teacher in db.query(models.Teacher).all()}
+        clients = client_loads(db)
+        assert any(client['total_payment'] > 0 for client in clients.values()), seed_value
+
+        for department_id in [None] + department_ids:
+            for recruitment in [None, "Full Time", "Part Time"]:
+                expected = sorted(
+                    (expected_row(teachers[teacher_id], client) for teacher_id, client in clients.items()
+                     if department_id in (None, teachers[teacher_id].department_id)
+                     and recruitment in (None, teachers[teacher_id].recruitment)),
+                    key=lambda row: row['teacher_id'],
+                )
+                rows = PayrollService.get_rows(db, department_id=department_id, recruitment=recruitment)
+                actual = sorted((displayed(row) for row in rows), key=lambda row: row['teacher_id'])
+                assert actual == expected, (seed_value, department_id, recruitment)
+
+                totals = PayrollService.totals(rows)
+                assert totals['teachers'] == len(expected)
+                assert totals['total_periods'] == sum(clients[row['teacher_id']]['total_periods'] for row in expected)
+                assert f"{totals['total_workload']:.1f}" == \
+                    f"{sum(clients[row['teacher_id']]['total_workload'] for row in expected):.1f}"
+                assert f"{totals['total_payment']:.2f}" == \
+                    f"{sum(clients[row['teacher_id']]['total_payment'] for row in expected):.2f}"
+
+        # Teachers without periods are only listed on request, with the default effective load
+        unassigned = PayrollService.get_rows(db, include_unassigned=True)
+        assert len(unassigned) == len(teachers)
+        for row in unassigned:
+            if row['teacher_id'] not in clients:
+                assert row['total_periods'] == 0 and row['total_payment'] == 0
+    finally:
+        db.close()
+        engine.dispose()
+        reference_cache.invalidate()
+
+
+def test_payroll_matches_client_formula():
+    for seed_value in range(10):
+        compare(seed_value)
+
+
+if __name__ == "__main__":
+    for seed_value in range(10):
+        compare(seed_value)
+    print("✓ payroll rows and totals match the Schedules.jsx formula")
@@ -0,0 +1,121 @@
+"""
+Check that the workload rollups add up: grouped by department, programme,
+semester or recruitment, the group rows sum to the totals row, and every
+grouping has the same totals as the Teacher Load Report, including routines
+with BREAK/LC entries, entries of a deleted subject and entries of a deleted
+class.
+
+Uses the random routines from test_workload.py and runs against a throwaway
+in-memory SQLite database, so it is safe to run with
+`python scripts/test_rollups.py` or under pytest.
+"""
+import random
+import sys
+from pathlib import Path
+
+# Add the parent directory to the path to import app modules
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from app.models import models
+from app.services.crud import ClassService, SubjectService
+from app.services.reference_cache import reference_cache
+from app.services.rollups import GROUPINGS, RollupService
+from app.services.workload import WorkloadService
+from test_workload import make_session, seed
+
+PERIOD_FIELDS = ('theory_periods', 'lab_periods', 'total_periods')
+WORKLOAD_FIELDS = ('theory_workload', 'lab_workload', 'total_workload', 'extra_load', 'total_payment')
+
+
+def organise(db, rng):
+    """Departments, programmes and semesters; teachers and classes spread over them, some unassigned"""
+    departments = [models.Department(name=f"Department {i}", code=f"D{i}") for i in range(2)]
+    db.add_all(departments)
+    db.flush()
+    programmes = [
+        models.Programme(name=f"Programme {i}", code=f"P{i}", department_id=department.id)
+        for i, department in enumerate(departments)
+    ]
+    db.add_all(programmes)
+    db.flush()
+    semesters = [
+        models.Semester(name=f"Semester {n}", semester_number=n, programme_id=programme.id)
+        for programme in programmes for n in (1, 2)
+    ]
+    db.add_all(semesters)
+    db.flush()
+    for teacher in db.query(models.Teacher).all():
+        teacher.department_id = rng.choice([None] + [department.id for department in departments])
+        teacher.recruitment = rng.choice(["Full Time", "Part Time"])
+    for class_ in db.query(models.Class).all():
+        class_.semester_id = rng.choice([None] + [semester.id for semester in semesters])
+    db.commit()
+
+
+def report_totals(db):
+    """Overall figures from the Teacher Load Report rows"""
+    theory_periods = lab_periods = theory_tenths = lab_tenths = 0
+    extra_load = total_payment = 0.0
+    for teacher in WorkloadService.get_teacher_loads(db):
+        for subject in teacher['subjects'].values():
+            if subject['type'] == 'P':
+                lab_periods += subject['periods']
+                lab_tenths += round(subject['workload'] * 10)
+            else:
+                theory_periods += subject['periods']
+                theory_tenths += round(subject['workload'] * 10)
+        extra_load += max(teacher['extra_load'], 0)
+        total_payment += teacher['total_payment']
+    return {
+        'theory_periods': theory_periods, 'lab_periods': lab_periods,
+        'total_periods': theory_periods + lab_periods,
+        'theory_workload': theory_tenths / 10, 'lab_workload': lab_tenths / 10,
+        'total_workload': (theory_tenths + lab_tenths) / 10,
+        'extra_load': extra_load, 'total_payment': total_payment,
+    }
+
+
+def assert_close(actual, expected, tolerance, context):
+    assert abs(actual - expected) <= tolerance, (context, actual, expected)
+
+
+def compare(seed_value):
+    rng = random.Random(seed_value)
+    reference_cache.invalidate()
+    engine, db = make_session()
+    try:
+        seed(db, rng)
+        organise(db, rng)
+        # Their routine entries stay behind: skipped without a subject, unassigned without a class
+        SubjectService.delete(db, rng.choice([row.id for row in db.query(models.Subject.id)]))
+        ClassService.delete(db, rng.choice([row.id for row in db.query(models.Class.id)]))
+
+        expected = report_totals(db)
+        assert expected['total_periods'] > 0, seed_value
+        for grouping in GROUPINGS:
+            result = RollupService.compute(db, grouping)
+            groups, totals = result['groups'], result['totals']
+            # Group figures are rounded to cents, so sums may differ from the report by that much
+            tolerance = 0.005 * len(groups) + 1e-6
+            for field in PERIOD_FIELDS:
+                assert totals[field] == sum(group[field] for group in groups), (seed_value, grouping, field)
+                assert totals[field] == expected[field], (seed_value, grouping, field)
+            for field in WORKLOAD_FIELDS:
+                assert_close(totals[field], sum(group[field] for group in groups), 0.01, (seed_value, grouping, field))
+                assert_close(totals[field], expected[field], tolerance, (seed_value, grouping, field))
+    finally:
+        db.close()
+        engine.dispose()
+        reference_cache.invalidate()
+
+
+def test_rollup_totals_agree_across_groupings():
+    for seed_value in range(10):
+        compare(seed_value)
+
+
+if __name__ == "__main__":
+    for seed_value in range(10):
+        compare(seed_value)
+    print("✓ rollups add up to the same totals under every grouping")
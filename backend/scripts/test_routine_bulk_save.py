@@ -0,0 +1,132 @@
+"""
+Check that a bulk routine save is all or nothing: when a later class in the
+batch has a teacher conflict (409) or fails while being written (400), no
+earlier class of the batch is changed, and neither are routine_entry_teachers,
+teacher_loads or the change log.
+
+Runs against a throwaway in-memory SQLite database (with foreign keys
+enforced, so a bad id fails the insert), so it is safe to run with
+`python scripts/test_routine_bulk_save.py` or under pytest.
+"""
+import sys
+from datetime import time
+from pathlib import Path
+
+# Add the parent directory to the path to import app modules
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from fastapi import HTTPException
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.api.routes.class_routines import BulkRoutineSaveRequest, save_routines_bulk
+from app.core.database import Base
+from app.models import models
+from app.services.crud import ClassRoutineService
+from app.services.occupancy import occupancy_index
+from app.services.reference_cache import reference_cache
+
+
+def make_session():
+    """Create a session bound to a fresh in-memory database"""
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    event.listen(engine, "connect", lambda connection, _: connection.execute("PRAGMA foreign_keys=ON"))
+    Base.metadata.create_all(bind=engine)
+    return engine, sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+
+
+def seed(db):
+    """Classes A, B and C; A and C already have routines, C books teacher 0 at period 1"""
+    teachers = [
+        models.Teacher(name=f"Teacher {i}", abbreviation=f"T{i}", recruitment="Full Time") for i in range(3)
+    ]
+    subjects = [models.Subject(name=f"Subject {i}", code=f"S{i}") for i in range(3)]
+    day = models.Day(name="Sunday", order=1)
+    periods = [
+        models.Period(name=f"P{order}", start_time=time(8), end_time=time(9), order=order)
+        for order in range(1, 6)
+    ]
+    classes = [models.Class(name=name, section="A") for name in ("A", "B", "C")]
+    db.add_all(teachers + subjects + [day] + periods + classes)
+    db.commit()
+    # The index is process-wide; drop bookings left by other databases
+    occupancy_index.rebuild(db)
+
+    def entry(period, subject, teacher, **extra):
+        return {
+            'dayId': day.id, 'periodId': periods[period].id, 'subject_id': subjects[subject].id,
+            'lead_teacher_id': teachers[teacher].id, **extra,
+        }
+
+    ClassRoutineService.save_routine(db, classes[0].id, [entry(2, 0, 1), entry(3, 1, 2), entry(4, 2, 1)])
+    ClassRoutineService.save_routine(db, classes[2].id, [entry(0, 0, 0)])
+    return classes, entry
+
+
+def snapshot(db):
+    """Everything a bulk save writes"""
+    def rows(model, *columns):
+        return sorted(tuple(getattr(row, column) for column in columns) for row in db.query(model).all())
+    return {
+        'entries': rows(models.ClassRoutineEntry, 'id', 'class_id', 'period_id', 'subject_id', 'lead_teacher_id'),
+        'entry_teachers': rows(models.RoutineEntryTeacher, 'entry_id', 'teacher_id', 'start_order', 'end_order'),
+        'teacher_loads': rows(models.TeacherLoad, 'teacher_id', 'subject_name', 'periods', 'workload_tenths'),
+        'change_log': rows(models.ChangeLogEntry, 'id'),
+        'room_no': rows(models.Class, 'id', 'room_no'),
+    }
+
+
+def bulk_save(db, routines, check_conflicts=True):
+    """Call the bulk-save route; returns (status code, response or error detail)"""
+    request = BulkRoutineSaveRequest(routines=routines, check_conflicts=check_conflicts)
+    try:
+        return 200, save_routines_bulk(request, db)
+    except HTTPException as e:
+        return e.status_code, e.detail
+
+
+def run_checks():
+    reference_cache.invalidate()
+    engine, db = make_session()
+    try:
+        (class_a, class_b, class_c), entry = seed(db)
+        before = snapshot(db)
+        # A changes (one entry kept, one updated, one dropped, one added), then B conflicts with C
+        class_a_routine = {
+            'class_id': class_a.id, 'room_no': '101',
+            'entries': [entry(2, 0, 1), entry(3, 1, 0), entry(1, 1, 2)],
+        }
+
+        status, detail = bulk_save(db, [class_a_routine, {'class_id': class_b.id, 'entries': [entry(0, 1, 0)]}])
+        assert status == 409, (status, detail)
+        assert [c['class_id'] for c in detail['conflicts']] == [class_b.id]
+        assert snapshot(db) == before
+
+        # Without the conflict check, B fails while being written (no such subject)
+        bad_entry = {**entry(0, 1, 0), 'subject_id': 9999}
+        status, detail = bulk_save(db, [class_a_routine, {'class_id': class_b.id, 'entries': [bad_entry]}], False)
+        assert status == 400, (status, detail)
+        assert snapshot(db) == before
+
+        # The same batch without the bad entry saves both classes
+        status, result = bulk_save(db, [class_a_routine, {'class_id': class_b.id, 'entries': [entry(1, 1, 1)]}], False)
+        assert status == 200, (status, result)
+        assert result['classes'][class_a.id] == {'inserted': 1, 'updated': 1, 'deleted': 1, 'unchanged': 1}
+        assert result['classes'][class_b.id] == {'inserted': 1, 'updated': 0, 'deleted': 0, 'unchanged': 0}
+        assert snapshot(db) != before
+    finally:
+        db.close()
+        engine.dispose()
+        reference_cache.invalidate()
+
+
+def test_bulk_save_is_all_or_nothing():
+    run_checks()
+
+
+if __name__ == "__main__":
+    run_checks()
+    print("✓ bulk routine saves write every class or none")
@@ -0,0 +1,109 @@
+"""
+Check that ClassRoutineService.get_all_routines issues a constant number of
+queries no matter how many routine entries exist.
+
+Runs against a throwaway in-memory SQLite database, so it is safe to run
+with `python scripts/test_routine_query_count.py` or under pytest.
+"""
+import sys
+from datetime import time
+from pathlib import Path
+
+# Add the parent directory to the path to import app modules
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.core.database import Base
+from app.models import models
+from app.services.crud import ClassRoutineService
+
+
+def make_session():
+    """Create a session bound to a fresh in-memory database"""
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    return engine, sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+
+
+def seed(db, num_classes):
+    """Create one programme/semester and `num_classes` classes with a full week each"""
+    department = models.Department(name="Computer", code="DOECE")
+    db.add(department)
+    db.flush()
+    programme = models.Programme(name="Computer Engineering", code="BCT", department_id=department.id)
+    db.add(programme)
+    db.flush()
+    semester = models.Semester(name="I/I", semester_number=1, programme_id=programme.id)
+    db.add(semester)
+    teacher = models.Teacher(name="Teacher", abbreviation="TT", recruitment="Full Time")
+    subject = models.Subject(name="Mathematics", code="SH401")
+    db.add_all([teacher, subject])
+    days = [models.Day(name=f"Day {i}", order=i) for i in range(1, 6)]
+    periods = [
+        models.Period(name=f"P{i}", start_time=time(7 + i), end_time=time(8 + i), order=i)
+        for i in range(1, 8)
+    ]
+    db.add_all(days + periods)
+    db.flush()
+
+    for c in range(num_classes):
+        class_ = models.Class(name=f"BCT {c}", section="AB", semester_id=semester.id,
+                              department_id=department.id)
+        db.add(class_)
+        db.flush()
+        for day in days:
+            for period in periods:
+                db.add(models.ClassRoutineEntry(
+                    class_id=class_.id, day_id=day.id, period_id=period.id,
+                    subject_id=subject.id, lead_teacher_id=teacher.id,
+                ))
+    db.commit()
+
+
+def count_queries(num_classes):
+    """Return (entry count, SELECT count) for one get_all_routines call"""
+    engine, db = make_session()
+    try:
+        seed(db, num_classes)
+        db.expire_all()
+
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            result = ClassRoutineService.get_all_routines(db)
+        finally:
+            event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+        assert all(entry['class']['programme']['code'] == "BCT" for entry in result)
+        assert all(entry['subject']['code'] == "SH401" for entry in result)
+        return len(result), len(statements)
+    finally:
+        db.close()
+        engine.dispose()
+
+
+def test_get_all_routines_query_count_is_constant():
+    """The number of queries must not grow with the number of entries"""
+    small_entries, small_queries = count_queries(1)
+    large_entries, large_queries = count_queries(20)
+
+    assert large_entries > small_entries
+    assert small_queries == large_queries
+    assert large_queries <= 2
+
+
+if __name__ == "__main__":
+    for num_classes in (1, 5, 20):
+        entries, queries = count_queries(num_classes)
+        print(f"{entries:5d} entries -> {queries} queries")
+    test_get_all_routines_query_count_is_constant()
+    print("✓ get_all_routines query count is constant")
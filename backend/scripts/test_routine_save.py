@@ -0,0 +1,174 @@
+"""
+Check the diff save behind ClassRoutineService.save_routine: random sequences
+of saves that keep, change, add and drop entries must report the expected
+inserted/updated/deleted/unchanged counts, keep the ids of kept and changed
+entries, and leave routine_entry_teachers and teacher_loads equal to a full
+rebuild. Runs with INSERT ... RETURNING and with the one-insert-per-entry
+fallback used on databases without it.
+
+Runs against a throwaway in-memory SQLite database, so it is safe to run
+with `python scripts/test_routine_save.py` or under pytest.
+"""
+import random
+import sys
+from datetime import time
+from pathlib import Path
+
+# Add the parent directory to the path to import app modules
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.core.database import Base
+from app.models import models
+from app.services.crud import ClassRoutineService
+from app.services.occupancy import occupancy_index
+from app.services.reference_cache import reference_cache
+from app.services.workload import TEACHER_SLOTS, WorkloadService
+
+VALUE_FIELDS = ('is_lab', 'is_half_lab', 'num_periods', *TEACHER_SLOTS)
+
+
+def make_session(returning=True):
+    """Create a session bound to a fresh in-memory database"""
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    if not returning:
+        engine.dialect.insert_executemany_returning_sort_by_parameter_order = False
+    Base.metadata.create_all(bind=engine)
+    return engine, sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+
+
+def seed(db):
+    teachers = [
+        models.Teacher(name=f"Teacher {i}", abbreviation=f"T{i}", recruitment="Full Time") for i in range(5)
+    ]
+    subjects = [models.Subject(name=f"Subject {i}", code=f"S{i}") for i in range(3)]
+    days = [models.Day(name=f"Day {i}", order=i) for i in range(1, 4)]
+    periods = [
+        models.Period(name=f"P{order}", start_time=time(8), end_time=time(9), order=order)
+        for order in range(1, 7)
+    ]
+    classes = [models.Class(name=f"Class {i}", section="A") for i in range(3)]
+    db.add_all(teachers + subjects + days + periods + classes)
+    db.commit()
+    # The index is process-wide; drop bookings left by other databases
+    occupancy_index.rebuild(db)
+    return {
+        'teacher_ids': [None] + [teacher.id for teacher in teachers],
+        'subject_ids': [subject.id for subject in subjects],
+        'slots': [(day.id, period.id) for day in days for period in periods],
+        'class_ids': [class_.id for class_ in classes],
+    }
+
+
+def random_values(rng, refs):
+    """Value columns of an entry as the frontend posts them"""
+    is_lab = rng.random() < 0.4
+    return {
+        'is_lab': is_lab,
+        'is_half_lab': is_lab and rng.random() < 0.5,
+        'num_periods': rng.choice([1, 1, 2, 3]),
+        **{slot: rng.choice(refs['teacher_ids']) for slot in TEACHER_SLOTS},
+    }
+
+
+def next_routine(rng, refs, current):
+    """Posted entries built from `current` (key -> posted entry) by keeping, changing,
+    dropping and adding entries; returns (entries, expected counts, kept keys, changed keys)"""
+    entries, kept, changed = [], [], []
+    counts = {'inserted': 0, 'updated': 0, 'deleted': 0, 'unchanged': 0}
+    for key, entry in current.items():
+        action = rng.choice(['keep', 'keep', 'change', 'drop'])
+        if action == 'drop':
+            counts['deleted'] += 1
+            continue
+        if action == 'change':
+            new_entry = {**entry, **random_values(rng, refs)}
+            changed_values = any(new_entry[field] != entry[field] for field in new_entry)
+            counts['updated' if changed_values else 'unchanged'] += 1
+            (changed if changed_values else kept).append(key)
+            entries.append(new_entry)
+        else:
+            counts['unchanged'] += 1
+            kept.append(key)
+            entries.append(dict(entry))
+    free = [
+        (day_id, period_id, subject_id)
+        for day_id, period_id in refs['slots'] for subject_id in refs['subject_ids']
+        if (day_id, period_id, subject_id) not in current
+    ]
+    for day_id, period_id, subject_id in rng.sample(free, k=rng.randint(0, 4)):
+        entries.append({'dayId': day_id, 'periodId': period_id, 'subject_id': subject_id, **random_values(rng, refs)})
+        counts['inserted'] += 1
+    # A continuation cell is ignored by the save
+    if entries:
+        entries.append({**entries[0], 'isContinuation': True})
+    return entries, counts, kept, changed
+
+
+def entry_teacher_rows(db):
+    return sorted(
+        (row.entry_id, row.teacher_id, row.role, row.class_id, row.day_id, row.start_order, row.end_order)
+        for row in db.query(models.RoutineEntryTeacher).all()
+    )
+
+
+def run_saves(seed_value, returning=True, steps=25):
+    rng = random.Random(seed_value)
+    reference_cache.invalidate()
+    engine, db = make_session(returning)
+    try:
+        refs = seed(db)
+        # class id -> key -> posted entry, and key -> stored id
+        posted = {class_id: {} for class_id in refs['class_ids']}
+        ids = {class_id: {} for class_id in refs['class_ids']}
+        for step in range(steps):
+            class_id = rng.choice(refs['class_ids'])
+            entries, expected, kept, changed = next_routine(rng, refs, posted[class_id])
+            summary = ClassRoutineService.save_routine(db, class_id, entries)
+            assert summary == expected, (seed_value, step, summary, expected)
+
+            stored = {
+                (entry.day_id, entry.period_id, entry.subject_id): entry
+                for entry in db.query(models.ClassRoutineEntry).filter(models.ClassRoutineEntry.class_id == class_id)
+            }
+            posted[class_id] = {
+                (entry['dayId'], entry['periodId'], entry['subject_id']): entry
+                for entry in entries if not entry.get('isContinuation')
+            }
+            assert set(stored) == set(posted[class_id])
+            for key in kept + changed:
+                assert stored[key].id == ids[class_id][key], (seed_value, step, key)
+            for key, entry in posted[class_id].items():
+                assert all(getattr(stored[key], field) == entry[field] for field in VALUE_FIELDS)
+            ids[class_id] = {key: entry.id for key, entry in stored.items()}
+
+            assert WorkloadService.check(db) == [], (seed_value, step)
+            incremental = entry_teacher_rows(db)
+            ClassRoutineService.rebuild_entry_teachers(db)
+            assert entry_teacher_rows(db) == incremental, (seed_value, step)
+    finally:
+        db.close()
+        engine.dispose()
+        reference_cache.invalidate()
+
+
+def test_diff_save_counts_and_consistency():
+    for seed_value in range(5):
+        run_saves(seed_value)
+
+
+def test_diff_save_without_returning():
+    for seed_value in range(3):
+        run_saves(seed_value, returning=False)
+
+
+if __name__ == "__main__":
+    for seed_value in range(5):
+        run_saves(seed_value)
+        run_saves(seed_value, returning=False)
+    print("✓ diff saves report the right counts and keep derived tables consistent")
@@ -0,0 +1,182 @@
+"""
+Check ClassRoutineService.search_routines against a plain filter over every
+routine entry: each filter alone and in combination, period ranges over
+multi-period, NULL and zero num_periods, and keyset pagination through
+next_cursor returning every match exactly once, in id order.
+
+Runs against a throwaway in-memory SQLite database, so it is safe to run
+with `python scripts/test_routine_search.py` or under pytest.
+"""
+import random
+import sys
+from datetime import time
+from pathlib import Path
+
+# Add the parent directory to the path to import app modules
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.core.database import Base
+from app.models import models
+from app.services.crud import ClassRoutineService
+from app.services.reference_cache import reference_cache
+
+TEACHER_SLOTS = ('lead_teacher_id', 'assist_teacher_1_id', 'assist_teacher_2_id', 'assist_teacher_3_id')
+
+
+def make_session():
+    """Create a session bound to a fresh in-memory database"""
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    return engine, sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+
+
+def seed(db, rng):
+    """Two departments with a programme and two semesters each, random routines"""
+    departments = [models.Department(name=f"Department {i}", code=f"D{i}") for i in range(2)]
+    db.add_all(departments)
+    db.flush()
+    programmes = [
+        models.Programme(name=f"Programme {i}", code=f"P{i}", department_id=department.id)
+        for i, department in enumerate(departments)
+    ]
+    db.add_all(programmes)
+    db.flush()
+    semesters = [
+        models.Semester(name=f"{programme.code} {n}", semester_number=n, programme_id=programme.id)
+        for programme in programmes for n in (1, 2)
+    ]
+    teachers = [
+        models.Teacher(name=f"Teacher {i}", abbreviation=f"T{i}", recruitment="Full Time") for i in range(4)
+    ]
+    subjects = [models.Subject(name=f"Subject {i}", code=f"S{i}") for i in range(3)]
+    days = [models.Day(name=f"Day {i}", order=i) for i in range(1, 4)]
+    periods = [
+        models.Period(name=f"P{order}", start_time=time(8), end_time=time(9), order=order)
+        for order in range(1, 8)
+    ]
+    db.add_all(semesters + teachers + subjects + days + periods)
+    db.flush()
+    classes = [
+        models.Class(name=f"Class {i}", section="A",
+                     semester_id=rng.choice(semesters).id if rng.random() < 0.8 else None,
+                     department_id=rng.choice(departments).id)
+        for i in range(6)
+    ]
+    db.add_all(classes)
+    db.flush()
+
+    teacher_ids = [None] + [teacher.id for teacher in teachers]
+    for class_ in classes:
+        for day in days:
+            for period in rng.sample(periods, k=rng.randint(1, 5)):
+                is_lab = rng.random() < 0.4
+                db.add(models.ClassRoutineEntry(
+                    class_id=class_.id, day_id=day.id, period_id=period.id,
+                    subject_id=rng.choice([None] + [subject.id for subject in subjects]),
+                    is_lab=is_lab, lab_room=rng.choice(["Lab A", "Lab B"]) if is_lab else None,
+                    num_periods=rng.choice([1, 1, 2, 3, 0]),
+                    **{slot: rng.choice(teacher_ids) for slot in TEACHER_SLOTS},
+                ))
+    db.flush()
+    # The ORM would store the column default; databases migrated from older versions hold NULLs
+    Entry = models.ClassRoutineEntry
+    db.execute(update(Entry).where(Entry.id % 4 == 0).values(num_periods=None))
+    db.commit()
+    ClassRoutineService.rebuild_entry_teachers(db)
+
+
+def expected_ids(db, filters):
+    """Entry ids matching `filters`, computed row by row in Python"""
+    classes = {class_.id: class_ for class_ in db.query(models.Class).all()}
+    semesters = {semester.id: semester for semester in db.query(models.Semester).all()}
+    period_orders = {period.id: period.order for period in db.query(models.Period).all()}
+    ids = []
+    for entry in db.query(models.ClassRoutineEntry).order_by(models.ClassRoutineEntry.id):
+        class_ = classes[entry.class_id]
+        semester = semesters.get(class_.semester_id)
+        start = period_orders[entry.period_id]
+        end = start + (1 if entry.num_periods is None else entry.num_periods) - 1
+        checks = {
+            'programme_id': lambda v: semester is not None and semester.programme_id == v,
+            'semester_id': lambda v: class_.semester_id == v,
+            'department_id': lambda v: class_.department_id == v,
+            'class_id': lambda v: entry.class_id == v,
+            'day_id': lambda v: entry.day_id == v,
+            'period_from': lambda v: end >= v,
+            'period_to': lambda v: start <= v,
+            'teacher_id': lambda v: v in {getattr(entry, slot) for slot in TEACHER_SLOTS},
+            'subject_id': lambda v: entry.subject_id == v,
+            'is_lab': lambda v: bool(entry.is_lab) == v,
+            'lab_room': lambda v: entry.lab_room == v,
+        }
+        if all(checks[name](value) for name, value in filters.items()):
+            ids.append(entry.id)
+    return ids
+
+
+def search_all(db, filters, limit):
+    """Follow next_cursor through every page; returns the entry ids in page order"""
+    ids, after_id, pages = [], None, 0
+    while True:
+        entries, next_cursor = ClassRoutineService.search_routines(db, after_id=after_id, limit=limit, **filters)
+        assert len(entries) <= limit
+        ids.extend(entry['id'] for entry in entries)
+        pages += 1
+        if next_cursor is None:
+            return ids, pages
+        assert next_cursor == entries[-1]['id']
+        after_id = next_cursor
+
+
+def random_filters(rng, db):
+    choices = {
+        'programme_id': [row.id for row in db.query(models.Programme.id)],
+        'semester_id': [row.id for row in db.query(models.Semester.id)],
+        'department_id': [row.id for row in db.query(models.Department.id)],
+        'class_id': [row.id for row in db.query(models.Class.id)],
+        'day_id': [row.id for row in db.query(models.Day.id)],
+        'period_from': list(range(0, 9)),
+        'period_to': list(range(0, 9)),
+        'teacher_id': [row.id for row in db.query(models.Teacher.id)],
+        'subject_id': [row.id for row in db.query(models.Subject.id)],
+        'is_lab': [True, False],
+        'lab_room': ["Lab A", "Lab B"],
+    }
+    names = rng.sample(sorted(choices), k=rng.randint(0, 3))
+    return {name: rng.choice(choices[name]) for name in names}
+
+
+def compare(seed_value, probes=60):
+    rng = random.Random(seed_value)
+    reference_cache.invalidate()
+    engine, db = make_session()
+    try:
+        seed(db, rng)
+        for _ in range(probes):
+            filters = random_filters(rng, db)
+            expected = expected_ids(db, filters)
+            limit = rng.choice([1, 3, 7, 1000])
+            found, pages = search_all(db, filters, limit)
+            assert found == expected, (seed_value, filters, limit)
+            assert pages == max(1, -(-len(expected) // limit)), (pages, len(expected), limit)
+    finally:
+        db.close()
+        engine.dispose()
+        reference_cache.invalidate()
+
+
+def test_search_routines_matches_filter():
+    for seed_value in range(5):
+        compare(seed_value)
+
+
+if __name__ == "__main__":
+    for seed_value in range(5):
+        compare(seed_value)
+    print("✓ search_routines filters and pages like a plain filter")
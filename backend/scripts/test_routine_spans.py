@@ -0,0 +1,105 @@
+"""
+Check the period span of routine entries with unusual num_periods: NULL counts
+as one period, 0 is an empty span (start + num_periods - 1, as the original
+check_teacher_conflicts loop computed it), across routine_entry_teachers,
+conflict checks and timetable validation.
+
+Runs against a throwaway in-memory SQLite database, so it is safe to run
+with `python scripts/test_routine_spans.py` or under pytest.
+"""
+import sys
+from datetime import time
+from pathlib import Path
+
+# Add the parent directory to the path to import app modules
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.core.database import Base
+from app.models import models
+from app.services.crud import ClassRoutineService
+from app.services.occupancy import occupancy_index
+from app.services.reference_cache import reference_cache
+from app.services.validation import TimetableValidationService
+
+
+def make_session():
+    """Create a session bound to a fresh in-memory database"""
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    return engine, sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+
+
+def run_checks():
+    reference_cache.invalidate()
+    engine, db = make_session()
+    try:
+        teacher = models.Teacher(name="Teacher", abbreviation="T", recruitment="Full Time")
+        subject = models.Subject(name="Mathematics", code="SH401")
+        day = models.Day(name="Sunday", order=1)
+        periods = [
+            models.Period(name=f"P{order}", start_time=time(8), end_time=time(9), order=order)
+            for order in range(1, 7)
+        ]
+        classes = [models.Class(name=f"Class {i}", section="A") for i in range(3)]
+        db.add_all([teacher, subject, day] + periods + classes)
+        db.commit()
+        # The index is process-wide; drop bookings left by other databases
+        occupancy_index.rebuild(db)
+        period_id = {period.order: period.id for period in periods}
+
+        def entry(order, num_periods):
+            return {
+                'dayId': day.id, 'periodId': period_id[order], 'subject_id': subject.id,
+                'num_periods': num_periods, 'lead_teacher_id': teacher.id,
+            }
+
+        # Class 0: an empty span at period 3; class 1: NULL (one period) at 5
+        ClassRoutineService.save_routine(db, classes[0].id, [entry(3, 0)])
+        ClassRoutineService.save_routine(db, classes[1].id, [entry(5, None)])
+        spans = {
+            row.class_id: (row.start_order, row.end_order)
+            for row in db.query(models.RoutineEntryTeacher).all()
+        }
+        assert spans == {classes[0].id: (3, 2), classes[1].id: (5, 5)}, spans
+
+        def conflicts(*orders):
+            result = ClassRoutineService.check_teacher_conflicts(
+                db, teacher.id, day.id, [period_id[order] for order in orders], classes[2].id
+            )
+            return len(result['conflicts'])
+
+        # 3..2 only overlaps a checked range reaching both sides of it
+        assert conflicts(3) == 0
+        assert conflicts(2) == 0
+        assert conflicts(2, 4) == 1
+        assert conflicts(5) == 1
+        assert conflicts(6) == 0
+
+        # The same slots in class 2: the empty span clashes with nothing
+        ClassRoutineService.save_routine(db, classes[2].id, [entry(3, 1), entry(5, 1)])
+        report = TimetableValidationService.validate(db)
+        clashing = [sorted(issue['entry_ids']) for issue in report['teacher_conflicts']]
+        assert len(clashing) == 1, clashing
+        class_1_entry = db.query(models.ClassRoutineEntry.id).filter(
+            models.ClassRoutineEntry.class_id == classes[1].id
+        ).scalar()
+        assert class_1_entry in clashing[0]
+    finally:
+        db.close()
+        engine.dispose()
+        reference_cache.invalidate()
+
+
+def test_routine_spans():
+    run_checks()
+
+
+if __name__ == "__main__":
+    run_checks()
+    print("✓ NULL and zero num_periods keep the original spans")
@@ -0,0 +1,238 @@
+"""
+Check the server-side Teacher Load Report against the formula Schedules.jsx
+used in the browser: 1.0 per theory period, 0.8 per lab period and 0.4 per
+half lab period, summed per teacher slot and grouped by subject name and
+theory/lab. Also checks that the incrementally maintained teacher_loads table
+stays equal to a full rebuild across routine saves, subject renames and
+routine deletes.
+
+Runs against a throwaway in-memory SQLite database, so it is safe to run
+with `python scripts/test_workload.py` or under pytest.
+"""
+import random
+import sys
+from datetime import time
+from pathlib import Path
+
+# Add the parent directory to the path to import app modules
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.core.database import Base
+from app.models import models
+from app.schemas import schemas
+from app.services.crud import ClassRoutineService, SubjectService
+from app.services.reference_cache import reference_cache
+from app.services.workload import TEACHER_SLOTS, WorkloadService
+
+
+def make_session():
+    """Create a session bound to a fresh in-memory database"""
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    return engine, sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+
+
+def seed(db, rng, num_classes=4, num_teachers=6):
+    """Random routines with theory, lab, half lab and multi-period entries.
+
+    Two subjects share a name so grouping by name (not id) is exercised, and some
+    entries have no subject, like BREAK and LC slots.
+    """
+    teachers = [
+        models.Teacher(name=f"Teacher {i}", abbreviation=f"T{i}", recruitment="Full Time")
+        for i in range(num_teachers)
+    ]
+    subjects = [
+        models.Subject(name="Mathematics", code="SH401"),
+        models.Subject(name="Mathematics", code="SH402"),
+        models.Subject(name="Physics", code="SH403", is_lab=True),
+        models.Subject(name="Programming", code="CT401", is_lab=True),
+    ]
+    days = [models.Day(name=f"Day {i}", order=i) for i in range(1, 4)]
+    periods = [
+        models.Period(name=f"P{order}", start_time=time(8), end_time=time(9), order=order)
+        for order in range(1, 8)
+    ]
+    classes = [models.Class(name=f"Class {i}", section="A") for i in range(num_classes)]
+    db.add_all(teachers + subjects + days + periods + classes)
+    db.add(models.PositionRate(position="Lecturer", rate=500.0))
+    db.flush()
+    db.add_all([
+        models.TeacherEffectiveLoad(teacher_id=teachers[0].id, effective_load=4.0, position="Lecturer"),
+        models.TeacherEffectiveLoad(teacher_id=teachers[1].id, effective_load=2.5, position="Professor"),
+        models.TeacherEffectiveLoad(teacher_id=teachers[2].id, effective_load=30.0, position=None),
+    ])
+
+    teacher_ids = [None] + [teacher.id for teacher in teachers]
+    subject_ids = [None] + [subject.id for subject in subjects]
+    for class_ in classes:
+        for day in days:
+            for period in rng.sample(periods, k=rng.randint(1, len(periods))):
+                is_lab = rng.random() < 0.5
+                db.add(models.ClassRoutineEntry(
+                    class_id=class_.id, day_id=day.id, period_id=period.id,
+                    subject_id=rng.choice(subject_ids),
+                    is_lab=is_lab,
+                    is_half_lab=is_lab and rng.random() < 0.5,
+                    num_periods=rng.choice([1, 1, 2, 3, 0, None]),
+                    **{slot: rng.choice(teacher_ids) for slot in TEACHER_SLOTS},
+                ))
+    db.commit()
+    ClassRoutineService.rebuild_entry_teachers(db)
+    WorkloadService.rebuild(db)
+
+
+def client_loads(db):
+    """The Teacher Load Report as Schedules.jsx computed it from the raw routine"""
+    effective_loads = {
+        load.teacher_id: (load.effective_load, load.position)
+        for load in db.query(models.TeacherEffectiveLoad).all()
+    }
+    rates = {rate.position: rate.rate for rate in db.query(models.PositionRate).all()}
+    loads = {}
+    for teacher in db.query(models.Teacher).all():
+        effective_load, position = effective_loads.get(teacher.id, (20, None))
+        loads[teacher.id] = {
+            'effective_load': effective_load, 'position': position, 'subjects': {},
+            'total_periods': 0, 'total_workload': 0, 'extra_load': 0, 'total_payment': 0,
+        }
+
+    subject_names = dict(db.query(models.Subject.id, models.Subject.name).all())
+    for routine in db.query(models.ClassRoutineEntry).order_by(models.ClassRoutineEntry.id):
+        if routine.subject_id is None:
+            continue
+        for teacher_id in [getattr(routine, slot) for slot in TEACHER_SLOTS]:
+            if teacher_id is None or teacher_id not in loads:
+                continue
+            teacher = loads[teacher_id]
+            subject_name = subject_names[routine.subject_id]
+            subject_type = 'P' if routine.is_lab else 'T'
+            subject = teacher['subjects'].setdefault(f"{subject_name}_{subject_type}", {
+                'subject_name': subject_name, 'type': subject_type, 'periods': 0, 'workload': 0,
+            })
+            periods = routine.num_periods or 1
+            if routine.is_lab:
+                workload = periods * 0.4 if routine.is_half_lab else periods * 0.8
+            else:
+                workload = periods * 1.0
+            subject['periods'] += periods
+            subject['workload'] += workload
+            teacher['total_periods'] += periods
+            teacher['total_workload'] += workload
+
+    for teacher in loads.values():
+        teacher['extra_load'] = teacher['total_workload'] - teacher['effective_load']
+        if teacher['extra_load'] > 0 and teacher['position'] and rates.get(teacher['position']):
+            teacher['total_payment'] = teacher['extra_load'] * rates[teacher['position']] * 15
+    return {teacher_id: teacher for teacher_id, teacher in loads.items() if teacher['total_periods'] > 0}
+
+
+def displayed(teacher):
+    """What the report shows for one teacher: workloads to one decimal, payment to two"""
+    return {
+        'subjects': [
+            (key, s['subject_name'], s['type'], s['periods'], f"{s['workload']:.1f}")
+            for key, s in teacher['subjects'].items()
+        ],
+        'total_periods': teacher['total_periods'],
+        'total_workload': f"{teacher['total_workload']:.1f}",
+        'extra_load': f"{teacher['extra_load']:.1f}",
+        'total_payment': f"{teacher['total_payment']:.2f}",
+    }
+
+
+def compare(seed_value):
+    rng = random.Random(seed_value)
+    reference_cache.invalidate()
+    engine, db = make_session()
+    try:
+        seed(db, rng)
+        expected = {teacher_id: displayed(teacher) for teacher_id, teacher in client_loads(db).items()}
+        actual = {row['teacher_id']: displayed(row) for row in WorkloadService.get_teacher_loads(db)}
+        assert actual == expected, seed_value
+        return len(expected)
+    finally:
+        db.close()
+        engine.dispose()
+        reference_cache.invalidate()
+
+
+def random_entries(rng, db):
+    """A routine as the frontend posts it, one entry per randomly chosen slot"""
+    teacher_ids = [None] + [row.id for row in db.query(models.Teacher.id)]
+    subject_ids = [None] + [row.id for row in db.query(models.Subject.id)]
+    slots = [(day.id, period.id) for day in db.query(models.Day.id) for period in db.query(models.Period.id)]
+    entries = []
+    for day_id, period_id in rng.sample(slots, k=rng.randint(1, 8)):
+        is_lab = rng.random() < 0.5
+        entries.append({
+            'dayId': day_id, 'periodId': period_id, 'subject_id': rng.choice(subject_ids),
+            'is_lab': is_lab, 'is_half_lab': is_lab and rng.random() < 0.5,
+            'num_periods': rng.choice([1, 1, 2, 3]),
+            **{slot: rng.choice(teacher_ids) for slot in TEACHER_SLOTS},
+        })
+    return entries
+
+
+def check_incremental(seed_value):
+    """Save, edit, rename and delete routines, checking teacher_loads after every step"""
+    rng = random.Random(seed_value)
+    reference_cache.invalidate()
+    engine, db = make_session()
+    try:
+        seed(db, rng)
+        assert WorkloadService.check(db) == []
+        class_ids = [row.id for row in db.query(models.Class.id)]
+        subject_ids = [row.id for row in db.query(models.Subject.id)]
+        for step in range(20):
+            operation = rng.choice(['save', 'save', 'edit', 'rename', 'delete'])
+            class_id = rng.choice(class_ids)
+            if operation == 'save':
+                ClassRoutineService.save_routine(db, class_id, random_entries(rng, db))
+            elif operation == 'edit':
+                # Change teachers and lengths of the stored entries, keeping their keys
+                entries = [{
+                    'dayId': entry.day_id, 'periodId': entry.period_id, 'subject_id': entry.subject_id,
+                    'is_lab': entry.is_lab, 'is_half_lab': not entry.is_half_lab if entry.is_lab else False,
+                    'num_periods': rng.choice([1, 2, 3]),
+                    **{slot: rng.choice([None, getattr(entry, slot)]) for slot in TEACHER_SLOTS},
+                } for entry in db.query(models.ClassRoutineEntry).filter(
+                    models.ClassRoutineEntry.class_id == class_id
+                )]
+                ClassRoutineService.save_routine(db, class_id, entries)
+            elif operation == 'rename':
+                # Renaming can merge two subjects' rows or split them apart again
+                name = rng.choice(["Mathematics", "Physics", "Programming", f"Subject {step}"])
+                SubjectService.update(db, rng.choice(subject_ids), schemas.SubjectUpdate(name=name))
+            else:
+                ClassRoutineService.delete_routine(db, class_id)
+            assert WorkloadService.check(db) == [], (seed_value, step, operation)
+    finally:
+        db.close()
+        engine.dispose()
+        reference_cache.invalidate()
+
+
+def test_teacher_loads_match_client_formula():
+    for seed_value in range(10):
+        assert compare(seed_value) > 0
+
+
+def test_incremental_teacher_loads_do_not_drift():
+    for seed_value in range(5):
+        check_incremental(seed_value)
+
+
+if __name__ == "__main__":
+    for seed_value in range(10):
+        compare(seed_value)
+    print("✓ teacher loads match the Schedules.jsx formula")
+    for seed_value in range(5):
+        check_incremental(seed_value)
+    print("✓ incremental teacher loads match a full rebuild")
@@ -0,0 +1,61 @@
+"""
+Validate the whole timetable before deploying.
+
+Reports teacher double-bookings, lab room clashes, overlapping entries
+within a class and entries that run past the last period. Exits with
+status 1 when any issue is found.
+"""
+import sys
+import time
+from pathlib import Path
+
+# Add the parent directory to the path to import app modules
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from app.core.database import SessionLocal
+from app.services.validation import TimetableValidationService
+
+SECTIONS = [
+    ('teacher_conflicts', 'Teacher double-bookings'),
+    ('lab_room_conflicts', 'Lab room clashes'),
+    ('class_overlaps', 'Class slot overlaps'),
+]
+
+def validate_timetable():
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        report = TimetableValidationService.validate(db)
+        elapsed = time.perf_counter() - started
+    finally:
+        db.close()
+
+    print(f"Checked {report['entry_count']} routine entries in {elapsed:.3f}s")
+    print("-" * 50)
+
+    for key, title in SECTIONS:
+        issues = report[key]
+        print(f"{title}: {len(issues)}")
+        for issue in issues:
+            print(
+                f"  {issue['day_name']} {issue['resource']}: "
+                f"{issue['class_names'][0]} ({issue['periods'][0]}) vs "
+                f"{issue['class_names'][1]} ({issue['periods'][1]}) "
+                f"[entries {issue['entry_ids'][0]}, {issue['entry_ids'][1]}]"
+            )
+
+    overruns = report['period_overruns']
+    print(f"Period overruns: {len(overruns)}")
+    for issue in overruns:
+        print(f"  {issue['day_name']} {issue['class_name']}: {issue['reason']} [entry {issue['entry_id']}]")
+
+    print("-" * 50)
+    if report['valid']:
+        print("✓ Timetable is valid")
+    else:
+        print("✗ Timetable has issues")
+    return report['valid']
+
+if __name__ == "__main__":
+    sys.exit(0 if validate_timetable() else 1)
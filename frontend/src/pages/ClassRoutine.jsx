@@ -48,9 +48,31 @@ import {
   subjectService,
   teacherService,
   classRoutineService,
+  createListSync,
+  fetchAllPages,
+  runExportJob,
+  exportService,
+  saveDownload,
 } from '../services'
 import MultiSubjectLabDialog from '../components/MultiSubjectLabDialog'
 
+// Lists the static deployment is built from, kept current from the change feed; the
+// paged lists are fetched whole so rows the feed adds are never past a page limit
+const deployLists = createListSync({
+  classes: { fetch: () => fetchAllPages(classService.getAll), table: 'classes' },
+  subjects: { fetch: () => fetchAllPages(subjectService.getAll), table: 'subjects' },
+  teachers: { fetch: () => fetchAllPages(teacherService.getAll), table: 'teachers' },
+  days: { fetch: () => fetchAllPages(dayService.getAll), table: 'days', sortBy: ['order', 'id'] },
+  periods: { fetch: () => fetchAllPages(periodService.getAll), table: 'periods', sortBy: ['order', 'id'] },
+  programmes: { fetch: () => fetchAllPages(programmeService.getAll), table: 'programmes' },
+  semesters: { fetch: () => fetchAllPages(semesterService.getAll), table: 'semesters' },
+  // Routine rows carry subject, class, semester and programme fields
+  routines: {
+    fetch: () => classRoutineService.getAll(),
+    refetchOn: ['class_routine_entries', 'subjects', 'classes', 'semesters', 'programmes'],
+  },
+})
+
 function TabPanel({ children, value, index }) {
   return (
     <div hidden={value !== index}>
@@ -219,6 +241,55 @@ export default function ClassRoutine() {
 
   const [autoSaveTimeout, setAutoSaveTimeout] = useState(null)
 
+  // Latest state for the occupancy event handler, which subscribes once
+  const occupancyStateRef = useRef({})
+  occupancyStateRef.current = { classId: formData.class_id, routineData, periods, teachers }
+
+  // Other editors' saves arrive as occupancy events (the class's full teacher bookings).
+  // Warn when one books a teacher at a time this class already uses them, instead of
+  // finding out only at the next conflict check.
+  useEffect(() => {
+    const source = classRoutineService.subscribeEvents((type, data) => {
+      if (type !== 'class_occupancy') return
+      const { classId, routineData, periods, teachers } = occupancyStateRef.current
+      if (!classId || data.class_id === classId) return
+
+      const periodOrder = Object.fromEntries(periods.map(p => [p.id, p.order]))
+      const clashing = new Set()
+      Object.entries(routineData).forEach(([key, value]) => {
+        if (value.isContinuation) return
+        const [dayId, periodId] = key.split('-').map(Number)
+        const start = periodOrder[periodId]
+        if (start === undefined) return
+        const assignments = value.lab_subjects?.length > 0 ? value.lab_subjects : [value]
+        assignments.forEach(assignment => {
+          const end = start + (assignment.num_periods || value.num_periods || 1) - 1
+          const teacherIds = [
+            assignment.lead_teacher_id,
+            assignment.assist_teacher_1_id,
+            assignment.assist_teacher_2_id,
+            assignment.assist_teacher_3_id,
+          ].filter(id => id)
+          data.bookings.forEach(([teacherId, bookedDayId, bookedStart, bookedEnd]) => {
+            if (bookedDayId === dayId && teacherIds.includes(teacherId) && bookedStart <= end && bookedEnd >= start) {
+              clashing.add(teacherId)
+            }
+          })
+        })
+      })
+
+      if (clashing.size > 0) {
+        const names = [...clashing].map(id => teachers.find(t => t.id === id)?.name || 'Unknown Teacher')
+        setSnackbar({
+          open: true,
+          message: `Another class was just saved with ${names.join(', ')} at a time this class uses them`,
+          severity: 'warning',
+        })
+      }
+    })
+    return () => source.close()
+  }, [])
+
   // Load saved effective date from localStorage on mount
   useEffect(() => {
     const savedDate = localStorage.getItem('classRoutine_effectiveDate')
@@ -403,20 +474,12 @@ export default function ClassRoutine() {
   const updateStaticDeployment = async () => {
     try {
       // Fetch all necessary data
-      const [classesRes, subjectsRes, teachersRes, routinesRes, daysRes, periodsRes, programmesRes, semestersRes] = await Promise.all([
-        classService.getAll(),
-        subjectService.getAll(),
-        teacherService.getAll(),
-        classRoutineService.getAll(),
-        dayService.getAll(),
-        periodService.getAll(),
-        programmeService.getAll(),
-        semesterService.getAll(),
-      ])
+      // Only the first load fetches every list; later ones apply the change feed
+      const lists = await deployLists.load()
 
-      const classesData = classesRes.data || []
-      const programmesData = programmesRes.data || []
-      const semestersData = semestersRes.data || []
+      const classesData = lists.classes
+      const programmesData = lists.programmes
+      const semestersData = lists.semesters
 
       // Enrich classes with programme and semester names
       const enrichedClasses = classesData.map(cls => {
@@ -432,7 +495,7 @@ export default function ClassRoutine() {
       })
 
       // Group multi-subject labs by lab_group_id
-      const rawRoutines = routinesRes.data || []
+      const rawRoutines = lists.routines
       const labGroups = {}
       const groupedRoutines = []
       const processedLabGroups = new Set()
@@ -476,11 +539,11 @@ export default function ClassRoutine() {
 
       const deployData = {
         classes: enrichedClasses,
-        subjects: subjectsRes.data || [],
-        teachers: teachersRes.data || [],
+        subjects: lists.subjects,
+        teachers: lists.teachers,
         routines: groupedRoutines,
-        days: daysRes.data || [],
-        periods: periodsRes.data || [],
+        days: lists.days,
+        periods: lists.periods,
         programmes: programmesData,
         semesters: semestersData,
       }
@@ -1192,608 +1255,76 @@ export default function ClassRoutine() {
     XLSX.writeFile(wb, filename)
   }
 
+  // Progress callback for runExportJob: shows the job's progress in the snackbar
+  const showExportProgress = (label) => (progress) => {
+    setSnackbar({ open: true, message: `${label}... ${Math.round(progress * 100)}%`, severity: 'info' })
+  }
+
   const handleExportAll = async () => {
     if (classes.length === 0) {
       alert('No classes available to export')
       return
     }
 
-    // Create workbook
-    const wb = XLSX.utils.book_new()
-
-    // Fetch all class routines
     try {
-      const allRoutines = await classRoutineService.getAll()
-      const routinesData = allRoutines.data || []
-
-      // Group routines by class
-      const routinesByClass = {}
-      routinesData.forEach(routine => {
-        const classId = routine.class_id
-        if (!routinesByClass[classId]) {
-          routinesByClass[classId] = []
-        }
-        routinesByClass[classId].push(routine)
-      })
-
-      // Create a sheet for each class
-      classes.forEach((classItem, index) => {
-        const classRoutines = routinesByClass[classItem.id] || []
-        
-        // Build routine map for this class
-        const classRoutineMap = {}
-        classRoutines.forEach(entry => {
-          const key = `${entry.day_id}-${entry.period_id}`
-          classRoutineMap[key] = entry
-        })
-
-        // Create worksheet data
-        const wsData = []
-        const className = classItem.name
-        const roomNumber = classItem.room_no || 'N/A'
-
-        // Header rows
-        wsData.push(['Kantipur Engineering College'])
-        wsData.push(['Class Routine'])
-        
-        const row3 = new Array(periods.length + 1).fill('')
-        row3[0] = `Class: ${className}`
-        row3[periods.length] = `Room: ${roomNumber}`
-        wsData.push(row3)
-        
-        wsData.push(['Effective From: N/A'])
-        wsData.push([])
-        
-        // Header row with periods
-        const headerRow = ['Days \\ Time']
-        periods.forEach(period => {
-          headerRow.push(`${period.start_time?.substring(0, 5)}-${period.end_time?.substring(0, 5)}`)
-        })
-        wsData.push(headerRow)
-        
-        // Data rows
-        days.forEach(day => {
-          const row = [day.name]
-          
-          let skipCount = 0
-          periods.forEach((period) => {
-            if (skipCount > 0) {
-              skipCount--
-              row.push('') // Add empty cell for merged periods
-              return
-            }
-            
-            const key = `${day.id}-${period.id}`
-            const cellData = classRoutineMap[key]
-            
-            if (!cellData) {
-              row.push('-')
-            } else {
-              let cellContent = ''
-              
-              if (cellData.subject_id === 'BREAK') {
-                cellContent = 'BREAK'
-              } else if (cellData.subject_id === 'LC') {
-                cellContent = 'LC (Library Consultation)'
-              } else {
-                const subject = cellData.subject
-                cellContent = subject?.name || 'N/A'
-                
-                if (cellData.is_lab) {
-                  cellContent += ' (Lab)'
-                }
-                
-                // Add teachers with abbreviation in brackets
-                const leadTeacherId = cellData.lead_teacher_id
-                if (leadTeacherId) {
-                  const leadTeacher = teachers.find(t => t.id === leadTeacherId)
-                  if (leadTeacher) {
-                    cellContent += `\n(${leadTeacher.abbreviation || leadTeacher.name})`
-                  }
-                }
-                
-                if (cellData.assist_teacher_1_id || cellData.assist_teacher_2_id) {
-                  const assistants = []
-                  if (cellData.assist_teacher_1_id) {
-                    const assist1 = teachers.find(t => t.id === cellData.assist_teacher_1_id)
-                    if (assist1) assistants.push(`(${assist1.abbreviation || assist1.name})`)
-                  }
-                  if (cellData.assist_teacher_2_id) {
-                    const assist2 = teachers.find(t => t.id === cellData.assist_teacher_2_id)
-                    if (assist2) assistants.push(`(${assist2.abbreviation || assist2.name})`)
-                  }
-                  if (assistants.length > 0) {
-                    cellContent += `, ${assistants.join(', ')}`
-                  }
-                }
-                
-                if (cellData.is_lab) {
-                  if (cellData.room_no) {
-                    cellContent += `\nRoom: ${cellData.room_no}`
-                  }
-                  if (cellData.group) {
-                    cellContent += `\nGroup: ${cellData.group}`
-                  }
-                }
-              }
-              
-              row.push(cellContent)
-              
-              if (cellData.num_periods > 1) {
-                skipCount = cellData.num_periods - 1
-              }
-            }
-          })
-          
-          wsData.push(row)
-        })
-
-        // Create worksheet
-        const ws = XLSX.utils.aoa_to_sheet(wsData)
-
-        // Set column widths
-        const colWidths = [{ wch: 11.27 }] // Day column
-        periods.forEach(() => {
-          colWidths.push({ wch: 11.27 }) // Period columns
-        })
-        ws['!cols'] = colWidths
-
-        // Set row heights
-        const rowHeights = []
-        rowHeights[0] = { hpt: 24 }
-        rowHeights[1] = { hpt: 20 }
-        rowHeights[2] = { hpt: 18 }
-        rowHeights[3] = { hpt: 18 }
-        rowHeights[4] = { hpt: 5 }
-        rowHeights[5] = { hpt: 20 }
-        for (let i = 6; i < 6 + days.length; i++) {
-          rowHeights[i] = { hpt: 85.50 }
-        }
-        ws['!rows'] = rowHeights
-
-        // Merge cells for title rows and multi-period entries
-        const merges = [
-          { s: { r: 0, c: 0 }, e: { r: 0, c: periods.length } },
-          { s: { r: 1, c: 0 }, e: { r: 1, c: periods.length } },
-        ]
-        
-        // Add merges for multi-period classes
-        days.forEach((day, dayIdx) => {
-          let skipCount = 0
-          periods.forEach((period, periodIdx) => {
-            if (skipCount > 0) {
-              skipCount--
-              return
-            }
-            
-            const key = `${day.id}-${period.id}`
-            const cellData = classRoutineMap[key]
-            
-            if (cellData && cellData.num_periods > 1) {
-              const rowIndex = 6 + dayIdx
-              const startCol = periodIdx + 1
-              const endCol = startCol + cellData.num_periods - 1
-              
-              merges.push({
-                s: { r: rowIndex, c: startCol },
-                e: { r: rowIndex, c: endCol }
-              })
-              
-              skipCount = cellData.num_periods - 1
-            }
-          })
-        })
-        
-        ws['!merges'] = merges
-
-        // Apply styles
-        const range = XLSX.utils.decode_range(ws['!ref'])
-        for (let R = range.s.r; R <= range.e.r; ++R) {
-          for (let C = range.s.c; C <= range.e.c; ++C) {
-            const cellAddress = XLSX.utils.encode_cell({ r: R, c: C })
-            if (!ws[cellAddress]) continue
-            
-            ws[cellAddress].s = {
-              border: {
-                top: { style: 'thin' },
-                bottom: { style: 'thin' },
-                left: { style: 'thin' },
-                right: { style: 'thin' }
-              },
-              alignment: {
-                wrapText: true,
-                vertical: 'center',
-                horizontal: 'center'
-              }
-            }
-            
-            if (R === 0) {
-              ws[cellAddress].s = {
-                font: { bold: true, sz: 16 },
-                alignment: { horizontal: 'center', vertical: 'center' }
-              }
-            }
-            if (R === 1) {
-              ws[cellAddress].s = {
-                font: { bold: true, sz: 14 },
-                alignment: { horizontal: 'center', vertical: 'center' }
-              }
-            }
-            if (R === 2) {
-              ws[cellAddress].s = {
-                font: { bold: true },
-                alignment: { 
-                  horizontal: C === 0 ? 'left' : (C === periods.length ? 'right' : 'center'),
-                  vertical: 'center'
-                }
-              }
-            }
-            if (R === 3) {
-              ws[cellAddress].s = {
-                font: { bold: true },
-                alignment: { horizontal: 'left', vertical: 'center' }
-              }
-            }
-            if (R === 4) {
-              ws[cellAddress].s = {}
-            }
-            if (R === 5) {
-              ws[cellAddress].s = {
-                font: { bold: true },
-                fill: { fgColor: { rgb: 'D3D3D3' } },
-                border: {
-                  top: { style: 'thin' },
-                  bottom: { style: 'thin' },
-                  left: { style: 'thin' },
-                  right: { style: 'thin' }
-                },
-                alignment: { horizontal: 'center', vertical: 'center', wrapText: true }
-              }
-            }
-            if (R >= 6 && C === 0) {
-              ws[cellAddress].s = {
-                font: { bold: true },
-                fill: { fgColor: { rgb: 'F0F0F0' } },
-                border: {
-                  top: { style: 'thin' },
-                  bottom: { style: 'thin' },
-                  left: { style: 'thin' },
-                  right: { style: 'thin' }
-                },
-                alignment: { horizontal: 'center', vertical: 'center' }
-              }
-            }
-          }
-        }
-
-        // Page setup for A4 landscape printing
-        ws['!pageSetup'] = {
-          orientation: 'landscape',
-          paperSize: 9, // A4
-          fitToWidth: 1, // Fit to 1 page wide
-          fitToHeight: 0, // Allow multiple pages vertically if needed
-          scale: 100,
-          horizontalDpi: 300,
-          verticalDpi: 300
-        }
-
-        ws['!margins'] = {
-          left: 0.5,
-          right: 0.5,
-          top: 0.75,
-          bottom: 0.75,
-          header: 0.3,
-          footer: 0.3
-        }
+      // The workbook (one sheet per class of this semester) is built by a server export job
+      await runExportJob(
+        'class-routines',
+        { semester_id: formData.semester_id },
+        showExportProgress('Exporting class routines'),
+      )
+      setSnackbar({ open: true, message: 'Class routines exported', severity: 'success' })
+    } catch (error) {
+      if (error.response?.status === 400) {
+        alert(error.response.data.detail)
+        return
+      }
+      console.error('Error exporting all routines:', error)
+      alert('Failed to export all routines. Please try again.')
+    }
+  }
 
-        // Set print area to include all data
-        const maxRow = 5 + days.length // Header rows + data rows
-        const maxCol = periods.length // All period columns
-        ws['!printArea'] = `A1:${XLSX.utils.encode_col(maxCol)}${maxRow + 1}`
+  const handleExportPdf = async () => {
+    if (!formData.class_id) {
+      alert('Please select a class first')
+      return
+    }
 
-        // Add worksheet with sanitized class name
-        // Remove invalid characters: : \ / ? * [ ]
-        let sheetName = className.replace(/[:\\\/\?\*\[\]]/g, '-')
-        sheetName = sheetName.substring(0, 31) // Excel sheet name max 31 chars
-        XLSX.utils.book_append_sheet(wb, ws, sheetName)
-      })
+    try {
+      const response = await exportService.classPdf(formData.class_id)
+      saveDownload(response, 'Class_Routine.pdf')
+    } catch (error) {
+      console.error('Error exporting routine PDF:', error)
+      alert('Failed to export routine PDF. Please try again.')
+    }
+  }
 
-      // Save file
-      const filename = `All_Class_Routines_${new Date().toISOString().split('T')[0]}.xlsx`
-      XLSX.writeFile(wb, filename)
+  const handleExportAllPdf = async () => {
+    if (classes.length === 0) {
+      alert('No classes available to export')
+      return
+    }
 
+    try {
+      // One PDF per class of this semester, in a ZIP
+      const response = await exportService.classPdfs({ semester_id: formData.semester_id })
+      saveDownload(response, `Class_Routines_PDF_${new Date().toISOString().split('T')[0]}.zip`)
     } catch (error) {
-      console.error('Error exporting all routines:', error)
-      alert('Failed to export all routines. Please try again.')
+      console.error('Error exporting routine PDFs:', error)
+      alert('Failed to export routine PDFs. Please try again.')
     }
   }
 
   const handleExportDayWise = async () => {
     try {
-      // Fetch ALL classes from all semesters
-      const allClassesResponse = await classService.getAll()
-      const allClasses = allClassesResponse.data || []
-      
-      if (allClasses.length === 0) {
-        alert('No classes available to export')
+      // The master routine (every class, Sunday to Thursday) is built by a server export job
+      await runExportJob('day-wise', {}, showExportProgress('Exporting day-wise routine'))
+      setSnackbar({ open: true, message: 'Day-wise routine exported', severity: 'success' })
+    } catch (error) {
+      if (error.response?.status === 400) {
+        alert(error.response.data.detail)
         return
       }
-
-      // Fetch ALL subjects (not just semester-specific)
-      const allSubjectsResponse = await subjectService.getAll()
-      const allSubjects = allSubjectsResponse.data || []
-
-      // Fetch ALL teachers
-      const allTeachersResponse = await teacherService.getAll()
-      const allTeachers = allTeachersResponse.data || []
-
-      // Fetch all class routines
-      const allRoutines = await classRoutineService.getAll()
-      const routinesData = allRoutines.data || []
-
-      // Group routines by class
-      const routinesByClass = {}
-      routinesData.forEach(routine => {
-        const classId = routine.class_id
-        if (!routinesByClass[classId]) {
-          routinesByClass[classId] = []
-        }
-        routinesByClass[classId].push(routine)
-      })
-
-      // Create workbook
-      const wb = XLSX.utils.book_new()
-
-      // Filter days Sunday to Thursday
-      const workDays = days.filter(day => {
-        const dayName = day.name.toLowerCase()
-        return ['sunday', 'monday', 'tuesday', 'wednesday', 'thursday'].includes(dayName)
-      })
-
-      // Create a sheet for each day
-      workDays.forEach(day => {
-        const wsData = []
-        
-        // Row 1: Header with time slots
-        const headerRow = ['Class \\ Time']
-        periods.forEach(period => {
-          headerRow.push(`${period.start_time?.substring(0, 5)}-${period.end_time?.substring(0, 5)}`)
-        })
-        wsData.push(headerRow)
-
-        // Rows 2+: Each class from ALL classes
-        allClasses.forEach(classItem => {
-          const classRoutines = routinesByClass[classItem.id] || []
-          
-          // Build routine map for this class - store as arrays to handle multiple sessions
-          const classRoutineMap = {}
-          classRoutines.forEach(entry => {
-            const key = `${entry.day_id}-${entry.period_id}`
-            if (!classRoutineMap[key]) {
-              classRoutineMap[key] = []
-            }
-            classRoutineMap[key].push(entry)
-          })
-
-          // Create row for this class
-          const classLabel = `${classItem.name}\n[${classItem.room_no || 'N/A'}]`
-          const row = [classLabel]
-          
-          let skipCount = 0
-          periods.forEach((period) => {
-            if (skipCount > 0) {
-              skipCount--
-              row.push('') // Empty cell for multi-period continuation
-              return
-            }
-
-            const key = `${day.id}-${period.id}`
-            const cellDataArray = classRoutineMap[key] || []
-            
-            let cellContent = ''
-            
-            if (cellDataArray.length === 0) {
-              cellContent = ''
-            } else {
-              // Process each session (could be multiple lab sessions)
-              cellDataArray.forEach((cellData, sessionIndex) => {
-                if (sessionIndex > 0) {
-                  cellContent += '\n--------------------\n'
-                }
-                
-                if (cellData.isContinuation) {
-                  // Skip continuation cells
-                  return
-                } else if (cellData.subject_id === 'BREAK') {
-                  cellContent += 'B'
-                } else if (cellData.subject_id === 'LC') {
-                  cellContent += 'LC'
-                } else if (cellData.lab_subjects && cellData.lab_subjects.length > 0) {
-                  // Multi-subject lab
-                  cellData.lab_subjects.forEach((labSubject, index) => {
-                    if (index > 0) cellContent += '\n'
-                    
-                    // Get subject name from all subjects
-                    let subject = allSubjects.find(s => s.id === labSubject.subject_id)
-                    let subjectName = subject?.name || labSubject.subject_name || 'Unknown Subject'
-                    
-                    // Format: Subject Name LAB (Group)(Lab Room) (Teachers)
-                    cellContent += `${subjectName} LAB`
-                    
-                    if (labSubject.group) {
-                      cellContent += ` (${labSubject.group})`
-                    }
-                    
-                    if (labSubject.lab_room) {
-                      cellContent += `(Lab:${labSubject.lab_room})`
-                    }
-                    
-                    // Teachers
-                    const teacherAbbrs = []
-                    const leadTeacher = allTeachers.find(t => t.id === labSubject.lead_teacher_id)
-                    if (leadTeacher) teacherAbbrs.push(leadTeacher.abbreviation || leadTeacher.name)
-                    
-                    if (labSubject.assist_teacher_1_id) {
-                      const assist1 = allTeachers.find(t => t.id === labSubject.assist_teacher_1_id)
-                      if (assist1) teacherAbbrs.push(assist1.abbreviation || assist1.name)
-                    }
-                    if (labSubject.assist_teacher_2_id) {
-                      const assist2 = allTeachers.find(t => t.id === labSubject.assist_teacher_2_id)
-                      if (assist2) teacherAbbrs.push(assist2.abbreviation || assist2.name)
-                    }
-                    
-                    if (teacherAbbrs.length > 0) {
-                      cellContent += ` (${teacherAbbrs.join(' + ')})`
-                    }
-                  })
-                } else {
-                  // Regular subject
-                  const subject = allSubjects.find(s => s.id === cellData.subject_id)
-                  cellContent += subject?.name || 'N/A'
-                  
-                  // Teachers with abbreviations
-                  const leadTeacher = allTeachers.find(t => t.id === cellData.lead_teacher_id)
-                  if (leadTeacher) {
-                    cellContent += ` (${leadTeacher.abbreviation || leadTeacher.name})`
-                  }
-                  
-                  // Lab details
-                  if (cellData.is_lab) {
-                    if (cellData.group) {
-                      cellContent += ` (${cellData.group})`
-                    }
-                    if (cellData.room_no) {
-                      cellContent += `(Lab:${cellData.room_no})`
-                    }
-                  }
-                }
-                
-                // Handle multi-period spanning for the first session only
-                if (sessionIndex === 0 && cellData.num_periods > 1) {
-                  skipCount = cellData.num_periods - 1
-                }
-              })
-            }
-            
-            row.push(cellContent)
-          })
-          
-          wsData.push(row)
-        })
-
-        // Create worksheet
-        const ws = XLSX.utils.aoa_to_sheet(wsData)
-
-        // Set column widths
-        const colWidths = [{ wch: 20 }] // Class column (wider for class name + room)
-        periods.forEach(() => {
-          colWidths.push({ wch: 25 }) // Period columns (wide enough for multi-line content)
-        })
-        ws['!cols'] = colWidths
-
-        // Calculate row heights dynamically
-        const rowHeights = []
-        rowHeights[0] = { hpt: 30 } // Header row
-        
-        wsData.forEach((row, idx) => {
-          if (idx > 0) {
-            let maxLines = 1
-            row.forEach(cell => {
-              if (cell) {
-                const lineCount = (String(cell).match(/\n/g) || []).length + 1
-                maxLines = Math.max(maxLines, lineCount)
-              }
-            })
-            rowHeights[idx] = { hpt: Math.max(25, maxLines * 15) }
-          }
-        })
-        
-        ws['!rows'] = rowHeights
-
-        // Apply cell styling
-        const range = XLSX.utils.decode_range(ws['!ref'])
-        for (let R = range.s.r; R <= range.e.r; R++) {
-          for (let C = range.s.c; C <= range.e.c; C++) {
-            const cellAddress = XLSX.utils.encode_cell({ r: R, c: C })
-            if (!ws[cellAddress]) continue
-
-            // Header row
-            if (R === 0) {
-              ws[cellAddress].s = {
-                font: { bold: true, sz: 11 },
-                fill: { fgColor: { rgb: 'D3D3D3' } },
-                border: {
-                  top: { style: 'thin' },
-                  bottom: { style: 'thin' },
-                  left: { style: 'thin' },
-                  right: { style: 'thin' }
-                },
-                alignment: { horizontal: 'center', vertical: 'center', wrapText: true }
-              }
-            } else {
-              // Data rows
-              if (C === 0) {
-                // Class column
-                ws[cellAddress].s = {
-                  font: { bold: true, sz: 10 },
-                  fill: { fgColor: { rgb: 'F0F0F0' } },
-                  border: {
-                    top: { style: 'thin' },
-                    bottom: { style: 'thin' },
-                    left: { style: 'thin' },
-                    right: { style: 'thin' }
-                  },
-                  alignment: { horizontal: 'left', vertical: 'center', wrapText: true }
-                }
-              } else {
-                // Period data cells
-                ws[cellAddress].s = {
-                  border: {
-                    top: { style: 'thin' },
-                    bottom: { style: 'thin' },
-                    left: { style: 'thin' },
-                    right: { style: 'thin' }
-                  },
-                  alignment: { 
-                    horizontal: 'left', 
-                    vertical: 'top',
-                    wrapText: true 
-                  },
-                  font: { sz: 9 }
-                }
-              }
-            }
-          }
-        }
-
-        // Page setup for A4 landscape printing
-        ws['!pageSetup'] = {
-          orientation: 'landscape',
-          paperSize: 9, // A4
-          fitToWidth: 1,
-          fitToHeight: 0,
-          scale: 85 // Slightly reduced to fit more content
-        }
-
-        ws['!margins'] = {
-          left: 0.4,
-          right: 0.4,
-          top: 0.5,
-          bottom: 0.5
-        }
-
-        // Sanitize sheet name
-        let sheetName = day.name.substring(0, 31)
-        XLSX.utils.book_append_sheet(wb, ws, sheetName)
-      })
-
-      // Generate filename
-      const filename = `Day_Wise_Routine_${new Date().toISOString().split('T')[0]}.xlsx`
-
-      // Save file
-      XLSX.writeFile(wb, filename)
-
-    } catch (error) {
       console.error('Error exporting day-wise routines:', error)
       alert('Failed to export day-wise routines. Please try again.')
     }
@@ -1802,20 +1333,12 @@ export default function ClassRoutine() {
   const handleDeploy = async () => {
     try {
       // Fetch all necessary data
-      const [classesRes, subjectsRes, teachersRes, routinesRes, daysRes, periodsRes, programmesRes, semestersRes] = await Promise.all([
-        classService.getAll(),
-        subjectService.getAll(),
-        teacherService.getAll(),
-        classRoutineService.getAll(),
-        dayService.getAll(),
-        periodService.getAll(),
-        programmeService.getAll(),
-        semesterService.getAll(),
-      ])
+      // Only the first load fetches every list; later ones apply the change feed
+      const lists = await deployLists.load()
 
-      const classesData = classesRes.data || []
-      const programmesData = programmesRes.data || []
-      const semestersData = semestersRes.data || []
+      const classesData = lists.classes
+      const programmesData = lists.programmes
+      const semestersData = lists.semesters
 
       // Enrich classes with programme and semester names
       const enrichedClasses = classesData.map(cls => {
@@ -1831,7 +1354,7 @@ export default function ClassRoutine() {
       })
 
       // Group multi-subject labs by lab_group_id
-      const rawRoutines = routinesRes.data || []
+      const rawRoutines = lists.routines
       const labGroups = {}
       const groupedRoutines = []
       const processedLabGroups = new Set()
@@ -1880,11 +1403,11 @@ export default function ClassRoutine() {
 
       const deployData = {
         classes: enrichedClasses,
-        subjects: subjectsRes.data || [],
-        teachers: teachersRes.data || [],
+        subjects: lists.subjects,
+        teachers: lists.teachers,
         routines: groupedRoutines,
-        days: daysRes.data || [],
-        periods: periodsRes.data || [],
+        days: lists.days,
+        periods: lists.periods,
         programmes: programmesData,
         semesters: semestersData,
       }
@@ -2369,28 +1892,28 @@ export default function ClassRoutine() {
     // Check across all other classes using backend API
     if (formData.class_id) {
       try {
-        for (const teacherId of teacherIds) {
-          if (!teacherId) continue
-          
-          console.log('Checking teacher conflict for:', {
-            teacherId,
-            dayId,
-            periodIds: affectedPeriodIds,
-            excludeClassId: formData.class_id
-          })
-          
-          const response = await classRoutineService.checkTeacherConflict(
-            teacherId,
-            dayId,
-            affectedPeriodIds,
-            formData.class_id
-          )
-          
-          console.log('Conflict check response:', response.data)
-          
-          if (response.data.has_conflict) {
-            const teacher = teachers.find(t => t.id === teacherId)
-            response.data.conflicts.forEach(conflict => {
+        // Check every teacher in a single round trip
+        const probes = teacherIds
+          .filter(teacherId => teacherId)
+          .map(teacherId => ({
+            teacher_id: teacherId,
+            day_id: dayId,
+            period_ids: affectedPeriodIds,
+            exclude_class_id: formData.class_id,
+          }))
+        
+        console.log('Checking teacher conflicts for:', probes)
+        
+        const response = probes.length > 0
+          ? await classRoutineService.checkTeacherConflictsBatch(probes)
+          : { data: { results: [] } }
+        
+        console.log('Conflict check response:', response.data)
+        
+        response.data.results.forEach(result => {
+          if (result.has_conflict) {
+            const teacher = teachers.find(t => t.id === result.teacher_id)
+            result.conflicts.forEach(conflict => {
               conflicts.push({
                 teacherName: teacher?.name || 'Unknown Teacher',
                 timeSlot: `Period ${conflict.period_order}`,
@@ -2400,7 +1923,7 @@ export default function ClassRoutine() {
               })
             })
           }
-        }
+        })
       } catch (error) {
         console.error('Error checking teacher conflicts across classes:', error)
         console.error('Error details:', error.response?.data)
@@ -3563,11 +3086,37 @@ export default function ClassRoutine() {
                 Export All Classes
               </Button>
             </Box>
+
+            <Box sx={{ display: 'flex', gap: 2, flexWrap: 'wrap', flexDirection: { xs: 'column', sm: 'row' }, mt: 2 }}>
+              <Button
+                variant="outlined"
+                size="large"
+                startIcon={<ExportIcon />}
+                onClick={handleExportPdf}
+                disabled={!formData.class_id}
+                fullWidth
+                sx={{ px: 3, py: 1.5, fontWeight: 600, maxWidth: { xs: '100%', sm: 'auto' } }}
+              >
+                PDF: Current Class
+              </Button>
+
+              <Button
+                variant="outlined"
+                size="large"
+                startIcon={<ExportIcon />}
+                onClick={handleExportAllPdf}
+                fullWidth
+                sx={{ px: 3, py: 1.5, fontWeight: 600, maxWidth: { xs: '100%', sm: 'auto' } }}
+              >
+                PDF: All Classes
+              </Button>
+            </Box>
             
             <Paper elevation={0} sx={{ mt: 3, p: 2, bgcolor: '#f3f4f6', borderRadius: 2 }}>
               <Typography variant="body2" color="text.secondary">
                 💡 <strong>Export Current Class:</strong> Exports only the selected class routine<br />
-                📚 <strong>Export All Classes:</strong> Exports all class routines in a single Excel file with separate sheets
+                📚 <strong>Export All Classes:</strong> Exports all class routines in a single Excel file with separate sheets<br />
+                🖨️ <strong>PDF:</strong> Printable one-page timetables for notice boards (all classes come as a ZIP)
               </Typography>
             </Paper>
           </TabPanel>
@@ -17,8 +17,7 @@ import {
 } from '@mui/material'
 import { Download as DownloadIcon, Refresh as RefreshIcon } from '@mui/icons-material'
 import * as XLSX from 'xlsx-js-style'
-import { classRoutineService, teacherService, departmentService } from '../services'
-import api from '../services/api'
+import { departmentService, workloadService } from '../services'
 
 export default function Schedules() {
   const [loading, setLoading] = useState(true)
@@ -37,133 +36,13 @@ export default function Schedules() {
       setLoading(true)
       setError(null)
 
-      // Fetch all class routines
-      const routinesResponse = await classRoutineService.getAll()
-      const routines = routinesResponse.data
-
-      // Fetch all teachers
-      const teachersResponse = await teacherService.getAll()
-      const teachers = teachersResponse.data
-
-      // Fetch all departments
+      // Fetch all departments (for the filter)
       const departmentsResponse = await departmentService.getAll()
-      const depts = departmentsResponse.data
-      setDepartments(depts)
-
-      // Fetch effective loads
-      const effectiveLoadsResponse = await api.get('/finance/effective-loads')
-      const effectiveLoads = effectiveLoadsResponse.data || []
-      
-      // Fetch position rates
-      const positionRatesResponse = await api.get('/finance/position-rates')
-      const positionRates = positionRatesResponse.data || []
-      
-      // Create effective load lookup map
-      const effectiveLoadMap = {}
-      effectiveLoads.forEach(load => {
-        effectiveLoadMap[load.teacher_id] = {
-          effective_load: load.effective_load,
-          position: load.position
-        }
-      })
-      
-      // Create position rate lookup map
-      const positionRateMap = {}
-      positionRates.forEach(rate => {
-        positionRateMap[rate.position] = rate.rate
-      })
-
-      // Create department lookup map
-      const departmentMap = {}
-      depts.forEach(dept => {
-        departmentMap[dept.id] = dept.name
-      })
-
-      // Calculate load for each teacher
-      const teacherLoadMap = {}
-
-      teachers.forEach(teacher => {
-        const effectiveLoadInfo = effectiveLoadMap[teacher.id] || { effective_load: 20, position: null }
-        
-        teacherLoadMap[teacher.id] = {
-          teacher_id: teacher.id,
-          teacher_name: teacher.name,
-          abbreviation: teacher.abbreviation,
-          department_id: teacher.department_id,
-          department_name: teacher.department_id ? departmentMap[teacher.department_id] : 'Not Assigned',
-          recruitment: teacher.recruitment,
-          effective_load: effectiveLoadInfo.effective_load,
-          position: effectiveLoadInfo.position,
-          subjects: {},
-          total_periods: 0,
-          total_workload: 0,
-          extra_load: 0,
-          total_payment: 0
-        }
-      })
-
-      // Process all routine entries
-      routines.forEach(routine => {
-        // Skip if no subject (BREAK or LC)
-        if (!routine.subject) return
-
-        const teacherIds = [
-          routine.lead_teacher_id,
-          routine.assist_teacher_1_id,
-          routine.assist_teacher_2_id,
-          routine.assist_teacher_3_id
-        ].filter(id => id != null)
-
-        teacherIds.forEach(teacherId => {
-          if (teacherLoadMap[teacherId]) {
-            const subjectName = routine.subject.name
-            const subjectKey = `${subjectName}_${routine.is_lab ? 'P' : 'T'}`
-            
-            if (!teacherLoadMap[teacherId].subjects[subjectKey]) {
-              teacherLoadMap[teacherId].subjects[subjectKey] = {
-                subject_name: subjectName,
-                type: routine.is_lab ? 'P' : 'T',
-                periods: 0,
-                workload: 0
-              }
-            }
-
-            // Add periods
-            const periods = routine.num_periods || 1
-            teacherLoadMap[teacherId].subjects[subjectKey].periods += periods
-            
-            // Calculate workload (Theory = 1.0, Full Lab = 0.8, Half Lab = 0.4 per period)
-            let workload
-            if (routine.is_lab) {
-              workload = routine.is_half_lab ? periods * 0.4 : periods * 0.8
-            } else {
-              workload = periods * 1.0
-            }
-            teacherLoadMap[teacherId].subjects[subjectKey].workload += workload
-            
-            teacherLoadMap[teacherId].total_periods += periods
-            teacherLoadMap[teacherId].total_workload += workload
-          }
-        })
-      })
-
-      // Calculate extra load and total payment for each teacher
-      Object.values(teacherLoadMap).forEach(teacher => {
-        // Extra load = total workload - effective load
-        teacher.extra_load = teacher.total_workload - teacher.effective_load
-        
-        // Total payment = extra load * position rate * 15 (only if positive extra load and position is assigned)
-        if (teacher.extra_load > 0 && teacher.position && positionRateMap[teacher.position]) {
-          teacher.total_payment = teacher.extra_load * positionRateMap[teacher.position] * 15
-        } else {
-          teacher.total_payment = 0
-        }
-      })
+      setDepartments(departmentsResponse.data)
 
-      // Convert to array and sort by teacher name
-      const loadArray = Object.values(teacherLoadMap)
-        .filter(teacher => teacher.total_periods > 0) // Only include teachers with assignments
-        .sort((a, b) => a.teacher_name.localeCompare(b.teacher_name))
+      // Loads, extra load and payments are computed server-side
+      const workloadResponse = await workloadService.getAll()
+      const loadArray = workloadResponse.data.teachers
 
       setLoadData(loadArray)
       setLoading(false)
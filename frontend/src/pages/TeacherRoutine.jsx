@@ -14,6 +14,8 @@ import {
   IconButton,
   Autocomplete,
   Button,
+  Snackbar,
+  Alert,
 } from '@mui/material'
 import { 
   Fullscreen as FullscreenIcon,
@@ -28,6 +30,9 @@ import {
   periodService,
   classRoutineService,
   departmentService,
+  runExportJob,
+  exportService,
+  saveDownload,
 } from '../services'
 
 export default function TeacherRoutine() {
@@ -40,6 +45,11 @@ export default function TeacherRoutine() {
   const [loading, setLoading] = useState(false)
   const [isFullscreen, setIsFullscreen] = useState(false)
   const [totalLoad, setTotalLoad] = useState(0)
+  const [snackbar, setSnackbar] = useState({
+    open: false,
+    message: '',
+    severity: 'success',
+  })
 
   // Load initial data
   useEffect(() => {
@@ -116,73 +126,13 @@ export default function TeacherRoutine() {
   const loadTeacherRoutine = async () => {
     setLoading(true)
     try {
-      // Get all class routines and filter for this teacher
-      const response = await classRoutineService.getAll()
-      console.log('Class routines response:', response)
-      const routines = response.data || []
+      // Teacher grid, partners and load are computed server-side in one pass
+      const response = await classRoutineService.getTeacherTimetable(selectedTeacher.id)
+      console.log('Teacher timetable response:', response)
+      const timetable = response.data || {}
       
-      // Build routine data structure
-      const routineMap = {}
-      let calculatedLoad = 0
-      
-      if (routines && Array.isArray(routines)) {
-        routines.forEach(entry => {
-          // Check if this teacher is involved (as lead or assistant)
-          const teacherId = selectedTeacher?.id
-          const isLeadTeacher = entry.lead_teacher_id === teacherId
-          const isAssistant1 = entry.assist_teacher_1_id === teacherId
-          const isAssistant2 = entry.assist_teacher_2_id === teacherId
-          const isAssistant3 = entry.assist_teacher_3_id === teacherId
-          
-          if (isLeadTeacher || isAssistant1 || isAssistant2 || isAssistant3) {
-            const key = `${entry.day_id}-${entry.period_id}`
-            
-            // Calculate load for this entry
-            const periods = entry.num_periods || 1
-            const workload = entry.is_lab ? periods * 0.8 : periods * 1.0
-            calculatedLoad += workload
-            
-            // Get partner teachers for lab sessions
-            let partners = []
-            if (entry.is_lab) {
-              if (isLeadTeacher) {
-                if (entry.assist_teacher_1_id) partners.push(entry.assist_teacher_1_id)
-                if (entry.assist_teacher_2_id) partners.push(entry.assist_teacher_2_id)
-                if (entry.assist_teacher_3_id) partners.push(entry.assist_teacher_3_id)
-              } else if (isAssistant1) {
-                partners.push(entry.lead_teacher_id)
-                if (entry.assist_teacher_2_id) partners.push(entry.assist_teacher_2_id)
-                if (entry.assist_teacher_3_id) partners.push(entry.assist_teacher_3_id)
-              } else if (isAssistant2) {
-                partners.push(entry.lead_teacher_id)
-                if (entry.assist_teacher_1_id) partners.push(entry.assist_teacher_1_id)
-                if (entry.assist_teacher_3_id) partners.push(entry.assist_teacher_3_id)
-              } else if (isAssistant3) {
-                partners.push(entry.lead_teacher_id)
-                if (entry.assist_teacher_1_id) partners.push(entry.assist_teacher_1_id)
-                if (entry.assist_teacher_2_id) partners.push(entry.assist_teacher_2_id)
-              }
-            }
-            
-            routineMap[key] = {
-              subject_name: entry.subject?.name || 'N/A',
-              subject_code: entry.subject?.code || '',
-              class_name: entry.class?.name || 'N/A',
-              section: entry.class?.section || '',
-              room_no: entry.class?.room_no || '',
-              is_lab: entry.is_lab,
-              num_periods: entry.num_periods,
-              role: isLeadTeacher ? 'Lead' : 'Assistant',
-              partner_ids: partners,
-              programme_code: entry.class?.programme?.code || '',
-              semester_name: entry.class?.semester?.name || '',
-            }
-          }
-        })
-      }
-      
-      setTeacherRoutine(routineMap)
-      setTotalLoad(calculatedLoad)
+      setTeacherRoutine(timetable.routine || {})
+      setTotalLoad(timetable.total_load || 0)
     } catch (error) {
       console.error('Error loading teacher routine:', error)
     } finally {
@@ -224,6 +174,11 @@ export default function TeacherRoutine() {
     return false
   }
 
+  // Progress callback for runExportJob: shows the job's progress in the snackbar
+  const showExportProgress = (label) => (progress) => {
+    setSnackbar({ open: true, message: `${label}... ${Math.round(progress * 100)}%`, severity: 'info' })
+  }
+
   const handleExportAllTeachers = async () => {
     if (teachers.length === 0) {
       alert('No teachers available to export')
@@ -231,370 +186,29 @@ export default function TeacherRoutine() {
     }
 
     try {
-      // Fetch all class routines to get effective date
-      const routinesResponse = await classRoutineService.getAll()
-      const allRoutines = routinesResponse.data || []
-      
-      // Get effective date from first routine entry
-      const effectiveDate = allRoutines.length > 0 && allRoutines[0].effective_date
-        ? new Date(allRoutines[0].effective_date).toLocaleDateString('en-US', {
-            year: 'numeric',
-            month: 'long',
-            day: 'numeric'
-          })
-        : 'N/A'
-
-      // Create workbook
-      const wb = XLSX.utils.book_new()
-
-      // Process each teacher
-      for (const teacher of teachers) {
-        // Fetch all class routines
-        const response = await classRoutineService.getAll()
-        const allClassRoutines = response.data || []
-        
-        // Build teacher routine from class routines
-        const teacherRoutineData = {}
-        let teacherTotalLoad = 0
-
-        if (allClassRoutines && Array.isArray(allClassRoutines)) {
-          allClassRoutines.forEach(entry => {
-            // Check if this teacher is involved
-            const isLeadTeacher = entry.lead_teacher_id === teacher.id
-            const isAssistant1 = entry.assist_teacher_1_id === teacher.id
-            const isAssistant2 = entry.assist_teacher_2_id === teacher.id
-            const isAssistant3 = entry.assist_teacher_3_id === teacher.id
-            
-            if (isLeadTeacher || isAssistant1 || isAssistant2 || isAssistant3) {
-              const key = `${entry.day_id}-${entry.period_id}`
-              
-              // Calculate load for this entry
-              const periods = entry.num_periods || 1
-              const workload = entry.is_lab ? periods * 0.8 : periods * 1.0
-              teacherTotalLoad += workload
-              
-              // Get partner teachers for lab sessions
-              let partners = []
-              if (entry.is_lab) {
-                if (isLeadTeacher) {
-                  if (entry.assist_teacher_1_id) partners.push(entry.assist_teacher_1_id)
-                  if (entry.assist_teacher_2_id) partners.push(entry.assist_teacher_2_id)
-                  if (entry.assist_teacher_3_id) partners.push(entry.assist_teacher_3_id)
-                } else if (isAssistant1) {
-                  partners.push(entry.lead_teacher_id)
-                  if (entry.assist_teacher_2_id) partners.push(entry.assist_teacher_2_id)
-                  if (entry.assist_teacher_3_id) partners.push(entry.assist_teacher_3_id)
-                } else if (isAssistant2) {
-                  partners.push(entry.lead_teacher_id)
-                  if (entry.assist_teacher_1_id) partners.push(entry.assist_teacher_1_id)
-                  if (entry.assist_teacher_3_id) partners.push(entry.assist_teacher_3_id)
-                } else if (isAssistant3) {
-                  partners.push(entry.lead_teacher_id)
-                  if (entry.assist_teacher_1_id) partners.push(entry.assist_teacher_1_id)
-                  if (entry.assist_teacher_2_id) partners.push(entry.assist_teacher_2_id)
-                }
-              }
-              
-              teacherRoutineData[key] = {
-                subject_name: entry.subject?.name || 'N/A',
-                class_name: entry.class?.name || 'N/A',
-                is_lab: entry.is_lab,
-                room_no: entry.class?.room_no || '',
-                num_periods: entry.num_periods || 1,
-                partner_ids: partners,
-              }
-            }
-          })
-        }
-
-        // Create worksheet data
-        const wsData = []
-
-        // Row 1: Kantipur Engineering College
-        wsData.push(['Kantipur Engineering College'])
-        
-        // Row 2: Teacher's Routine
-        wsData.push(["Teacher's Routine"])
-        
-        // Row 3: Department and Effective From
-        const row3 = new Array(periods.length + 1).fill('')
-        const departmentName = teacher.department_id 
-          ? (departments.find(d => d.id === teacher.department_id)?.name || 'N/A')
-          : 'Not Assigned'
-        row3[0] = `Department: ${departmentName}`
-        row3[8] = `Effective From: ${effectiveDate}`
-        wsData.push(row3)
-        
-        // Row 4: Teacher name and Total Load
-        const row4 = new Array(periods.length + 1).fill('')
-        row4[0] = `Teacher: ${teacher.name}`
-        row4[8] = `Total Load: ${teacherTotalLoad.toFixed(1)}`
-        wsData.push(row4)
-        
-        // Row 5: Empty row
-        wsData.push([])
-        
-        // Row 6: Header row with periods
-        const headerRow = ['Days \\ Time']
-        periods.forEach(period => {
-          headerRow.push(`${period.start_time?.substring(0, 5)}-${period.end_time?.substring(0, 5)}`)
-        })
-        wsData.push(headerRow)
-        
-        // Rows 7+: Routine data
-        days.forEach(day => {
-          const row = [day.name]
-          
-          let skipCount = 0
-          periods.forEach((period) => {
-            if (skipCount > 0) {
-              skipCount--
-              row.push('') // Add empty cell for merged periods
-              return
-            }
-            
-            const key = `${day.id}-${period.id}`
-            const cellData = teacherRoutineData[key]
-            
-            if (!cellData) {
-              row.push('-')
-            } else {
-              let cellContent = cellData.subject_name
-              
-              if (cellData.is_lab) {
-                cellContent += ' (Lab)'
-              }
-              
-              cellContent += `\n[${cellData.class_name}]`
-              
-              if (cellData.room_no) {
-                cellContent += `\nRoom: ${cellData.room_no}`
-              }
-              
-              if (cellData.partner_ids && cellData.partner_ids.length > 0) {
-                const partnerNames = cellData.partner_ids
-                  .map(pid => {
-                    const partner = teachers.find(t => t.id === pid)
-                    return partner ? `(${partner.abbreviation || partner.name})` : ''
-                  })
-                  .filter(name => name)
-                  .join(', ')
-                cellContent += `\nWith: ${partnerNames}`
-              }
-              
-              row.push(cellContent)
-              
-              if (cellData.num_periods > 1) {
-                skipCount = cellData.num_periods - 1
-              }
-            }
-          })
-          
-          wsData.push(row)
-        })
-
-        // Create worksheet
-        const ws = XLSX.utils.aoa_to_sheet(wsData)
-
-        // Set column widths
-        const colWidths = [{ wch: 11.27 }]
-        periods.forEach(() => {
-          colWidths.push({ wch: 11.27 })
-        })
-        ws['!cols'] = colWidths
-
-        // Set row heights
-        const rowHeights = []
-        rowHeights[0] = { hpt: 24 }
-        rowHeights[1] = { hpt: 20 }
-        rowHeights[2] = { hpt: 18 }
-        rowHeights[3] = { hpt: 18 }
-        rowHeights[4] = { hpt: 5 }
-        rowHeights[5] = { hpt: 20 }
-        for (let i = 6; i < 6 + days.length; i++) {
-          rowHeights[i] = { hpt: 85.50 }
-        }
-        ws['!rows'] = rowHeights
-
-        // Merge cells for title rows and multi-period entries
-        const merges = [
-          { s: { r: 0, c: 0 }, e: { r: 0, c: periods.length } },
-          { s: { r: 1, c: 0 }, e: { r: 1, c: periods.length } },
-          { s: { r: 2, c: 0 }, e: { r: 2, c: 3 } },
-          { s: { r: 2, c: 8 }, e: { r: 2, c: 10 } },
-          { s: { r: 3, c: 0 }, e: { r: 3, c: 3 } },
-          { s: { r: 3, c: 8 }, e: { r: 3, c: 10 } },
-        ]
-        
-        // Add merges for multi-period classes
-        days.forEach((day, dayIdx) => {
-          let skipCount = 0
-          periods.forEach((period, periodIdx) => {
-            if (skipCount > 0) {
-              skipCount--
-              return
-            }
-            
-            const key = `${day.id}-${period.id}`
-            const cellData = teacherRoutineData[key]
-            
-            if (cellData && cellData.num_periods > 1) {
-              const rowIndex = 6 + dayIdx
-              const startCol = periodIdx + 1
-              const endCol = startCol + cellData.num_periods - 1
-              
-              merges.push({
-                s: { r: rowIndex, c: startCol },
-                e: { r: rowIndex, c: endCol }
-              })
-              
-              skipCount = cellData.num_periods - 1
-            }
-          })
-        })
-        
-        ws['!merges'] = merges
-
-        // Apply styles
-        const range = XLSX.utils.decode_range(ws['!ref'])
-        for (let R = range.s.r; R <= range.e.r; ++R) {
-          for (let C = range.s.c; C <= range.e.c; ++C) {
-            const cellAddress = XLSX.utils.encode_cell({ r: R, c: C })
-            if (!ws[cellAddress]) continue
-            
-            ws[cellAddress].s = {
-              border: {
-                top: { style: 'thin' },
-                bottom: { style: 'thin' },
-                left: { style: 'thin' },
-                right: { style: 'thin' }
-              },
-              alignment: {
-                wrapText: true,
-                vertical: 'center',
-                horizontal: 'center'
-              }
-            }
-            
-            if (R === 0) {
-              ws[cellAddress].s = {
-                font: { bold: true, sz: 16 },
-                alignment: { horizontal: 'center', vertical: 'center' }
-              }
-            }
-            if (R === 1) {
-              ws[cellAddress].s = {
-                font: { bold: true, sz: 14 },
-                alignment: { horizontal: 'center', vertical: 'center' }
-              }
-            }
-            if (R === 2) {
-              ws[cellAddress].s = {
-                font: { bold: true },
-                alignment: { 
-                  horizontal: C >= 8 ? 'right' : 'left',
-                  vertical: 'center'
-                }
-              }
-            }
-            if (R === 3) {
-              ws[cellAddress].s = {
-                font: { bold: true },
-                alignment: { 
-                  horizontal: C >= 8 ? 'right' : 'left',
-                  vertical: 'center'
-                }
-              }
-            }
-            if (R === 4) {
-              ws[cellAddress].s = {}
-            }
-            if (R === 5) {
-              ws[cellAddress].s = {
-                font: { bold: true },
-                fill: { fgColor: { rgb: 'D3D3D3' } },
-                border: {
-                  top: { style: 'thin' },
-                  bottom: { style: 'thin' },
-                  left: { style: 'thin' },
-                  right: { style: 'thin' }
-                },
-                alignment: { horizontal: 'center', vertical: 'center', wrapText: true }
-              }
-            }
-            if (R >= 6 && C === 0) {
-              ws[cellAddress].s = {
-                font: { bold: true },
-                fill: { fgColor: { rgb: 'F0F0F0' } },
-                border: {
-                  top: { style: 'thin' },
-                  bottom: { style: 'thin' },
-                  left: { style: 'thin' },
-                  right: { style: 'thin' }
-                },
-                alignment: { horizontal: 'center', vertical: 'center', wrapText: true }
-              }
-            }
-            if (R >= 6 && C > 0) {
-              ws[cellAddress].s = {
-                border: {
-                  top: { style: 'thin' },
-                  bottom: { style: 'thin' },
-                  left: { style: 'thin' },
-                  right: { style: 'thin' }
-                },
-                alignment: { horizontal: 'center', vertical: 'center', wrapText: true }
-              }
-            }
-          }
-        }
-
-        // Page setup
-        ws['!pageSetup'] = {
-          paperSize: 9,
-          orientation: 'landscape',
-          scale: 100,
-          fitToWidth: 1,
-          fitToHeight: 0,
-          fitToPage: true,
-          horizontalDpi: 300,
-          verticalDpi: 300
-        }
-
-        ws['!margins'] = {
-          left: 0.5,
-          right: 0.5,
-          top: 0.75,
-          bottom: 0.75,
-          header: 0.3,
-          footer: 0.3
-        }
-
-        // Set print area
-        const maxCol = periods.length
-        const maxRow = 5 + days.length
-        ws['!printArea'] = `A1:${XLSX.utils.encode_col(maxCol)}${maxRow + 1}`
-
-        // Sanitize sheet name
-        let sheetName = teacher.name.replace(/[:\\\/\?\*\[\]]/g, '-')
-        if (sheetName.length > 31) {
-          sheetName = sheetName.substring(0, 31)
-        }
-
-        // Add worksheet to workbook
-        XLSX.utils.book_append_sheet(wb, ws, sheetName)
-      }
-
-      // Save file
-      const filename = `All_Teachers_Routines_${new Date().toISOString().split('T')[0]}.xlsx`
-      XLSX.writeFile(wb, filename)
-
+      // The workbook (one sheet per teacher) is built by a server export job
+      await runExportJob('teachers', {}, showExportProgress('Exporting teacher routines'))
+      setSnackbar({ open: true, message: 'Teacher routines exported', severity: 'success' })
     } catch (error) {
+      if (error.response?.status === 400) {
+        alert(error.response.data.detail)
+        return
+      }
       console.error('Error exporting all teachers routines:', error)
       alert('Failed to export all teachers routines. Please try again.')
     }
   }
 
+  const handleExportTeacherPdf = async () => {
+    try {
+      const response = await exportService.teacherPdf(selectedTeacher.id)
+      saveDownload(response, 'Teacher_Routine.pdf')
+    } catch (error) {
+      console.error('Error exporting teacher routine PDF:', error)
+      alert('Failed to export teacher routine PDF. Please try again.')
+    }
+  }
+
   const handleExportTeacherRoutine = async () => {
     if (!selectedTeacher) {
       alert('Please select a teacher first')
@@ -932,6 +546,16 @@ export default function TeacherRoutine() {
           
           {selectedTeacher && (
             <>
+              <Button
+                variant="outlined"
+                color="primary"
+                startIcon={<ExportIcon />}
+                onClick={handleExportTeacherPdf}
+                sx={{ px: 3, py: 1.5 }}
+              >
+                PDF
+              </Button>
+
               <Box 
                 sx={{ 
                   bgcolor: 'primary.main', 
@@ -1117,6 +741,21 @@ export default function TeacherRoutine() {
           )}
         </Box>
       )}
+
+      <Snackbar
+        open={snackbar.open}
+        autoHideDuration={6000}
+        onClose={() => setSnackbar({ ...snackbar, open: false })}
+        anchorOrigin={{ vertical: 'bottom', horizontal: 'right' }}
+      >
+        <Alert
+          onClose={() => setSnackbar({ ...snackbar, open: false })}
+          severity={snackbar.severity}
+          sx={{ width: '100%' }}
+        >
+          {snackbar.message}
+        </Alert>
+      </Snackbar>
     </Box>
   )
 }
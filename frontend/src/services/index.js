@@ -9,7 +9,7 @@ export const departmentService = {
 }
 
 export const programmeService = {
-  getAll: () => api.get('/programmes/'),
+  getAll: (params) => api.get('/programmes/', { params }),
   getById: (id) => api.get(`/programmes/${id}/`),
   getByDepartment: (departmentId) => api.get(`/programmes/department/${departmentId}/`),
   create: (data) => api.post('/programmes/', data),
@@ -18,7 +18,7 @@ export const programmeService = {
 }
 
 export const semesterService = {
-  getAll: () => api.get('/semesters/'),
+  getAll: (params) => api.get('/semesters/', { params }),
   getById: (id) => api.get(`/semesters/${id}/`),
   getByProgramme: (programmeId) => api.get(`/semesters/programme/${programmeId}/`),
   create: (data) => api.post('/semesters/', data),
@@ -27,7 +27,7 @@ export const semesterService = {
 }
 
 export const teacherService = {
-  getAll: () => api.get('/teachers/'),
+  getAll: (params) => api.get('/teachers/', { params }),
   getById: (id) => api.get(`/teachers/${id}/`),
   create: (data) => api.post('/teachers/', data),
   update: (id, data) => api.put(`/teachers/${id}/`, data),
@@ -35,7 +35,7 @@ export const teacherService = {
 }
 
 export const subjectService = {
-  getAll: () => api.get('/subjects/'),
+  getAll: (params) => api.get('/subjects/', { params }),
   getById: (id) => api.get(`/subjects/${id}/`),
   create: (data) => api.post('/subjects/', data),
   update: (id, data) => api.put(`/subjects/${id}/`, data),
@@ -57,7 +57,7 @@ export const semesterSubjectService = {
 }
 
 export const classService = {
-  getAll: () => api.get('/classes/'),
+  getAll: (params) => api.get('/classes/', { params }),
   getById: (id) => api.get(`/classes/${id}/`),
   getBySemester: (semesterId) => api.get(`/classes/semester/${semesterId}/`),
   create: (data) => api.post('/classes/', data),
@@ -74,7 +74,7 @@ export const roomService = {
 }
 
 export const dayService = {
-  getAll: () => api.get('/days/'),
+  getAll: (params) => api.get('/days/', { params }),
   getById: (id) => api.get(`/days/${id}/`),
   create: (data) => api.post('/days/', data),
   update: (id, data) => api.put(`/days/${id}/`, data),
@@ -82,7 +82,7 @@ export const dayService = {
 }
 
 export const periodService = {
-  getAll: () => api.get('/periods/'),
+  getAll: (params) => api.get('/periods/', { params }),
   getById: (id) => api.get(`/periods/${id}/`),
   create: (data) => api.post('/periods/', data),
   update: (id, data) => api.put(`/periods/${id}/`, data),
@@ -99,7 +99,13 @@ export const teacherSubjectService = {
 
 export const classRoutineService = {
   getAll: () => api.get('/class-routines/'),
+  search: (params) => api.get('/class-routines/search/', { params }),
+  getTeacherTimetables: () => api.get('/class-routines/teachers/'),
+  getTeacherTimetable: (teacherId) => api.get(`/class-routines/teachers/${teacherId}/`),
+  validate: () => api.get('/class-routines/validate/'),
   save: (classId, entries, roomNo = null) => api.post('/class-routines/save/', { class_id: classId, entries, room_no: roomNo }),
+  saveBulk: (routines, checkConflicts = true) =>
+    api.post('/class-routines/bulk-save/', { routines, check_conflicts: checkConflicts }),
   getByClass: (classId) => api.get(`/class-routines/${classId}/`),
   delete: (classId) => api.delete(`/class-routines/${classId}/`),
   checkTeacherConflict: (teacherId, dayId, periodIds, excludeClassId = null) => 
@@ -109,4 +115,171 @@ export const classRoutineService = {
       period_ids: periodIds,
       exclude_class_id: excludeClassId
     }),
+  // probes: [{ teacher_id, day_id, period_ids, exclude_class_id }]
+  checkTeacherConflictsBatch: (probes) =>
+    api.post('/class-routines/check-teacher-conflicts/batch/', { probes }),
+  // Server-sent occupancy updates; call .close() on the returned EventSource to stop
+  subscribeEvents: (onEvent) => {
+    const source = new EventSource(`${api.defaults.baseURL}/class-routines/events/`)
+    const handler = (event) => onEvent(event.type, JSON.parse(event.data))
+    source.addEventListener('class_occupancy', handler)
+    source.addEventListener('occupancy_reset', handler)
+    return source
+  },
+}
+
+export const changeService = {
+  // Pass the previous next_cursor; when reset is true reload everything and continue from next_cursor
+  getSince: (since = 0, limit = 1000) => api.get('/changes/', { params: { since, limit } }),
+}
+
+// Fetch every row of a skip/limit paged list; resolves to { data: rows } like a single page
+export const fetchAllPages = async (getPage, pageSize = 500) => {
+  const rows = []
+  for (;;) {
+    const { data } = await getPage({ skip: rows.length, limit: pageSize })
+    rows.push(...data)
+    if (data.length < pageSize) return { data: rows }
+  }
+}
+
+// Full lists kept current from the change feed: the first load() fetches every list, later
+// loads fetch only the changes since the previous one and patch the lists by row id.
+// `sources` maps a list name to { fetch, table, sortBy, refetchOn }: changes to `table` are
+// applied to the list, changes to any of `refetchOn` (for lists that join other tables)
+// make it refetch. A table reset or a feed reset refetches too.
+export const createListSync = (sources) => {
+  const names = Object.keys(sources)
+  let lists = null
+  let cursor = 0
+  let pending = Promise.resolve()
+
+  const fetchLists = async (toFetch) => {
+    const responses = await Promise.all(toFetch.map((name) => sources[name].fetch()))
+    toFetch.forEach((name, i) => {
+      lists[name] = responses[i].data || []
+    })
+  }
+
+  const applyChanges = (changes, refetch, patched) => {
+    changes.forEach((change) => {
+      names.forEach((name) => {
+        const source = sources[name]
+        if (source.refetchOn?.includes(change.table)) refetch.add(name)
+        if (source.table !== change.table) return
+        if (change.operation === 'reset') {
+          refetch.add(name)
+          return
+        }
+        const rest = lists[name].filter((row) => row.id !== change.row_id)
+        lists[name] = change.operation === 'delete' ? rest : [...rest, change.data]
+        patched.add(name)
+      })
+    })
+  }
+
+  const sync = async () => {
+    if (lists === null) {
+      // Read the cursor first: changes made while the lists load are replayed next time
+      const { data } = await changeService.getSince(0, 1)
+      cursor = data.latest_cursor
+      lists = {}
+      await fetchLists(names)
+      return { ...lists }
+    }
+
+    const refetch = new Set()
+    const patched = new Set()
+    let page
+    do {
+      ;({ data: page } = await changeService.getSince(cursor))
+      if (page.reset) {
+        names.forEach((name) => refetch.add(name))
+      } else {
+        applyChanges(page.changes, refetch, patched)
+      }
+      cursor = page.next_cursor
+    } while (page.has_more && !page.reset)
+
+    patched.forEach((name) => {
+      const sortBy = sources[name].sortBy || ['id']
+      lists[name] = [...lists[name]].sort((a, b) => {
+        for (const key of sortBy) {
+          if (a[key] !== b[key]) return a[key] < b[key] ? -1 : 1
+        }
+        return 0
+      })
+    })
+    if (refetch.size > 0) await fetchLists([...refetch])
+    return { ...lists }
+  }
+
+  return {
+    // Resolves to { [name]: rows }; concurrent calls run one after another
+    load: () => {
+      const result = pending.then(sync, sync)
+      pending = result.catch(() => {})
+      return result
+    },
+  }
+}
+
+export const workloadService = {
+  getAll: () => api.get('/workload/'),
+  getByTeacher: (teacherId) => api.get(`/workload/teachers/${teacherId}/`),
+  // groupBy: department, programme, semester or recruitment
+  getRollup: (groupBy) => api.get(`/workload/rollups/${groupBy}/`),
+}
+
+export const payrollService = {
+  get: (params = {}) => api.get('/finance/payroll', { params }),
+  download: (format, params = {}) =>
+    api.get('/finance/payroll', { params: { ...params, format }, responseType: 'blob' }),
+}
+
+export const exportService = {
+  classRoutines: (params = {}) => api.get('/exports/class-routines/', { params, responseType: 'blob' }),
+  dayWise: () => api.get('/exports/day-wise/', { responseType: 'blob' }),
+  teacherRoutines: () => api.get('/exports/teachers/', { responseType: 'blob' }),
+  createJob: (type, params = {}) => api.post('/exports/jobs/', { type, params }),
+  getJob: (id) => api.get(`/exports/jobs/${id}/`),
+  downloadJob: (id) => api.get(`/exports/jobs/${id}/download/`, { responseType: 'blob' }),
+  classPdf: (classId) => api.get(`/exports/pdf/classes/${classId}/`, { responseType: 'blob' }),
+  // ZIP with one PDF per class
+  classPdfs: (params = {}) => api.get('/exports/pdf/classes/', { params, responseType: 'blob' }),
+  teacherPdf: (teacherId) => api.get(`/exports/pdf/teachers/${teacherId}/`, { responseType: 'blob' }),
+  roomPdf: (roomId) => api.get(`/exports/pdf/rooms/${roomId}/`, { responseType: 'blob' }),
+}
+
+// Save a blob response under the filename the server suggested
+export const saveDownload = (response, fallbackName) => {
+  const disposition = response.headers['content-disposition'] || ''
+  const match = disposition.match(/filename="?([^";]+)"?/)
+  const url = URL.createObjectURL(response.data)
+  const link = document.createElement('a')
+  link.href = url
+  link.download = match ? match[1] : fallbackName
+  document.body.appendChild(link)
+  link.click()
+  link.remove()
+  URL.revokeObjectURL(url)
+}
+
+const EXPORT_POLL_MS = 1000
+
+// Run an export as a background job: poll until it finishes, reporting progress (0-1),
+// then save the file. Rejects with the job's error if it failed.
+export const runExportJob = async (type, params = {}, onProgress) => {
+  let { data: job } = await exportService.createJob(type, params)
+  while (job.status === 'queued' || job.status === 'running') {
+    if (onProgress) onProgress(job.progress)
+    await new Promise((resolve) => setTimeout(resolve, EXPORT_POLL_MS))
+    ;({ data: job } = await exportService.getJob(job.id))
+  }
+  if (job.status !== 'done') {
+    throw new Error(job.error || 'Export failed')
+  }
+  if (onProgress) onProgress(1)
+  saveDownload(await exportService.downloadJob(job.id), job.filename)
+  return job
 }